@@ -1,10 +1,40 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
 
 # Register your models here.
 from .models import Task, Tag, Comment, Priority, Status
+from .purge import purge_user
 
 admin.site.register(Task)
 admin.site.register(Comment)
 admin.site.register(Status)
 admin.site.register(Priority)
-admin.site.register(Tag)
\ No newline at end of file
+admin.site.register(Tag)
+
+class PurgingUserAdmin(UserAdmin):
+    """
+    The users admin, with an action deleting users and all their data with batched DELETE
+    statements instead of loading every row like the default delete action, see
+    manager.purge.purge_user.
+    """
+    actions = ['purge_users']
+
+    @admin.action(description='Purge selected users and all their data', permissions=['delete'])
+    def purge_users(self, request, queryset):
+        users = [*queryset.values_list('pk', 'username')]
+        rows = 0
+
+        for user_id, _ in users:
+            # Counts are running totals per table
+            deleted = {(alias, table): count for alias, table, count in purge_user(user_id)}
+            rows += sum(deleted.values())
+
+        self.message_user(
+            request,
+            f"Purged {', '.join(username for _, username in users)} and {rows} rows of their data.",
+            messages.SUCCESS,
+        )
+
+admin.site.unregister(User)
+admin.site.register(User, PurgingUserAdmin)
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from ..cache import get_cache
+
+# Bump when the layout of any chart changes so previously rendered charts are not served again
+CHART_CACHE_VERSION = 2
+
+DEFAULT_CHART_CACHE = {
+    'BACKEND': 'manager.analytics.chart_cache.LocalChartCacheBackend',
+    'OPTIONS': {},
+}
+
+_chart_cache = None
+_chart_cache_lock = threading.Lock()
+
+def chart_cache_key(method, args):
+    """
+    Build the content address of a chart from its generator method and input series.
+
+    Args:
+    - method (str): Name of the PlotGenerator method rendering the chart.
+    - args (tuple): The arguments passed to the method.
+
+    Returns:
+    - str: A hex SHA-256 digest identifying the rendered chart.
+    """
+    payload = json.dumps([CHART_CACHE_VERSION, method, args], default=str, separators=(',', ':'))
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class LocalChartCacheBackend:
+    """
+    In-process chart cache bounded by entry count and total size, evicting the least recently used charts.
+
+    Attributes:
+    - max_entries: int - Maximum number of cached charts.
+    - max_bytes: int - Maximum total size of the cached chart HTML.
+    """
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(value):
+        """
+        Estimate the size of a rendered chart.
+
+        Args:
+        - value: A rendered chart, a string or a tuple of strings.
+
+        Returns:
+        - int: The number of characters in the rendered chart.
+        """
+        if isinstance(value, str):
+            return len(value)
+
+        return sum(len(part) for part in value)
+
+    def get(self, key):
+        """
+        Return a cached chart and mark it as recently used.
+
+        Args:
+        - key (str): The chart content address.
+
+        Returns:
+        - The cached chart, or None when missing.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            self._entries.move_to_end(key)
+
+            return entry[0]
+
+    def set(self, key, value):
+        """
+        Cache a chart, evicting the least recently used ones when over budget.
+
+        Args:
+        - key (str): The chart content address.
+        - value: The rendered chart.
+        """
+        size = self._sizeof(value)
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+
+            if previous is not None:
+                self._size -= previous[1]
+
+            self._entries[key] = (value, size)
+            self._size += size
+
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        """
+        Remove every cached chart.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+class DjangoChartCacheBackend:
+    """
+    Chart cache stored in one of the Django cache framework caches, shared between workers
+    when the configured cache is.
+
+    Attributes:
+    - alias: str - The alias of the cache in the CACHES setting.
+    - timeout: int - Expiration of cached charts in seconds, None to use the cache default.
+    """
+    key_prefix = 'chart'
+
+    def __init__(self, alias='default', timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        """
+        The Django cache holding the charts.
+        """
+        return caches[self.alias]
+
+    def get(self, key):
+        """
+        Return a cached chart.
+
+        Args:
+        - key (str): The chart content address.
+
+        Returns:
+        - The cached chart, or None when missing.
+        """
+        return self.cache.get(f'{self.key_prefix}:{key}')
+
+    def set(self, key, value):
+        """
+        Cache a chart.
+
+        Args:
+        - key (str): The chart content address.
+        - value: The rendered chart.
+        """
+        if self.timeout is None:
+            self.cache.set(f'{self.key_prefix}:{key}', value)
+        else:
+            self.cache.set(f'{self.key_prefix}:{key}', value, self.timeout)
+
+class SharedChartCacheBackend:
+    """
+    Chart cache stored in the 'charts' namespace of manager.cache: the charts recently used by a
+    worker are kept in process, bounded by entry count and total size, in front of the cache
+    shared by the workers. Charts larger than max_shared_bytes, e.g. Plotly charts embedding
+    their data, are only kept in process.
+
+    Attributes:
+    - namespace: TwoTierCache - The cache namespace holding the charts.
+    """
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, max_shared_bytes=512 * 1024, timeout=None):
+        self.namespace = get_cache(
+            'charts', max_entries, timeout,
+            max_bytes=max_bytes, max_shared_bytes=max_shared_bytes, sizeof=LocalChartCacheBackend._sizeof,
+        )
+
+    def get(self, key):
+        """
+        Return a cached chart.
+
+        Args:
+        - key (str): The chart content address.
+
+        Returns:
+        - The cached chart, or None when missing.
+        """
+        return self.namespace.get(key)
+
+    def set(self, key, value):
+        """
+        Cache a chart.
+
+        Args:
+        - key (str): The chart content address.
+        - value: The rendered chart.
+        """
+        self.namespace.set(key, value)
+
+class ChartCache:
+    """
+    Content-addressed cache of rendered charts, counting hits and misses.
+
+    Methods:
+    - get(method, args): Return the cached chart for the given input, or None.
+    - set(method, args, chart): Cache a rendered chart.
+    - stats(): Return the hit and miss counters.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, method, args):
+        """
+        Look a chart up by its content address.
+
+        Args:
+        - method (str): Name of the PlotGenerator method rendering the chart.
+        - args (tuple): The arguments passed to the method.
+
+        Returns:
+        - The cached chart, or None when it has to be rendered.
+        """
+        chart = self.backend.get(chart_cache_key(method, args))
+
+        with self._lock:
+            if chart is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return chart
+
+    def set(self, method, args, chart):
+        """
+        Cache a rendered chart under its content address.
+
+        Args:
+        - method (str): Name of the PlotGenerator method that rendered the chart.
+        - args (tuple): The arguments passed to the method.
+        - chart: The rendered chart.
+        """
+        self.backend.set(chart_cache_key(method, args), chart)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+        - dict: The number of hits and misses and the hit ratio.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0,
+            }
+
+def get_chart_cache():
+    """
+    Return the chart cache configured by the CHART_CACHE setting, creating it on first use.
+
+    CHART_CACHE is a dict with the dotted path of the backend class in 'BACKEND' and its keyword
+    arguments in 'OPTIONS'. A None BACKEND disables the cache.
+
+    Returns:
+    - ChartCache: The shared chart cache, or None when disabled.
+    """
+    global _chart_cache
+
+    with _chart_cache_lock:
+        if _chart_cache is None:
+            config = getattr(settings, 'CHART_CACHE', DEFAULT_CHART_CACHE)
+
+            if config.get('BACKEND') is None:
+                return None
+
+            backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+            _chart_cache = ChartCache(backend)
+
+        return _chart_cache
@@ -1,20 +1,260 @@
-import plotly.graph_objects as go
-from plotly import offline
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from ..metrics import record_chart_batch, record_chart_render
+from .chart_cache import get_chart_cache
+from .svg_generator import SvgPlotGenerator
+
+ChartSpec = namedtuple('ChartSpec', ['method', 'args', 'backend'], defaults=(None,))
+ChartSpec.__doc__ = """
+A chart to render in a batch.
+
+Fields:
+- method: Name of the PlotGenerator method generating the chart (e.g. 'generate_task_by_status').
+- args: Tuple of arguments passed to the method. Must be picklable.
+- backend: Name of the backend rendering the chart, see PLOT_BACKENDS. None to use the
+  PLOT_BACKEND_OVERRIDES and PLOT_BACKEND settings.
+"""
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+# Plotly imports its optional dependencies lazily and is not safe to load from concurrent threads
+_plotly_loaded = False
+_plotly_load_lock = threading.Lock()
+
+def resolve_backend(spec):
+    """
+    Return the name of the backend rendering a chart.
+
+    Args:
+    - spec (ChartSpec): The chart to render.
+
+    Returns:
+    - str: The spec backend, else the PLOT_BACKEND_OVERRIDES entry of its method, else PLOT_BACKEND.
+
+    Raises:
+    - ImproperlyConfigured: If the backend is unknown.
+    """
+    backend = spec.backend or getattr(settings, 'PLOT_BACKEND_OVERRIDES', {}).get(
+        spec.method, getattr(settings, 'PLOT_BACKEND', 'plotly'),
+    )
+
+    if backend not in PLOT_BACKENDS:
+        raise ImproperlyConfigured(f"Unknown plot backend '{backend}', choose one of {', '.join(PLOT_BACKENDS)}.")
+
+    return backend
+
+def render_chart(spec):
+    """
+    Render a single chart spec.
+
+    Module level so it can be pickled and run by the render pool workers.
+
+    Args:
+    - spec (ChartSpec): The chart to render, with its backend resolved.
+
+    Returns:
+    - The return value of the generator method (HTML string or tuple of HTML strings).
+    """
+    if spec.backend == 'plotly' and not _plotly_loaded:
+        load_plotly()
+
+    return getattr(PLOT_BACKENDS[spec.backend](), spec.method)(*spec.args)
+
+def timed_render_chart(spec):
+    """
+    Render a single chart spec and measure the rendering time where it runs.
+
+    Args:
+    - spec (ChartSpec): The chart to render, with its backend resolved.
+
+    Returns:
+    - tuple: The rendered chart and the rendering time in seconds.
+    """
+    start = time.perf_counter()
+    chart = render_chart(spec)
+
+    return chart, time.perf_counter() - start
+
+def preload():
+    """
+    Import Plotly and render a throwaway chart ahead of the first request.
+
+    Plotly is otherwise imported on first chart use. Called when the app is ready if the
+    PLOT_PRELOAD setting is on, so preforking servers load it once before forking workers.
+    """
+    load_plotly()
+
+def load_plotly():
+    """
+    Warm up Plotly once per process, holding back the other threads rendering their first chart.
+    """
+    global _plotly_loaded
+
+    with _plotly_load_lock:
+        if not _plotly_loaded:
+            warm_up_worker()
+            _plotly_loaded = True
+
+def warm_up_worker():
+    """
+    Render a throwaway chart so the worker pays Plotly's first-figure costs
+    (validator and template loading) before the first real request does.
+    """
+    PlotGenerator().generate_task_by_status(['warm up'], [1])
+
+def get_render_pool():
+    """
+    Return the shared chart rendering process pool, creating and warming it up on first use.
+
+    The number of workers comes from the PLOT_RENDER_WORKERS setting. The pool is created when
+    the app is ready so its workers load Plotly before the first request. Workers are spawned
+    rather than forked so creating the pool from a threaded server is safe.
+
+    Returns:
+    - ProcessPoolExecutor: The shared pool, or None when PLOT_RENDER_WORKERS is lower than 2.
+    """
+    global _render_pool
+
+    workers = getattr(settings, 'PLOT_RENDER_WORKERS', 0)
+
+    if workers < 2:
+        return None
+
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=load_plotly,
+            )
+            # Spawning workers is lazy, submit one no-op per worker to start them all now
+            for _ in range(workers):
+                _render_pool.submit(int)
+
+        return _render_pool
+
+def shutdown_render_pool():
+    """
+    Shut down the shared chart rendering process pool. A new one is created on next use.
+    """
+    global _render_pool
+
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+
+def forget_render_pool():
+    """
+    Drop the render pool of the parent in a forked child, e.g. a worker of a preforking server:
+    the pool threads are not copied, the child creates its own pool on first use.
+    """
+    global _render_pool, _render_pool_lock
+
+    _render_pool = None
+    _render_pool_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=forget_render_pool)
 
 class PlotGenerator:
     """
     A class for generating various types of plots using Plotly.
 
+    Plotly is imported on first chart use rather than with this module, so processes that
+    never render a chart do not pay for it.
+
     Attributes:
     - None
 
     Methods:
     - generate_task_per_day(dates, counts): Generate a line chart representing tasks per day.
     - generate_task_by_status(status, counts): Generate a pie chart representing tasks by status.
-    - generate_task_duration(task_durations, task_names): Generate a horizontal bar chart representing task durations.
+    - generate_task_duration(bin_labels, bin_counts, percentiles, slowest_tasks): Generate a histogram
+      of task durations with percentiles and the slowest tasks.
     - generate_assignee_productivity(assignees, completed_tasks): Generate grouped bar and pie charts
       representing assignee productivity based on completed tasks.
+    - render_batch(specs): Render several charts, in parallel when the render pool is enabled.
     """
+    def render_batch(self, specs):
+        """
+        Render several charts, in parallel on the shared process pool when it is enabled.
+
+        Each chart is rendered by the backend resolved by resolve_backend. Charts whose input is
+        unchanged are served from the chart cache without rendering them again. Falls back to
+        rendering serially in the current process when the pool is disabled, there is a single
+        chart, or the pool is unusable (broken worker, unpicklable input). Rendering times are
+        recorded in the request metrics.
+
+        Args:
+        - specs (iterable): ChartSpec objects describing the charts to render.
+
+        Returns:
+        - list: The rendered charts, in the same order as the specs.
+        """
+        start = time.perf_counter()
+        specs = [ChartSpec(*spec) for spec in specs]
+        specs = [spec._replace(backend=resolve_backend(spec)) for spec in specs]
+        chart_cache = get_chart_cache()
+        charts = [None] * len(specs)
+
+        if chart_cache is not None:
+            charts = [chart_cache.get(f'{spec.backend}.{spec.method}', spec.args) for spec in specs]
+
+        missing = [index for index, chart in enumerate(charts) if chart is None]
+        rendered = self._render_specs([specs[index] for index in missing])
+
+        for index, chart in zip(missing, rendered):
+            charts[index] = chart
+
+            if chart_cache is not None:
+                chart_cache.set(f'{specs[index].backend}.{specs[index].method}', specs[index].args, chart)
+
+        record_chart_batch(time.perf_counter() - start)
+
+        return charts
+
+    def _render_specs(self, specs):
+        """
+        Render chart specs on the shared process pool, or serially when it is not usable.
+
+        Only Plotly charts are sent to the pool, SVG charts render faster than they would be
+        pickled, so the pool is only used by batches of at least two Plotly charts.
+
+        Args:
+        - specs (list): ChartSpec objects describing the charts to render, with their backend resolved.
+
+        Returns:
+        - list: The rendered charts, in the same order as the specs.
+        """
+        results = [None] * len(specs)
+        pooled = [index for index, spec in enumerate(specs) if spec.backend == 'plotly']
+        render_pool = get_render_pool() if len(pooled) > 1 else None
+
+        if render_pool is not None:
+            try:
+                for index, result in zip(pooled, render_pool.map(timed_render_chart, [specs[index] for index in pooled])):
+                    results[index] = result
+            except (BrokenProcessPool, pickle.PicklingError, OSError):
+                shutdown_render_pool()
+
+        results = [timed_render_chart(spec) if result is None else result for spec, result in zip(specs, results)]
+
+        for spec, (_, seconds) in zip(specs, results):
+            record_chart_render(spec.method, spec.backend, seconds)
+
+        return [chart for chart, _ in results]
+
     def generate_task_per_day(self, dates, counts):
         """
         Generate a line chart representing tasks per day.
@@ -26,6 +266,9 @@ class PlotGenerator:
         Returns:
         - chart_html (str): HTML string containing the generated chart.
         """
+        import plotly.graph_objects as go
+        from plotly import offline
+
         data = go.Scatter(
             x=dates,
             y=counts,
@@ -55,35 +298,61 @@ class PlotGenerator:
         Returns:
         - chart_html (str): HTML string containing the generated chart.
         """
+        import plotly.graph_objects as go
+        from plotly import offline
+
         fig = go.Figure(data=go.Pie(labels=status, values=counts))
 
         chart_html = offline.plot(fig, auto_open=False, output_type='div')
 
         return chart_html
     
-    def generate_task_duration(self, task_durations, task_names):
+    def generate_task_duration(self, bin_labels, bin_counts, percentiles, slowest_tasks=()):
         """
-        Generate a horizontal bar chart representing task durations.
+        Generate a histogram of task durations, annotated with percentiles and optionally
+        followed by a horizontal bar chart of the slowest tasks.
 
         Args:
-        - task_durations (list): List of task durations.
-        - task_names (list): List of corresponding task names.
+        - bin_labels (list): Labels of the duration bins (in days).
+        - bin_counts (list): Number of tasks in each bin.
+        - percentiles (list): (label, days) pairs, e.g. [('p50', 3), ('p90', 12)].
+        - slowest_tasks (list): (task name, days) pairs of the slowest tasks.
 
         Returns:
         - chart_html (str): HTML string containing the generated chart.
         """
-        fig = go.Figure()
+        import plotly.graph_objects as go
+        from plotly import offline
+        from plotly.subplots import make_subplots
+
+        columns = 2 if slowest_tasks else 1
+        fig = make_subplots(rows=1, cols=columns, subplot_titles=('Distribution', 'Slowest Tasks')[:columns])
 
         fig.add_trace(go.Bar(
-            y=task_names,
-            x=task_durations,
-            orientation='h',
+            x=bin_labels,
+            y=bin_counts,
             marker=dict(color='blue'),
-        ))
+            name='Tasks',
+        ), row=1, col=1)
+        fig.update_xaxes(title_text='Duration (Days)', type='category', row=1, col=1)
+        fig.update_yaxes(title_text='Task Count', row=1, col=1)
+
+        if slowest_tasks:
+            task_names, task_durations = zip(*slowest_tasks)
+
+            fig.add_trace(go.Bar(
+                y=task_names,
+                x=task_durations,
+                orientation='h',
+                marker=dict(color='blue'),
+                name='Duration',
+            ), row=1, col=2)
+            fig.update_xaxes(title_text='Duration (Days)', row=1, col=2)
+            fig.update_yaxes(autorange='reversed', row=1, col=2)
 
         fig.update_layout(
-            xaxis_title='Duration (Days)',
-            yaxis_title='Task',
+            title_text=' | '.join(f'{label}: {days} days' for label, days in percentiles),
+            showlegend=False,
         )
 
         chart_html = offline.plot(fig, auto_open=False, output_type='div')
@@ -102,6 +371,9 @@ class PlotGenerator:
         - bar_chart_html (str): HTML string containing the generated grouped bar chart.
         - pie_chart_html (str): HTML string containing the generated pie chart.
         """
+        import plotly.graph_objects as go
+        from plotly import offline
+
         bar_fig = go.Figure(data=[
             go.Bar(name='Completed Tasks', text=completed_tasks, x=assignees, y=completed_tasks),
         ])
@@ -115,4 +387,10 @@ class PlotGenerator:
         pie_fig = go.Figure(data=go.Pie(labels=assignees, values=completed_tasks))
         pie_chart_html = offline.plot(pie_fig, auto_open=False, output_type='div')
 
-        return bar_chart_html, pie_chart_html
\ No newline at end of file
+        return bar_chart_html, pie_chart_html
+
+# Chart rendering backends selectable with the PLOT_BACKEND and PLOT_BACKEND_OVERRIDES settings
+PLOT_BACKENDS = {
+    'plotly': PlotGenerator,
+    'svg': SvgPlotGenerator,
+}
@@ -0,0 +1,303 @@
+import math
+from html import escape
+
+WIDTH = 640
+HEIGHT = 320
+MARGIN_LEFT = 60
+MARGIN_RIGHT = 20
+MARGIN_TOP = 30
+MARGIN_BOTTOM = 60
+LABEL_LENGTH = 14
+
+# Plotly's default color sequence, so both backends look alike
+COLORS = ('#636efa', '#ef553b', '#00cc96', '#ab63fa', '#ffa15a', '#19d3f3', '#ff6692', '#b6e880', '#ff97ff', '#fecb52')
+
+def shorten(label, length=LABEL_LENGTH):
+    """
+    Shorten a label to fit under a bar.
+
+    Args:
+    - label: The label, converted to a string.
+    - length (int): Maximum number of characters.
+
+    Returns:
+    - str: The label, ellipsized when too long.
+    """
+    label = str(label)
+
+    return label if len(label) <= length else label[:length - 1] + '…'
+
+def nice_ticks(maximum, count=5):
+    """
+    Return evenly spaced integer ticks covering a value range starting at zero.
+
+    Args:
+    - maximum (float): The largest value to cover.
+    - count (int): The approximate number of ticks.
+
+    Returns:
+    - list: The tick values.
+    """
+    step = max(1, math.ceil(maximum / count))
+
+    return list(range(0, int(maximum) + step + 1, step)) if maximum > 0 else [0, 1]
+
+def svg_document(body, width=WIDTH, height=HEIGHT, title=None):
+    """
+    Wrap SVG elements in a standalone, responsive SVG document.
+
+    Args:
+    - body (list): SVG element strings.
+    - width, height (int): The viewBox size.
+    - title (str): Optional title drawn at the top.
+
+    Returns:
+    - str: The SVG markup.
+    """
+    if title:
+        body = [f'<text x="{width / 2}" y="18" text-anchor="middle" font-weight="bold">{escape(title)}</text>'] + body
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" width="100%" '
+        f'font-family="sans-serif" font-size="11" role="img">{"".join(body)}</svg>'
+    )
+
+class SvgPlotGenerator:
+    """
+    A class for generating small static SVG charts, with the same methods and inputs as PlotGenerator.
+
+    The charts are not interactive but weigh a few KB and render in microseconds, which suits
+    simple charts on busy pages.
+
+    Methods:
+    - generate_task_per_day(dates, counts): Generate a line chart representing tasks per day.
+    - generate_task_by_status(status, counts): Generate a pie chart representing tasks by status.
+    - generate_task_duration(bin_labels, bin_counts, percentiles, slowest_tasks): Generate a histogram
+      of task durations with percentiles and the slowest tasks.
+    - generate_assignee_productivity(assignees, completed_tasks): Generate bar and pie charts
+      representing assignee productivity based on completed tasks.
+    """
+    def _axes(self, ticks, scale, x_title, y_title, width=WIDTH, height=HEIGHT):
+        """
+        Draw the value axis grid and the axis titles of a vertical chart.
+
+        Args:
+        - ticks (list): The value ticks.
+        - scale (callable): Maps a value to its y coordinate.
+        - x_title, y_title (str): The axis titles.
+        - width, height (int): The chart size.
+
+        Returns:
+        - list: SVG element strings.
+        """
+        elements = []
+
+        for tick in ticks:
+            y = scale(tick)
+            elements.append(f'<line x1="{MARGIN_LEFT}" y1="{y:.1f}" x2="{width - MARGIN_RIGHT}" y2="{y:.1f}" stroke="#e5ecf6"/>')
+            elements.append(f'<text x="{MARGIN_LEFT - 6}" y="{y + 4:.1f}" text-anchor="end">{tick}</text>')
+
+        elements.append(f'<text x="{(MARGIN_LEFT + width - MARGIN_RIGHT) / 2}" y="{height - 8}" text-anchor="middle">{escape(x_title)}</text>')
+        elements.append(
+            f'<text x="14" y="{(MARGIN_TOP + height - MARGIN_BOTTOM) / 2}" text-anchor="middle" '
+            f'transform="rotate(-90 14 {(MARGIN_TOP + height - MARGIN_BOTTOM) / 2})">{escape(y_title)}</text>'
+        )
+
+        return elements
+
+    def _bar_chart(self, labels, values, x_title, y_title, title=None):
+        """
+        Generate a vertical bar chart.
+
+        Args:
+        - labels (list): The bar labels.
+        - values (list): The bar values.
+        - x_title, y_title (str): The axis titles.
+        - title (str): Optional chart title.
+
+        Returns:
+        - str: The SVG markup.
+        """
+        ticks = nice_ticks(max(values, default=0))
+        plot_height = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+        plot_width = WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+        scale = lambda value: HEIGHT - MARGIN_BOTTOM - value / ticks[-1] * plot_height
+
+        elements = self._axes(ticks, scale, x_title, y_title)
+        slot = plot_width / max(len(values), 1)
+
+        for index, (label, value) in enumerate(zip(labels, values)):
+            x = MARGIN_LEFT + index * slot + slot * 0.1
+            y = scale(value)
+            elements.append(
+                f'<rect x="{x:.1f}" y="{y:.1f}" width="{slot * 0.8:.1f}" height="{HEIGHT - MARGIN_BOTTOM - y:.1f}" '
+                f'fill="{COLORS[0]}"><title>{escape(str(label))}: {value}</title></rect>'
+            )
+            elements.append(
+                f'<text x="{x + slot * 0.4:.1f}" y="{HEIGHT - MARGIN_BOTTOM + 14}" text-anchor="middle">{escape(shorten(label))}</text>'
+            )
+
+        return svg_document(elements, title=title)
+
+    def _horizontal_bar_chart(self, labels, values, x_title):
+        """
+        Generate a horizontal bar chart, first label on top.
+
+        Args:
+        - labels (list): The bar labels.
+        - values (list): The bar values.
+        - x_title (str): The value axis title.
+
+        Returns:
+        - str: The SVG markup.
+        """
+        left = 140
+        row = 22
+        height = MARGIN_TOP + row * len(values) + 40
+        plot_width = WIDTH - left - MARGIN_RIGHT
+        maximum = max(values, default=0) or 1
+
+        elements = [f'<text x="{(left + WIDTH - MARGIN_RIGHT) / 2}" y="{height - 8}" text-anchor="middle">{escape(x_title)}</text>']
+
+        for index, (label, value) in enumerate(zip(labels, values)):
+            y = MARGIN_TOP + index * row
+            elements.append(
+                f'<rect x="{left}" y="{y + 3}" width="{value / maximum * plot_width:.1f}" height="{row - 6}" '
+                f'fill="{COLORS[0]}"><title>{escape(str(label))}: {value}</title></rect>'
+            )
+            elements.append(f'<text x="{left - 6}" y="{y + row / 2 + 4}" text-anchor="end">{escape(shorten(label, 22))}</text>')
+            elements.append(f'<text x="{left + value / maximum * plot_width + 4:.1f}" y="{y + row / 2 + 4}">{value}</text>')
+
+        return svg_document(elements, height=height, title='Slowest Tasks')
+
+    def _pie_chart(self, labels, values):
+        """
+        Generate a pie chart with a legend.
+
+        Args:
+        - labels (list): The slice labels.
+        - values (list): The slice values.
+
+        Returns:
+        - str: The SVG markup.
+        """
+        total = sum(values)
+        cx, cy, radius = HEIGHT / 2, HEIGHT / 2, HEIGHT / 2 - 20
+        elements = []
+        angle = -math.pi / 2
+
+        for index, (label, value) in enumerate(zip(labels, values)):
+            color = COLORS[index % len(COLORS)]
+            tooltip = f'<title>{escape(str(label))}: {value} ({value / total:.1%})</title>' if total else ''
+
+            if total and value == total:
+                elements.append(f'<circle cx="{cx}" cy="{cy}" r="{radius}" fill="{color}">{tooltip}</circle>')
+            elif total and value:
+                end = angle + value / total * 2 * math.pi
+                large_arc = 1 if end - angle > math.pi else 0
+                elements.append(
+                    f'<path d="M{cx},{cy} L{cx + radius * math.cos(angle):.2f},{cy + radius * math.sin(angle):.2f} '
+                    f'A{radius},{radius} 0 {large_arc} 1 {cx + radius * math.cos(end):.2f},{cy + radius * math.sin(end):.2f} Z" '
+                    f'fill="{color}" stroke="#fff">{tooltip}</path>'
+                )
+                angle = end
+
+            legend_y = 30 + index * 18
+            elements.append(f'<rect x="{HEIGHT + 20}" y="{legend_y - 10}" width="12" height="12" fill="{color}"/>')
+            elements.append(
+                f'<text x="{HEIGHT + 38}" y="{legend_y}">{escape(shorten(label, 30))} ({value}'
+                f'{f", {value / total:.1%}" if total else ""})</text>'
+            )
+
+        return svg_document(elements)
+
+    def generate_task_per_day(self, dates, counts):
+        """
+        Generate a line chart representing tasks per day.
+
+        Args:
+        - dates (list): List of dates.
+        - counts (list): List of corresponding task counts.
+
+        Returns:
+        - chart_html (str): SVG string containing the generated chart.
+        """
+        points = sorted(zip(dates, counts))
+        ticks = nice_ticks(max(counts, default=0))
+        plot_height = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+        plot_width = WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+        scale = lambda value: HEIGHT - MARGIN_BOTTOM - value / ticks[-1] * plot_height
+
+        elements = self._axes(ticks, scale, 'Date', 'Task Count')
+
+        if points:
+            first, last = points[0][0], points[-1][0]
+            span = max((last - first).days, 1)
+            x_of = lambda day: MARGIN_LEFT + ((day - first).days / span if last != first else 0.5) * plot_width
+            coordinates = [(x_of(day), scale(count)) for day, count in points]
+
+            elements.append(
+                f'<polyline fill="none" stroke="{COLORS[0]}" stroke-width="2" '
+                f'points="{" ".join(f"{x:.1f},{y:.1f}" for x, y in coordinates)}"/>'
+            )
+
+            for (x, y), (day, count) in zip(coordinates, points):
+                elements.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="{COLORS[0]}"><title>{day:%Y-%m-%d}: {count}</title></circle>')
+
+            for day in sorted({first, points[len(points) // 2][0], last}):
+                elements.append(f'<text x="{x_of(day):.1f}" y="{HEIGHT - MARGIN_BOTTOM + 14}" text-anchor="middle">{day:%Y-%m-%d}</text>')
+
+        return svg_document(elements)
+
+    def generate_task_by_status(self, status, counts):
+        """
+        Generate a pie chart representing tasks by status.
+
+        Args:
+        - status (list): List of status labels.
+        - counts (list): List of corresponding task counts.
+
+        Returns:
+        - chart_html (str): SVG string containing the generated chart.
+        """
+        return self._pie_chart(status, counts)
+
+    def generate_task_duration(self, bin_labels, bin_counts, percentiles, slowest_tasks=()):
+        """
+        Generate a histogram of task durations, titled with percentiles and optionally
+        followed by a horizontal bar chart of the slowest tasks.
+
+        Args:
+        - bin_labels (list): Labels of the duration bins (in days).
+        - bin_counts (list): Number of tasks in each bin.
+        - percentiles (list): (label, days) pairs, e.g. [('p50', 3), ('p90', 12)].
+        - slowest_tasks (list): (task name, days) pairs of the slowest tasks.
+
+        Returns:
+        - chart_html (str): SVG string containing the generated charts.
+        """
+        title = ' | '.join(f'{label}: {days} days' for label, days in percentiles)
+        chart_html = self._bar_chart(bin_labels, bin_counts, 'Duration (Days)', 'Task Count', title=title)
+
+        if slowest_tasks:
+            task_names, task_durations = zip(*slowest_tasks)
+            chart_html += self._horizontal_bar_chart(task_names, task_durations, 'Duration (Days)')
+
+        return chart_html
+
+    def generate_assignee_productivity(self, assignees, completed_tasks):
+        """
+        Generate bar and pie charts representing assignee productivity based on completed tasks.
+
+        Args:
+        - assignees (list): List of assignees.
+        - completed_tasks (list): List of completed task counts for each assignee.
+
+        Returns:
+        - bar_chart_html (str): SVG string containing the generated bar chart.
+        - pie_chart_html (str): SVG string containing the generated pie chart.
+        """
+        bar_chart_html = self._bar_chart(assignees, completed_tasks, 'Assignee', 'Count')
+        pie_chart_html = self._pie_chart(assignees, completed_tasks)
+
+        return bar_chart_html, pie_chart_html
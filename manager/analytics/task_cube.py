@@ -0,0 +1,262 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from manager.models import ArchivedTask, DailyTaskCount, Task
+
+DIMENSIONS = ('user_id', 'status_id', 'priority_id', 'assignee_id')
+
+def task_state(task):
+    """
+    Return the cube dimensions and days a task contributes to.
+
+    Args:
+    - task: A Task instance, or a dict of its field values as returned by QuerySet.values().
+
+    Returns:
+    - tuple: (user_id, status_id, priority_id, assignee_id, created day, completed day or None).
+    """
+    get = task.get if isinstance(task, dict) else lambda name: getattr(task, name)
+    completed_at = get('completed_at') if get('completed') else None
+
+    # mark_completed_task assigns a datetime to the DateField, keep the date part only
+    if isinstance(completed_at, datetime):
+        completed_at = completed_at.date()
+
+    return tuple(get(name) for name in DIMENSIONS) + (get('created_at'), completed_at)
+
+def load_task_state(task_id, using=None):
+    """
+    Load the cube contribution of a task as currently stored in the database.
+
+    Args:
+    - task_id (int): The primary key of the task.
+    - using (str): The database alias.
+
+    Returns:
+    - tuple: The task state, see task_state, or None for a task that is not saved yet.
+    """
+    row = Task.objects.using(using).filter(pk=task_id).values(
+        *DIMENSIONS, 'created_at', 'completed', 'completed_at',
+    ).first()
+
+    return task_state(row) if row is not None else None
+
+def state_deltas(state, sign):
+    """
+    Return the count changes a task state contributes.
+
+    Args:
+    - state (tuple): A task state, see task_state.
+    - sign (int): 1 to add the task to the cube, -1 to remove it.
+
+    Returns:
+    - dict: [created, completed] count changes keyed by cube row dimensions.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+
+    if state is None:
+        return deltas
+
+    user_id, status_id, priority_id, assignee_id, created_day, completed_day = state
+    dimensions = (user_id, status_id, priority_id, assignee_id)
+
+    deltas[dimensions + (created_day,)][0] += sign
+
+    if completed_day is not None:
+        deltas[dimensions + (completed_day,)][1] += sign
+
+    return deltas
+
+def apply_deltas(deltas, using=None):
+    """
+    Add count changes to the cube rows, creating missing rows.
+
+    Args:
+    - deltas (dict): [created, completed] count changes keyed by
+      (user_id, status_id, priority_id, assignee_id, day).
+    - using (str): The database alias.
+    """
+    for (user_id, status_id, priority_id, assignee_id, day), (created, completed) in deltas.items():
+        if created == 0 and completed == 0:
+            continue
+
+        key = dict(user_id=user_id, status_id=status_id, priority_id=priority_id, assignee_id=assignee_id, day=day)
+        rows = DailyTaskCount.objects.using(using).filter(**key)
+
+        if rows.update(created_count=F('created_count') + created, completed_count=F('completed_count') + completed):
+            continue
+
+        try:
+            with transaction.atomic(using=using):
+                DailyTaskCount.objects.using(using).create(**key, created_count=created, completed_count=completed)
+        except IntegrityError:
+            # Created concurrently since the update, add to it instead
+            rows.update(created_count=F('created_count') + created, completed_count=F('completed_count') + completed)
+
+def record_task_change(old_state, new_state, using=None):
+    """
+    Move a task's contribution in the cube from its old state to its new one.
+
+    Args:
+    - old_state (tuple): The task state before the write, None for a new task.
+    - new_state (tuple): The task state after the write, None for a deleted task.
+    - using (str): The database alias.
+    """
+    if old_state == new_state:
+        return
+
+    deltas = state_deltas(old_state, -1)
+
+    for key, (created, completed) in state_deltas(new_state, 1).items():
+        deltas[key][0] += created
+        deltas[key][1] += completed
+
+    apply_deltas(deltas, using=using)
+
+def rebuild(tasks=None, using=None, batch_size=1000):
+    """
+    Recompute the cube rows from the tasks and the archived tasks.
+
+    Args:
+    - tasks (QuerySet): Every task of the owners whose rows are rebuilt, all the tasks by default.
+      The archived tasks of the same owners are counted too.
+    - using (str): The database alias.
+    - batch_size (int): Number of rows inserted per query.
+
+    Returns:
+    - int: The number of cube rows written.
+    """
+    stale_rows = DailyTaskCount.objects.using(using if tasks is None else tasks.db)
+
+    if tasks is None:
+        tasks = Task.objects.using(using).all()
+        archived_tasks = ArchivedTask.objects.using(using).all()
+    else:
+        stale_rows = stale_rows.filter(user__in=tasks.order_by().values('user_id'))
+        archived_tasks = ArchivedTask.objects.using(tasks.db).filter(user__in=tasks.order_by().values('user_id'))
+
+    counts = defaultdict(lambda: [0, 0])
+
+    for source in (tasks, archived_tasks):
+        for row in source.order_by().values(*DIMENSIONS, 'created_at').annotate(count=Count('id')):
+            counts[tuple(row[name] for name in DIMENSIONS) + (row['created_at'],)][0] += row['count']
+
+        completed = source.filter(completed=True, completed_at__isnull=False)
+        for row in completed.order_by().values(*DIMENSIONS, 'completed_at').annotate(count=Count('id')):
+            counts[tuple(row[name] for name in DIMENSIONS) + (row['completed_at'],)][1] += row['count']
+
+    rows = [
+        DailyTaskCount(
+            user_id=user_id, status_id=status_id, priority_id=priority_id, assignee_id=assignee_id, day=day,
+            created_count=created, completed_count=completed,
+        )
+        for (user_id, status_id, priority_id, assignee_id, day), (created, completed) in counts.items()
+    ]
+
+    with transaction.atomic(using=tasks.db):
+        stale_rows.delete()
+        DailyTaskCount.objects.using(tasks.db).bulk_create(rows, batch_size=batch_size)
+
+    return len(rows)
+
+def slice_cube(user, status=None, priority=None, assignee=None, start=None, end=None):
+    """
+    Select the cube rows of the tasks visible to a user, narrowed by dashboard filters.
+
+    Args:
+    - user: The user owning or assigned to the tasks.
+    - status, priority, assignee: Optional ids the rows must match.
+    - start, end (date): Optional inclusive range of creation or completion days.
+
+    Returns:
+    - QuerySet: The matching DailyTaskCount rows.
+    """
+    rows = DailyTaskCount.objects.filter(Q(user=user) | Q(assignee=user))
+
+    if status:
+        rows = rows.filter(status=status)
+    if priority:
+        rows = rows.filter(priority=priority)
+    if assignee:
+        rows = rows.filter(assignee=assignee)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+
+    return rows
+
+def get_task_counts(rows):
+    """
+    Count the total and the completed tasks of a cube slice.
+
+    Args:
+    - rows (QuerySet): A slice of DailyTaskCount rows.
+
+    Returns:
+    - tuple: The number of tasks and the number of completed tasks.
+    """
+    totals = rows.aggregate(total_tasks=Sum('created_count'), total_completed=Sum('completed_count'))
+
+    return totals['total_tasks'] or 0, totals['total_completed'] or 0
+
+def get_task_per_day_data(rows):
+    """
+    Count completed tasks per day over the last 30 days from a cube slice.
+
+    Args:
+    - rows (QuerySet): A slice of DailyTaskCount rows.
+
+    Returns:
+    - tuple: A list of dates and a list of the corresponding completed task counts.
+    """
+    today = datetime.now().date()
+    start_date = today - timedelta(days=30)
+
+    task_counts = rows.filter(day__gte=start_date, day__lte=today).values('day').annotate(
+        count=Sum('completed_count'),
+    ).filter(count__gt=0).order_by('day')
+
+    dates = [entry['day'] for entry in task_counts]
+    counts = [entry['count'] for entry in task_counts]
+
+    return dates, counts
+
+def get_task_by_status_data(rows):
+    """
+    Count tasks for each status from a cube slice.
+
+    Args:
+    - rows (QuerySet): A slice of DailyTaskCount rows.
+
+    Returns:
+    - tuple: A list of status names and a list of the corresponding task counts.
+    """
+    task_status_counts = rows.values('status__name').annotate(count=Sum('created_count')).filter(count__gt=0)
+
+    status = [entry['status__name'] for entry in task_status_counts]
+    counts = [entry['count'] for entry in task_status_counts]
+
+    return status, counts
+
+def get_assignee_productivity_data(rows):
+    """
+    Count completed tasks for each assignee from a cube slice.
+
+    Args:
+    - rows (QuerySet): A slice of DailyTaskCount rows.
+
+    Returns:
+    - tuple: A list of assignee usernames and a list of the corresponding completed task counts.
+    """
+    results = rows.values('assignee__username').annotate(
+        completed_tasks=Sum('completed_count'),
+    ).filter(completed_tasks__gt=0)
+
+    assignees = [entry['assignee__username'] for entry in results]
+    completed_tasks = [entry['completed_tasks'] for entry in results]
+
+    return assignees, completed_tasks
@@ -0,0 +1,289 @@
+import numpy as np
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import F, Func, IntegerField, Value
+from django.db.models.functions import Coalesce
+
+TASK_COLUMNS = ('created_at', 'completed_at', 'due_date', 'status_id', 'priority_id', 'assignee_id')
+DATE_COLUMNS = ('created_at', 'completed_at', 'due_date')
+
+CYCLE_TIME_PERCENTILES = (50, 75, 90, 95, 99)
+
+# 1970-01-05, the first Monday after the numpy epoch, weeks start on Mondays
+EPOCH_MONDAY = 4
+
+# Stands for NULL in the integer columns fetched from the database
+MISSING = -(2 ** 31)
+
+class EpochDays(Func):
+    """
+    Number of days between a date and 1970-01-01, computed by the database.
+    """
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template="CAST(julianday(%(expressions)s) - 2440587.5 AS INTEGER)",
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="(%(expressions)s - DATE '1970-01-01')", **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="DATEDIFF(%(expressions)s, '1970-01-01')", **extra_context)
+
+def load_task_columns(tasks):
+    """
+    Load the columns needed by TaskMetrics in a single query.
+
+    The database returns every column as an integer (dates as days since the epoch, NULL as
+    MISSING), so rows skip model and date conversion and are turned into numpy arrays in C.
+
+    Args:
+    - tasks (QuerySet): A queryset of Task objects.
+
+    Returns:
+    - dict: A numpy array per column name of TASK_COLUMNS. Dates are datetime64[D] arrays with NaT
+      for missing values, ids are int64 arrays with -1 for missing values.
+    """
+    columns = {
+        f'_{name}': Coalesce(
+            EpochDays(F(name)) if name in DATE_COLUMNS else F(name), Value(MISSING), output_field=IntegerField()
+        )
+        for name in TASK_COLUMNS
+    }
+    try:
+        sql, params = tasks.order_by().annotate(**columns).values_list(*columns).query.sql_with_params()
+    except EmptyResultSet:
+        # e.g. tasks.none(), no query to run
+        rows = np.empty((0, len(TASK_COLUMNS)), dtype=np.int64)
+    else:
+        with connections[tasks.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, len(TASK_COLUMNS))
+
+    arrays = {}
+
+    for index, name in enumerate(TASK_COLUMNS):
+        values = rows[:, index]
+        missing = values == MISSING
+
+        if name in DATE_COLUMNS:
+            values = values.astype('datetime64[D]')
+            values[missing] = np.datetime64('NaT')
+        else:
+            values = np.where(missing, -1, values)
+
+        arrays[name] = values
+
+    return arrays
+
+class TaskMetrics:
+    """
+    Vectorized cycle time, on-time completion, throughput and work in progress metrics.
+
+    Attributes:
+    - created_at: ndarray - Creation dates.
+    - completed_at: ndarray - Completion dates, NaT for open tasks.
+    - due_date: ndarray - Due dates.
+    - status_id, priority_id, assignee_id: ndarray - Foreign key ids.
+
+    Methods:
+    - from_queryset(*tasks): Build the metrics from querysets of tasks.
+    - cycle_time_distribution(bins): Cycle time percentiles, mean and histogram.
+    - on_time_completion_rate(): Share of completed tasks completed by their due date.
+    - weekly_throughput(weeks, today): Tasks completed per week.
+    - wip_trend(weeks, today): Open tasks at the end of each week.
+    - open_tasks_by(column): Open tasks per status, priority or assignee.
+    - summary(weeks, bins, today): All of the above as a JSON serializable dict.
+    """
+    def __init__(self, created_at, completed_at, due_date, status_id, priority_id, assignee_id):
+        self.created_at = created_at
+        self.completed_at = completed_at
+        self.due_date = due_date
+        self.status_id = status_id
+        self.priority_id = priority_id
+        self.assignee_id = assignee_id
+        self.is_completed = ~np.isnat(completed_at)
+
+    @classmethod
+    def from_queryset(cls, *tasks):
+        """
+        Build the metrics from querysets of tasks.
+
+        Args:
+        - *tasks (QuerySet): Querysets of Task or ArchivedTask objects, or FanOutQuerySets (see
+          manager.sharding), loaded one after the other.
+
+        Returns:
+        - TaskMetrics: The metrics of the tasks.
+        """
+        querysets = [queryset for fanned_out in tasks for queryset in getattr(fanned_out, 'querysets', [fanned_out])]
+
+        if len(querysets) == 1:
+            return cls(**load_task_columns(querysets[0]))
+
+        columns = [load_task_columns(queryset) for queryset in querysets]
+
+        return cls(**{name: np.concatenate([loaded[name] for loaded in columns]) for name in TASK_COLUMNS})
+
+    def cycle_times(self):
+        """
+        Return the cycle time of every completed task.
+
+        Returns:
+        - ndarray: Cycle times in days. A task completed on the day it was created lasted one day.
+        """
+        return (self.completed_at[self.is_completed] - self.created_at[self.is_completed]).astype(np.int64) + 1
+
+    def cycle_time_distribution(self, bins):
+        """
+        Summarize the cycle time distribution of completed tasks.
+
+        Args:
+        - bins (tuple): Increasing lower bounds (in days) of the histogram bins, the last bin is open-ended.
+
+        Returns:
+        - dict: The number of completed tasks, mean cycle time, percentiles and histogram counts.
+        """
+        cycle_times = self.cycle_times()
+        edges = np.append(np.asarray(bins, dtype=np.int64), np.iinfo(np.int64).max)
+        histogram = np.histogram(cycle_times, bins=edges)[0] if cycle_times.size else np.zeros(len(bins), np.int64)
+
+        return {
+            'count': int(cycle_times.size),
+            'mean': float(cycle_times.mean()) if cycle_times.size else None,
+            'percentiles': {
+                f'p{percentile}': float(value)
+                for percentile, value in zip(
+                    CYCLE_TIME_PERCENTILES,
+                    np.percentile(cycle_times, CYCLE_TIME_PERCENTILES, method='inverted_cdf'),
+                )
+            } if cycle_times.size else {},
+            'bins': [int(lower) for lower in bins],
+            'histogram': histogram.tolist(),
+        }
+
+    def on_time_completion_rate(self):
+        """
+        Return the share of completed tasks completed on or before their due date.
+
+        Returns:
+        - float: A rate between 0 and 1, None when no task is completed.
+        """
+        if not self.is_completed.any():
+            return None
+
+        return float(np.mean(self.completed_at[self.is_completed] <= self.due_date[self.is_completed]))
+
+    @staticmethod
+    def _week_index(dates):
+        """
+        Return the index of the Monday starting week of each date.
+
+        Args:
+        - dates (ndarray): datetime64[D] dates without NaT.
+
+        Returns:
+        - ndarray: Week indexes counted from the first Monday after the numpy epoch.
+        """
+        return (dates.astype(np.int64) - EPOCH_MONDAY) // 7
+
+    def _week_starts(self, weeks, today):
+        """
+        Return the start dates and indexes of the last weeks, the current one included.
+
+        Args:
+        - weeks (int): Number of weeks.
+        - today (date): The reference day.
+
+        Returns:
+        - tuple: An array of week start dates and an array of week indexes.
+        """
+        current = self._week_index(np.array([today], dtype='datetime64[D]'))[0]
+        indexes = np.arange(current - weeks + 1, current + 1)
+        starts = (indexes * 7 + EPOCH_MONDAY).astype('datetime64[D]')
+
+        return starts, indexes
+
+    def weekly_throughput(self, weeks, today):
+        """
+        Count the tasks completed in each of the last weeks.
+
+        Args:
+        - weeks (int): Number of weeks, the current one included.
+        - today (date): The reference day.
+
+        Returns:
+        - tuple: A list of week start dates (ISO strings) and a list of completed task counts.
+        """
+        starts, indexes = self._week_starts(weeks, today)
+        offsets = self._week_index(self.completed_at[self.is_completed]) - indexes[0]
+        offsets = offsets[(offsets >= 0) & (offsets < weeks)]
+
+        return np.datetime_as_string(starts).tolist(), np.bincount(offsets, minlength=weeks).tolist()
+
+    def wip_trend(self, weeks, today):
+        """
+        Count the open tasks at the end of each of the last weeks.
+
+        A task is in progress at a given day when it was created on or before it and not completed by then.
+
+        Args:
+        - weeks (int): Number of weeks, the current one included.
+        - today (date): The reference day.
+
+        Returns:
+        - tuple: A list of week start dates (ISO strings) and a list of open task counts.
+        """
+        starts, _ = self._week_starts(weeks, today)
+        ends = starts + np.timedelta64(6, 'D')
+
+        created = np.searchsorted(np.sort(self.created_at), ends, side='right')
+        completed = np.searchsorted(np.sort(self.completed_at[self.is_completed]), ends, side='right')
+
+        return np.datetime_as_string(starts).tolist(), (created - completed).tolist()
+
+    def open_tasks_by(self, column):
+        """
+        Count the open tasks for each value of a foreign key column.
+
+        Args:
+        - column (str): One of 'status_id', 'priority_id' or 'assignee_id'.
+
+        Returns:
+        - dict: Open task counts keyed by id.
+        """
+        ids, counts = np.unique(getattr(self, column)[~self.is_completed], return_counts=True)
+
+        return dict(zip(ids.tolist(), counts.tolist()))
+
+    def summary(self, weeks, bins, today):
+        """
+        Compute every metric.
+
+        Args:
+        - weeks (int): Number of weeks of the throughput and work in progress trends.
+        - bins (tuple): Lower bounds (in days) of the cycle time histogram bins.
+        - today (date): The reference day.
+
+        Returns:
+        - dict: A JSON serializable summary of the metrics.
+        """
+        week_starts, throughput = self.weekly_throughput(weeks, today)
+        _, wip = self.wip_trend(weeks, today)
+
+        return {
+            'tasks': int(self.created_at.size),
+            'completed': int(self.is_completed.sum()),
+            'cycle_time': self.cycle_time_distribution(bins),
+            'on_time_completion_rate': self.on_time_completion_rate(),
+            'weeks': week_starts,
+            'weekly_throughput': throughput,
+            'wip': wip,
+            'open_by_status': self.open_tasks_by('status_id'),
+            'open_by_priority': self.open_tasks_by('priority_id'),
+            'open_by_assignee': self.open_tasks_by('assignee_id'),
+        }
@@ -6,4 +6,16 @@ class ManagerConfig(AppConfig):
     name = 'manager'
 
     def ready(self):
+        from django.conf import settings
+
         from . import signals
+
+        if getattr(settings, 'PLOT_PRELOAD', False):
+            from .analytics.plot_generator import preload
+
+            preload()
+
+        if getattr(settings, 'PLOT_RENDER_WORKERS', 0) > 1:
+            from .analytics.plot_generator import get_render_pool
+
+            get_render_pool()
@@ -0,0 +1,165 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connections
+
+from .database import run_write
+from .models import ArchivedComment, ArchivedTask, Comment, Task
+from .sharding import data_aliases, shard_for_id
+from .versions import bump_data_versions_on_commit
+
+# Columns copied as is from the live tables to the archive tables, see archive_batch
+TASK_COLUMNS = [field.column for field in Task._meta.concrete_fields if not field.primary_key]
+COMMENT_COLUMNS = [field.column for field in Comment._meta.concrete_fields if not field.primary_key and field.name != 'task']
+
+def archivable_tasks(days=None, today=None, using=None):
+    """
+    Return the tasks old enough to be archived.
+
+    Args:
+    - days (int): Number of days since completion after which tasks are archived. Defaults to
+      the ARCHIVE_AFTER_DAYS setting.
+    - today (date): The current date, defaults to today.
+    - using (str): The database alias.
+
+    Returns:
+    - QuerySet: The tasks completed more than days ago.
+    """
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = (today or date.today()) - timedelta(days=days)
+
+    return Task.objects.using(using).filter(completed=True, completed_at__lt=cutoff)
+
+def archive_batch(tasks, batch_size, today):
+    """
+    Move a batch of tasks, with their tag links and comments, to the archive tables.
+
+    Rows are moved with INSERT ... SELECT and DELETE statements: no model is loaded and no
+    signal is sent, so the daily task counts keep counting the archived tasks. Archived rows get
+    new ids, archived tasks keep the id of their task in original_id. The data versions of the
+    owners and assignees are bumped.
+
+    Args:
+    - tasks (QuerySet): The archivable tasks, see archivable_tasks.
+    - batch_size (int): Maximum number of tasks moved.
+    - today (date): The archival date.
+
+    Returns:
+    - int: The number of tasks moved.
+    """
+    ids = [*tasks.order_by('pk').values_list('pk', flat=True)[:batch_size]]
+
+    if not ids:
+        return 0
+
+    users = {user_id for pair in tasks.filter(pk__in=ids).values_list('user_id', 'assignee_id').distinct() for user_id in pair}
+    connection = connections[tasks.db]
+    quote = connection.ops.quote_name
+    columns = lambda names, prefix='': ', '.join(prefix + quote(name) for name in names)
+    placeholders = ', '.join(['%s'] * len(ids))
+    task, archived_task = quote(Task._meta.db_table), quote(ArchivedTask._meta.db_table)
+    task_tags, archived_task_tags = quote(Task.tags.through._meta.db_table), quote(ArchivedTask.tags.through._meta.db_table)
+    comment, archived_comment = quote(Comment._meta.db_table), quote(ArchivedComment._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {archived_task} (original_id, {columns(TASK_COLUMNS)}, archived_at) "
+            f"SELECT id, {columns(TASK_COLUMNS)}, %s FROM {task} WHERE id IN ({placeholders})",
+            [today, *ids],
+        )
+        cursor.execute(
+            f"INSERT INTO {archived_task_tags} (archivedtask_id, tag_id) "
+            f"SELECT archived.id, links.tag_id FROM {task_tags} links "
+            f"INNER JOIN {archived_task} archived ON archived.original_id = links.task_id "
+            f"WHERE links.task_id IN ({placeholders})",
+            ids,
+        )
+        cursor.execute(
+            f"INSERT INTO {archived_comment} (task_id, {columns(COMMENT_COLUMNS)}) "
+            f"SELECT archived.id, {columns(COMMENT_COLUMNS, 'comments.')} FROM {comment} comments "
+            f"INNER JOIN {archived_task} archived ON archived.original_id = comments.task_id "
+            f"WHERE comments.task_id IN ({placeholders})",
+            ids,
+        )
+
+        # Children first, like the cascade of the foreign keys
+        cursor.execute(f'DELETE FROM {comment} WHERE task_id IN ({placeholders})', ids)
+        cursor.execute(f'DELETE FROM {task_tags} WHERE task_id IN ({placeholders})', ids)
+        cursor.execute(f'DELETE FROM {task} WHERE id IN ({placeholders})', ids)
+
+    bump_data_versions_on_commit(users, tasks.db)
+
+    return len(ids)
+
+def archive_tasks(days=None, batch_size=None, today=None, aliases=None):
+    """
+    Archive the tasks completed more than days ago, batch by batch.
+
+    Each batch is a transaction run through run_write, so the archival can run next to the
+    application and be interrupted at any time.
+
+    Args:
+    - days (int): Number of days since completion after which tasks are archived. Defaults to
+      the ARCHIVE_AFTER_DAYS setting.
+    - batch_size (int): Number of tasks moved per transaction. Defaults to the ARCHIVE_BATCH_SIZE setting.
+    - today (date): The current date, defaults to today.
+    - aliases (list): The databases archived, defaults to every database holding task data.
+
+    Yields:
+    - tuple: The database alias and the number of tasks moved, after each batch.
+    """
+    batch_size = settings.ARCHIVE_BATCH_SIZE if batch_size is None else batch_size
+    today = today or date.today()
+
+    for alias in data_aliases() if aliases is None else aliases:
+        tasks = archivable_tasks(days, today, alias)
+
+        while moved := run_write(archive_batch, tasks, batch_size, today, using=alias):
+            yield alias, moved
+
+def restore_task(archived):
+    """
+    Move an archived task, with its tag links and comments, back to the live tables.
+
+    The task gets its original id back, unless the owner's data moved to another shard since
+    the archival. Like the archival, no signal is sent: the task is restored as it was archived
+    and the daily task counts already count it, only the data versions of its owner and assignee
+    are bumped. Run it through run_write.
+
+    Args:
+    - archived (ArchivedTask): The archived task.
+
+    Returns:
+    - Task: The restored task.
+    """
+    using = archived._state.db
+    fields = [field.attname for field in Task._meta.concrete_fields if not field.primary_key]
+    task = Task(**{name: getattr(archived, name) for name in fields})
+
+    if shard_for_id(archived.original_id) == using and not Task.objects.using(using).filter(pk=archived.original_id).exists():
+        task.pk = archived.original_id
+
+    Task.objects.using(using).bulk_create([task])
+    # Inserting stamped created_at with the current date
+    Task.objects.using(using).filter(pk=task.pk).update(created_at=archived.created_at)
+    task.created_at = archived.created_at
+
+    Task.tags.through.objects.using(using).bulk_create([
+        Task.tags.through(task_id=task.pk, tag_id=tag_id)
+        for tag_id in archived.tags.values_list('pk', flat=True)
+    ])
+
+    comments = [*archived.comments.values('author_id', 'content', 'created_at')]
+    created = Comment.objects.using(using).bulk_create([
+        Comment(task_id=task.pk, author_id=comment['author_id'], content=comment['content']) for comment in comments
+    ])
+
+    for comment, values in zip(created, comments):
+        comment.created_at = values['created_at']
+
+    Comment.objects.using(using).bulk_update(created, ['created_at'])
+
+    archived.delete()
+    bump_data_versions_on_commit([task.user_id, task.assignee_id], using)
+
+    return task
@@ -0,0 +1,55 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The SQLite backend, with the 'init_command' and 'transaction_mode' options of Django 5.1
+    and connection health checks.
+
+    Options:
+    - init_command (str): Statements run on every new connection, separated by semicolons,
+      e.g. 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL'.
+    - transaction_mode (str): 'DEFERRED' (SQLite's default), 'IMMEDIATE' or 'EXCLUSIVE'. Immediate
+      transactions take the write lock when they begin, so a transaction reading then writing waits
+      for the busy timeout instead of failing with 'database is locked' when another connection writes.
+    - timeout (float): Seconds a statement waits for a lock before failing, see sqlite3.connect.
+    """
+    init_command = ''
+    transaction_mode = None
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.init_command = kwargs.pop('init_command', '')
+        self.transaction_mode = kwargs.pop('transaction_mode', None)
+
+        if self.transaction_mode is not None and self.transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}.")
+
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+
+        for statement in self.init_command.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode.upper()}')
+
+    def is_usable(self):
+        # The base backend always reports its connection usable, making CONN_HEALTH_CHECKS a no-op
+        try:
+            self.connection.execute('SELECT 1')
+        except (DatabaseError, base.Database.Error):
+            return False
+
+        return True
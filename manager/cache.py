@@ -0,0 +1,453 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import CacheEpoch
+
+# Alias of the cache shared by the workers in the CACHES setting
+SHARED_CACHE_ALIAS = 'shared'
+
+# Shared generation of every namespace, see invalidate_all
+GLOBAL_GENERATION_KEY = 'generation'
+
+_missing = object()
+_caches = {}
+_caches_lock = threading.Lock()
+_epoch = None
+_epoch_checked = 0
+
+def database_epoch():
+    """
+    Return the epoch of the default database, read at most every CACHE_GENERATION_CHECK_SECONDS.
+
+    Returns:
+    - int: The epoch, see manager.models.CacheEpoch, 0 before it is started.
+    """
+    global _epoch, _epoch_checked
+
+    now = time.monotonic()
+
+    if _epoch is None or now >= _epoch_checked + settings.CACHE_GENERATION_CHECK_SECONDS:
+        _epoch = CacheEpoch.objects.using(DEFAULT_DB_ALIAS).values_list('epoch', flat=True).first() or 0
+        _epoch_checked = now
+
+    return _epoch
+
+class LocalCache:
+    """
+    In-process cache bounded by entry count, and by total size when given one, evicting the
+    least recently used entries.
+
+    Attributes:
+    - max_entries: int - Maximum number of cached values.
+    - max_bytes: int - Maximum total size of the cached values, None for no bound.
+    - sizeof: callable - Returns the size of a value, required with max_bytes.
+    """
+    def __init__(self, max_entries, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return a cached value and mark it as recently used.
+
+        Args:
+        - key (str): The key.
+        - default: Returned when the key is missing or expired.
+
+        Returns:
+        - The cached value, or default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return default
+
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                return default
+
+            self._entries.move_to_end(key)
+
+            return entry[0]
+
+    def set(self, key, value, timeout, size=None):
+        """
+        Cache a value, evicting the least recently used ones when full.
+
+        Args:
+        - key (str): The key.
+        - value: The value.
+        - timeout (float): Seconds before the value expires, None to keep it until evicted.
+        - size (int): The size of the value when already known, computed with sizeof otherwise.
+        """
+        if self.max_bytes is not None:
+            size = self.sizeof(value) if size is None else size
+
+            if size > self.max_bytes:
+                return
+        else:
+            size = 0
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, None if timeout is None else time.monotonic() + timeout, size)
+            self._size += size
+
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        """
+        Remove an entry if present, the lock being held.
+        """
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._size -= entry[2]
+
+    def clear(self):
+        """
+        Remove every cached value.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+class TwoTierCache:
+    """
+    A namespace of cached values kept in a bounded in-process cache in front of the cache shared
+    by the workers (the 'shared' alias of the CACHES setting).
+
+    Keys carry the epoch of the database, which changes when its data versions restart, and the
+    generations of the namespace, stored in the shared cache: invalidating the
+    namespace moves it to a new generation, so every worker stops reading the older values once
+    it rereads the generations, at most CACHE_GENERATION_CHECK_SECONDS later, and they expire.
+    Values are best keyed on a version of what they are computed from (e.g. a data version),
+    invalidation is for changes no version tracks.
+
+    get_or_set computes a missing value once: the threads of a worker wait for the one computing
+    it, and the workers wait for the one holding its lock in the shared cache, up to
+    CACHE_LOCK_TIMEOUT seconds. The lock relies on cache.add, atomic with Redis or Memcached but
+    not with the file based cache, where concurrent workers may compute the same value.
+
+    Cached values are shared by the callers of a worker and must not be modified. Given a sizeof
+    function, the in-process tier can be bounded by total size, and values larger than
+    max_shared_bytes are only kept in process, each worker computing its own.
+
+    Attributes:
+    - namespace: str - Prefix of the keys.
+    - timeout: int - Expiration of the values in seconds, None to use the shared cache default.
+    - max_shared_bytes: int - Size above which values are not written to the shared cache, None for no bound.
+    - sizeof: callable - Returns the size of a value, required with max_bytes or max_shared_bytes.
+    - local: LocalCache - The in-process tier.
+    """
+    def __init__(self, namespace, max_entries=None, timeout=None, max_bytes=None, max_shared_bytes=None, sizeof=None):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.max_shared_bytes = max_shared_bytes
+        self.sizeof = sizeof
+        self.local = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES if max_entries is None else max_entries, max_bytes, sizeof)
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._generation = None
+        self._generation_checked = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """
+        The Django cache shared by the workers.
+        """
+        return caches[SHARED_CACHE_ALIAS]
+
+    @property
+    def local_timeout(self):
+        """
+        Expiration of the values in the in-process tier, the same as in the shared cache.
+        """
+        return self.shared.default_timeout if self.timeout is None else self.timeout
+
+    @property
+    def generation_key(self):
+        """
+        The key of the generation of the namespace in the shared cache.
+        """
+        return f'{self.namespace}:generation'
+
+    def generation(self):
+        """
+        Return the database epoch and the global and namespace generations, read from the shared
+        cache at most every CACHE_GENERATION_CHECK_SECONDS.
+
+        Missing generations start at the current time in nanoseconds, so a generation evicted
+        from the shared cache never comes back to a previous value.
+
+        Returns:
+        - tuple: The database epoch, the global and the namespace generations.
+        """
+        now = time.monotonic()
+
+        if self._generation is None or now >= self._generation_checked + settings.CACHE_GENERATION_CHECK_SECONDS:
+            keys = (GLOBAL_GENERATION_KEY, self.generation_key)
+            values = self.shared.get_many(keys)
+
+            for key in keys:
+                if key not in values:
+                    self.shared.add(key, time.time_ns(), None)
+                    values[key] = self.shared.get(key)
+
+            self._generation = (database_epoch(), *(values[key] for key in keys))
+            self._generation_checked = now
+
+        return self._generation
+
+    def make_key(self, key):
+        """
+        Return the key of a value in both tiers.
+
+        Args:
+        - key (str): The key within the namespace.
+
+        Returns:
+        - str: The namespaced key, including the current generations.
+        """
+        epoch, global_generation, generation = self.generation()
+
+        return f'{self.namespace}:{epoch}.{global_generation}.{generation}:{key}'
+
+    def get(self, key, default=None):
+        """
+        Return a cached value, from the in-process tier or else from the shared cache.
+
+        Args:
+        - key (str): The key within the namespace.
+        - default: Returned when the value is missing.
+
+        Returns:
+        - The cached value, or default.
+        """
+        full_key = self.make_key(key)
+        value = self.local.get(full_key, _missing)
+
+        if value is not _missing:
+            self.count('local_hits')
+            return value
+
+        value = self.shared.get(full_key, _missing)
+
+        if value is _missing:
+            self.count('misses')
+            return default
+
+        self.count('shared_hits')
+        self.local.set(full_key, value, self.local_timeout)
+
+        return value
+
+    def set(self, key, value):
+        """
+        Cache a value in both tiers, or only in process when larger than max_shared_bytes.
+
+        Args:
+        - key (str): The key within the namespace.
+        - value: The value, picklable.
+        """
+        full_key = self.make_key(key)
+        size = None if self.sizeof is None else self.sizeof(value)
+
+        if self.max_shared_bytes is None or size <= self.max_shared_bytes:
+            if self.timeout is None:
+                self.shared.set(full_key, value)
+            else:
+                self.shared.set(full_key, value, self.timeout)
+
+        self.local.set(full_key, value, self.local_timeout, size)
+
+    def get_or_set(self, key, compute):
+        """
+        Return a cached value, computing and caching it once when missing.
+
+        Args:
+        - key (str): The key within the namespace.
+        - compute (callable): Computes the value, taking no argument. Must not use the same key.
+
+        Returns:
+        - The cached or computed value.
+        """
+        value = self.get(key, _missing)
+
+        if value is not _missing:
+            return value
+
+        with self._lock:
+            pending = self._pending.get(key)
+
+            if pending is None:
+                pending = self._pending[key] = threading.Event()
+                computing = True
+            else:
+                computing = False
+
+        if not computing:
+            pending.wait(settings.CACHE_LOCK_TIMEOUT)
+            value = self.get(key, _missing)
+
+            # The computing thread failed or is too slow
+            return compute() if value is _missing else value
+
+        try:
+            return self._compute_once(key, compute)
+        finally:
+            with self._lock:
+                del self._pending[key]
+
+            pending.set()
+
+    def _compute_once(self, key, compute):
+        """
+        Compute a missing value under its lock in the shared cache, or wait for the worker
+        holding the lock to cache it, see get_or_set.
+        """
+        lock_key = f'{self.make_key(key)}:lock'
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+        locked = self.shared.add(lock_key, True, settings.CACHE_LOCK_TIMEOUT)
+
+        while not locked and time.monotonic() < deadline:
+            time.sleep(settings.CACHE_LOCK_POLL_SECONDS)
+            value = self.get(key, _missing)
+
+            if value is not _missing:
+                return value
+
+            locked = self.shared.add(lock_key, True, settings.CACHE_LOCK_TIMEOUT)
+
+        try:
+            value = compute()
+            self.set(key, value)
+
+            return value
+        finally:
+            if locked:
+                self.shared.delete(lock_key)
+
+    def invalidate(self):
+        """
+        Move the namespace to a new generation in every worker.
+        """
+        self.generation()
+
+        try:
+            self.shared.incr(self.generation_key)
+        except ValueError:
+            # Evicted meanwhile, a new one is created on the next read
+            pass
+
+        self.reset()
+
+    def reset(self):
+        """
+        Empty the in-process tier and reread the generations on the next access.
+        """
+        self._generation = None
+        self.local.clear()
+
+    def count(self, counter):
+        """
+        Increment a counter, see stats.
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+        - dict: The number of hits of each tier, of misses and the hit ratio.
+        """
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.local_hits + self.shared_hits) / lookups if lookups else 0,
+            }
+
+def get_cache(namespace, max_entries=None, timeout=None, **options):
+    """
+    Return the cache of a namespace, creating it on first use.
+
+    Args:
+    - namespace (str): The namespace.
+    - max_entries (int): Size of the in-process tier, defaults to the LOCAL_CACHE_MAX_ENTRIES setting.
+    - timeout (int): Expiration of the values in seconds, defaults to the shared cache default.
+    - **options: The max_bytes, max_shared_bytes and sizeof arguments of TwoTierCache.
+      All are only used by the first call for a namespace.
+
+    Returns:
+    - TwoTierCache: The cache of the namespace, shared by the threads of the process.
+    """
+    with _caches_lock:
+        cache = _caches.get(namespace)
+
+        if cache is None:
+            cache = _caches[namespace] = TwoTierCache(namespace, max_entries, timeout, **options)
+
+        return cache
+
+def invalidate_all():
+    """
+    Move every namespace to a new generation in every worker, e.g. after rewriting the data
+    behind the versions the values are keyed on.
+    """
+    shared = caches[SHARED_CACHE_ALIAS]
+
+    try:
+        shared.incr(GLOBAL_GENERATION_KEY)
+    except ValueError:
+        shared.add(GLOBAL_GENERATION_KEY, time.time_ns(), None)
+
+    reset_all()
+
+def reset_all():
+    """
+    Empty the in-process tiers of the caches created by the process, and reread the database
+    epoch and the generations on the next access.
+    """
+    global _epoch
+
+    with _caches_lock:
+        _epoch = None
+        namespaces = [*_caches.values()]
+
+    for cache in namespaces:
+        cache.reset()
+
+def cache_stats():
+    """
+    Return the counters of the caches created by the process.
+
+    Returns:
+    - dict: The counters of each cache, see TwoTierCache.stats, keyed by namespace.
+    """
+    with _caches_lock:
+        namespaces = sorted(_caches.items())
+
+    return {namespace: cache.stats() for namespace, cache in namespaces}
@@ -0,0 +1,114 @@
+import functools
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from .routers import use_primary
+from .sharding import current_shard
+
+# SQLite allows a single writer per database: queueing the writes of a process on a lock is
+# cheaper than having them poll the database lock through SQLite's busy handler
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+
+def write_lock(using):
+    """
+    Return the lock serializing the writes of this process to a database.
+
+    Args:
+    - using (str): The database alias.
+
+    Returns:
+    - RLock: The lock, reentrant so serialized writes can nest.
+    """
+    with _write_locks_lock:
+        return _write_locks.setdefault(using, threading.RLock())
+
+def is_lock_error(error):
+    """
+    Tell whether a database error is a transient lock conflict worth retrying.
+
+    Args:
+    - error (Exception): The raised error.
+
+    Returns:
+    - bool: True for SQLite 'database is locked' and 'database table is locked' errors.
+    """
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+def run_write(function, *args, using=None, **kwargs):
+    """
+    Run a function writing to the database in a transaction, serialized with the other writes
+    of the process on SQLite and retried on lock conflicts. Its reads go to the primary.
+
+    Attempts are limited by DATABASE_WRITE_ATTEMPTS and spaced by a random exponential wait
+    starting at DATABASE_WRITE_RETRY_WAIT seconds. Inside an outer transaction the function just
+    runs, the outer transaction owns the retries.
+
+    Args:
+    - function (callable): Performs the writes. Rerun on conflicts, so its side effects outside
+      the database must be deferred with transaction.on_commit.
+    - *args, **kwargs: Arguments passed to the function.
+    - using (str): The database alias, defaults to the shard of the request, see manager.sharding.
+
+    Returns:
+    - The return value of the function.
+
+    Raises:
+    - OperationalError: If the database is still locked after the last attempt.
+    """
+    using = using or current_shard() or DEFAULT_DB_ALIAS
+    connection = connections[using]
+
+    if connection.in_atomic_block:
+        with use_primary():
+            return function(*args, **kwargs)
+
+    def attempt():
+        if connection.vendor != 'sqlite':
+            with use_primary(), transaction.atomic(using=using):
+                return function(*args, **kwargs)
+
+        with write_lock(using), use_primary(), transaction.atomic(using=using):
+            return function(*args, **kwargs)
+
+    retrying = Retrying(
+        retry=retry_if_exception(is_lock_error),
+        stop=stop_after_attempt(getattr(settings, 'DATABASE_WRITE_ATTEMPTS', 5)),
+        wait=wait_random_exponential(multiplier=getattr(settings, 'DATABASE_WRITE_RETRY_WAIT', 0.05), max=2),
+        reraise=True,
+    )
+
+    return retrying(attempt)
+
+def serialized_writes(view=None, *, methods=('POST',)):
+    """
+    View decorator running the requests that write through run_write.
+
+    Args:
+    - view (callable): The view.
+    - methods (tuple): The HTTP methods of the writing requests, None when every request writes
+      (e.g. views deleting on GET).
+
+    Returns:
+    - callable: The decorated view, or a decorator when called with methods only.
+
+    Example:
+    >>> @serialized_writes
+    >>> def new(request): ...
+    >>> @serialized_writes(methods=None)
+    >>> def delete(request, pk): ...
+    """
+    if view is None:
+        return functools.partial(serialized_writes, methods=methods)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if methods is not None and request.method not in methods:
+            return view(request, *args, **kwargs)
+
+        return run_write(view, request, *args, **kwargs)
+
+    return wrapper
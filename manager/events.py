@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+class Subscription:
+    """
+    A single client subscription to the task and comment event stream.
+
+    Each subscription owns a bounded asyncio queue bound to the event loop that created it,
+    so an idle connection only costs a queue and a pending future instead of a thread.
+
+    Attributes:
+    - user_id: int - The user whose events are delivered to this subscription.
+    - loop: AbstractEventLoop - The event loop that consumes the queue.
+    - queue: asyncio.Queue - Pending encoded events.
+    """
+    def __init__(self, user_id, loop, queue_size=SUBSCRIPTION_QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, message):
+        """
+        Queue a message, dropping the oldest pending one when the client is too slow.
+
+        Must be called from the subscription's event loop.
+
+        Args:
+        - message (dict): The event to deliver.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        """
+        Wait for the next event.
+
+        Returns:
+        - dict: The next event delivered to this subscription.
+        """
+        return await self.queue.get()
+
+class EventBroker:
+    """
+    In-process publish/subscribe fan-out of task and comment changes.
+
+    Events are published from synchronous code (model signals running in worker threads) and
+    delivered to subscriptions living on the ASGI event loop, keyed by the user they belong to.
+
+    Methods:
+    - subscribe(user_id): Register a new subscription on the running event loop.
+    - unsubscribe(subscription): Remove a subscription.
+    - publish(user_ids, event, data): Deliver an event to every subscription of the given users.
+    """
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """
+        Register a new subscription for a user on the running event loop.
+
+        Args:
+        - user_id (int): The user subscribing to events.
+
+        Returns:
+        - Subscription: The new subscription.
+        """
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscription from the broker.
+
+        Args:
+        - subscription (Subscription): The subscription to remove.
+        """
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def subscriber_count(self):
+        """
+        Count the active subscriptions.
+
+        Returns:
+        - int: The number of active subscriptions across all users.
+        """
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def has_subscriptions(self, user_ids=None):
+        """
+        Tell whether events would be delivered to anyone, so publishers can skip building them.
+
+        Args:
+        - user_ids (iterable): Ids of the users the event is for, None for any user.
+
+        Returns:
+        - bool: True when one of the users, or anyone, has an active subscription.
+        """
+        with self._lock:
+            if user_ids is None:
+                return bool(self._subscriptions)
+
+            return any(user_id in self._subscriptions for user_id in user_ids)
+
+    def publish(self, user_ids, event, data):
+        """
+        Deliver an event to every subscription of the given users.
+
+        Safe to call from any thread.
+
+        Args:
+        - user_ids (iterable): Ids of the users that should receive the event.
+        - event (str): The event name (e.g. 'task', 'comment').
+        - data (dict): JSON serializable event payload.
+        """
+        message = {'event': event, 'data': data}
+
+        with self._lock:
+            targets = [
+                subscription
+                for user_id in set(user_ids)
+                for subscription in self._subscriptions.get(user_id, ())
+            ]
+
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # The loop is closed, the stream will never be read again
+                self.unsubscribe(subscription)
+
+def format_sse(message):
+    """
+    Encode an event as a Server-Sent Events frame.
+
+    Args:
+    - message (dict): A message with 'event' and 'data' keys.
+
+    Returns:
+    - str: The encoded frame.
+    """
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+broker = EventBroker()
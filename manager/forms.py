@@ -2,7 +2,9 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
 
+from manager.cache import get_cache
 from manager.models import Comment, Priority, Status, Tag, Task
+from manager.versions import get_data_version
 
 CHAR_FIELD_CSS_CLASS = { 'class': 'form-control' }
 SELECT_FIELD_CSS_CLASS = { 'class': 'form-select' }
@@ -89,8 +91,8 @@ class NewTaskForm(forms.ModelForm):
         """
         user = kwargs.pop('user')
         super(NewTaskForm, self).__init__(*args, **kwargs)
-        self.fields["priority"].queryset = Priority.objects.filter(user=user)
-        self.fields["status"].queryset = Status.objects.filter(user=user)
+        self.fields["priority"].queryset = Priority.objects.visible_to(user)
+        self.fields["status"].queryset = Status.objects.visible_to(user)
         self.fields["tags"].queryset = Tag.objects.filter(user=user)
 
         self.fields['status'].choices = remove_first_element_from_combo(self.fields['status'].choices)
@@ -137,8 +139,8 @@ class EditTaskForm(forms.ModelForm):
         """
         user = kwargs.pop('user')
         super(EditTaskForm, self).__init__(*args, **kwargs)
-        self.fields['priority'].queryset = Priority.objects.filter(user=user)
-        self.fields['status'].queryset = Status.objects.filter(user=user)
+        self.fields['priority'].queryset = Priority.objects.visible_to(user)
+        self.fields['status'].queryset = Status.objects.visible_to(user)
         self.fields['tags'].queryset = Tag.objects.filter(user=user)
 
         self.fields['status'].choices = remove_first_element_from_combo(self.fields['status'].choices)
@@ -202,7 +204,95 @@ class NewTagForm(forms.ModelForm):
         model = Tag
         fields = ('name',)
 
-class SearchForm(forms.Form):
+class ReplacementForm(forms.Form):
+    """
+    Form for choosing what replaces a status, a priority or a tag being deleted.
+
+    Attributes:
+    - replacement: ModelChoiceField - The status, priority or tag the tasks are moved to. Optional
+      for tags, whose links may just be dropped.
+    """
+    replacement = forms.ModelChoiceField(queryset=None, widget=forms.Select(attrs=SELECT_FIELD_CSS_CLASS))
+
+    def __init__(self, *args, **kwargs):
+        """
+        Constructor for the ReplacementForm.
+
+        Parameters:
+        - instance: Status, Priority or Tag - The object being deleted.
+        - user: int - The id of the user replacing it, defaults to its owner. Required for the
+          shared defaults.
+        """
+        instance = kwargs.pop('instance')
+        user = kwargs.pop('user', instance.user_id)
+        super().__init__(*args, **kwargs)
+
+        model = type(instance)
+        replacements = model.objects.visible_to(user).exclude(pk=instance.pk)
+
+        if instance.user_id is not None:
+            # Once deleted, the default it overrides is offered again
+            replacements |= model.objects.filter(user__isnull=True, name=instance.name)
+
+        self.fields['replacement'].queryset = replacements
+        self.fields['replacement'].required = model != Tag
+
+class UserChoicesMixin:
+    """
+    Mixin for forms offering the statuses, priorities, tags and assignees of a user as choices.
+    """
+    def get_choices(self, user, model):
+        """
+        Retrieve choices based on the specified user and model.
+
+        Args:
+        - user: The user for whom choices are being retrieved.
+        - model: The Django model class for which choices are being retrieved.
+
+        Returns:
+        - list: A list of tuples representing choices. Each tuple contains two elements:
+        - The first element is the ID of the choice.
+        - The second element is the display name of the choice.
+
+        Example:
+        For a User model:
+        >>> get_choices(user_instance, User)
+        [(1, 'username1'), (2, 'username2'), ...]
+
+        For other models:
+        >>> get_choices(user_instance, AnotherModel)
+        [(1, 'name1'), (2, 'name2'), ...]
+
+        Special Handling:
+        - Inserts an empty choice at the beginning of the list.
+        - If the model is Status, appends a special choice for 'Completed' with ID -1.
+
+        The choices are cached under the data version of the user, bumped whenever they change,
+        read once per form.
+        """
+        user_id = getattr(user, 'pk', user)
+
+        if not hasattr(self, 'choices_version'):
+            self.choices_version, _ = get_data_version(user_id)
+
+        def load():
+            if model == User:
+                assignees = list(Task.objects.filter(user_id=user).values_list('assignee', flat=True).distinct())
+                return list(User.objects.filter(id__in=assignees).values_list('id', 'username'))
+
+            return list(model.objects.visible_to(user).values_list('id', 'name'))
+
+        key = f'{user_id}:{model._meta.label_lower}:{self.choices_version}'
+        choices = list(get_cache('choices').get_or_set(key, load))
+
+        choices.insert(0, ('', ''))
+
+        if model == Status:
+            choices.append((-1, 'Completed'))
+
+        return choices
+
+class SearchForm(UserChoicesMixin, forms.Form):
     """
     Form for searching tasks based on various criteria.
 
@@ -214,6 +304,7 @@ class SearchForm(forms.Form):
     - status: ChoiceField - Task status for search.
     - priority: ChoiceField - Task priority for search.
     - tag: MultipleChoiceField - Task tags for search.
+    - archived: BooleanField - Also search the archived tasks.
     """
     title = forms.CharField(required=False, widget=forms.TextInput(attrs=CHAR_FIELD_CSS_CLASS))
     description = forms.CharField(required=False, widget=forms.TextInput(attrs=CHAR_FIELD_CSS_CLASS))
@@ -222,6 +313,7 @@ class SearchForm(forms.Form):
     status = forms.ChoiceField(required=False)
     priority = forms.ChoiceField(required=False)
     tag = forms.MultipleChoiceField(required=False)
+    archived = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={ 'class': 'form-check-input' }))
     
     def __init__(self, *args, **kwargs):
         """
@@ -245,43 +337,52 @@ class SearchForm(forms.Form):
         self.fields['assignee'].choices = self.get_choices(user, User)
         self.fields['assignee'].widget.attrs.update(SELECT_FIELD_CSS_CLASS)
 
-    def get_choices(self, user, model):
-        """
-        Retrieve choices based on the specified user and model.
+class DashboardFilterForm(UserChoicesMixin, forms.Form):
+    """
+    Form for narrowing the home page analytics.
 
-        Args:
-        - user: The user for whom choices are being retrieved.
-        - model: The Django model class for which choices are being retrieved.
+    Attributes:
+    - status: ChoiceField - Only count tasks with this status.
+    - priority: ChoiceField - Only count tasks with this priority.
+    - assignee: ChoiceField - Only count tasks assigned to this user.
+    - tag: ChoiceField - Only count tasks with this tag.
+    - start: DateField - Only count tasks created or completed on or after this day.
+    - end: DateField - Only count tasks created or completed on or before this day.
+    """
+    status = forms.ChoiceField(required=False)
+    priority = forms.ChoiceField(required=False)
+    assignee = forms.ChoiceField(required=False)
+    tag = forms.ChoiceField(required=False)
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={ 'type': 'date', **CHAR_FIELD_CSS_CLASS }))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={ 'type': 'date', **CHAR_FIELD_CSS_CLASS }))
 
-        Returns:
-        - list: A list of tuples representing choices. Each tuple contains two elements:
-        - The first element is the ID of the choice.
-        - The second element is the display name of the choice.
+    def __init__(self, *args, **kwargs):
+        """
+        Constructor for the DashboardFilterForm.
 
-        Example:
-        For a User model:
-        >>> get_choices(user_instance, User)
-        [(1, 'username1'), (2, 'username2'), ...]
+        Parameters:
+        - user: User - The user for whom the form is being rendered.
+        """
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
 
-        For other models:
-        >>> get_choices(user_instance, AnotherModel)
-        [(1, 'name1'), (2, 'name2'), ...]
+        # Completed tasks are counted apart on the dashboard, drop the search only 'Completed' status
+        self.fields['status'].choices = self.get_choices(user, Status)[:-1]
+        self.fields['priority'].choices = self.get_choices(user, Priority)
+        self.fields['assignee'].choices = self.get_choices(user, User)
+        self.fields['tag'].choices = self.get_choices(user, Tag)
 
-        Special Handling:
-        - Inserts an empty choice at the beginning of the list.
-        - If the model is Status, appends a special choice for 'Completed' with ID -1.
-        """
-        choices = []
+        for field in ('status', 'priority', 'assignee', 'tag'):
+            self.fields[field].widget.attrs.update(SELECT_FIELD_CSS_CLASS)
 
-        if model == User:
-            assignees = list(Task.objects.filter(user_id=user).values_list('assignee', flat=True).distinct())
-            choices = list(User.objects.filter(id__in=assignees).values_list('id', 'username'))
-        else:
-            choices = list(model.objects.filter(user_id=user).values_list('id', 'name'))
-        
-        choices.insert(0, ('', ''))
+    def get_filters(self):
+        """
+        Return the filters set on the form.
 
-        if model == Status:
-            choices.append((-1, 'Completed'))
+        Returns:
+        - dict: The non empty cleaned values keyed by field name, empty when the form is not valid.
+        """
+        if not self.is_valid():
+            return {}
 
-        return choices
\ No newline at end of file
+        return {name: value for name, value in self.cleaned_data.items() if value not in (None, '')}
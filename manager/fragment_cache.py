@@ -0,0 +1,134 @@
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .analytics.chart_cache import DjangoChartCacheBackend, LocalChartCacheBackend
+
+# Bump when the markup of any cached fragment changes so previously rendered fragments are not served again
+FRAGMENT_CACHE_VERSION = 1
+
+DEFAULT_FRAGMENT_CACHE = {
+    'BACKEND': 'manager.fragment_cache.LocalFragmentCacheBackend',
+    'OPTIONS': {},
+}
+
+_fragment_cache = None
+_fragment_cache_lock = threading.Lock()
+
+def fragment_cache_key(name, vary_on):
+    """
+    Build the key of a rendered template fragment.
+
+    Args:
+    - name (str): The fragment name.
+    - vary_on (list): The values the fragment depends on, e.g. a task id and its updated_at.
+
+    Returns:
+    - str: A hex SHA-256 digest identifying the rendered fragment.
+    """
+    payload = json.dumps([FRAGMENT_CACHE_VERSION, name, vary_on], default=str, separators=(',', ':'))
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class LocalFragmentCacheBackend(LocalChartCacheBackend):
+    """
+    In-process fragment cache bounded by entry count and total size, evicting the least recently
+    used fragments. Fragments of outdated versions are never read again and age out.
+    """
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024):
+        super().__init__(max_entries, max_bytes)
+
+class DjangoFragmentCacheBackend(DjangoChartCacheBackend):
+    """
+    Fragment cache stored in one of the Django cache framework caches, shared between workers
+    when the configured cache is.
+    """
+    key_prefix = 'fragment'
+
+class FragmentCache:
+    """
+    Cache of rendered template fragments, counting hits and misses per fragment name.
+
+    Methods:
+    - get(name, vary_on): Return the cached fragment, or None.
+    - set(name, vary_on, fragment): Cache a rendered fragment.
+    - stats(): Return the hit and miss counters per fragment name.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, vary_on):
+        """
+        Look a fragment up.
+
+        Args:
+        - name (str): The fragment name.
+        - vary_on (list): The values the fragment depends on.
+
+        Returns:
+        - str: The cached fragment, or None when it has to be rendered.
+        """
+        fragment = self.backend.get(fragment_cache_key(name, vary_on))
+
+        with self._lock:
+            counters = self.counters.setdefault(name, [0, 0])
+            counters[fragment is None] += 1
+
+        return fragment
+
+    def set(self, name, vary_on, fragment):
+        """
+        Cache a rendered fragment.
+
+        Args:
+        - name (str): The fragment name.
+        - vary_on (list): The values the fragment depends on.
+        - fragment (str): The rendered fragment.
+        """
+        self.backend.set(fragment_cache_key(name, vary_on), fragment)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+        - dict: The number of hits and misses and the hit ratio, keyed by fragment name.
+        """
+        with self._lock:
+            return {
+                name: {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_ratio': hits / (hits + misses),
+                }
+                for name, (hits, misses) in sorted(self.counters.items())
+            }
+
+def get_fragment_cache():
+    """
+    Return the fragment cache configured by the FRAGMENT_CACHE setting, creating it on first use.
+
+    FRAGMENT_CACHE is a dict with the dotted path of the backend class in 'BACKEND' and its
+    keyword arguments in 'OPTIONS'. A None BACKEND disables the cache.
+
+    Returns:
+    - FragmentCache: The shared fragment cache, or None when disabled.
+    """
+    global _fragment_cache
+
+    with _fragment_cache_lock:
+        if _fragment_cache is None:
+            config = getattr(settings, 'FRAGMENT_CACHE', DEFAULT_FRAGMENT_CACHE)
+
+            if config.get('BACKEND') is None:
+                return None
+
+            backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+            _fragment_cache = FragmentCache(backend)
+
+        return _fragment_cache
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from manager.archive import archivable_tasks, archive_tasks
+from manager.sharding import data_aliases
+
+class Command(BaseCommand):
+    """
+    Move the tasks completed more than ARCHIVE_AFTER_DAYS days ago, with their tags and comments,
+    to the archive tables, see manager.archive.
+
+    Runs in batches of ARCHIVE_BATCH_SIZE tasks, each in its own short write transaction, so it
+    can run periodically next to the application, e.g. nightly from cron.
+
+    Usage:
+    >>> python manage.py archive_tasks
+    >>> python manage.py archive_tasks --days 90 --batch-size 1000
+    >>> python manage.py archive_tasks --dry-run
+    """
+    help = 'Move old completed tasks to the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive the tasks completed more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, help='Number of tasks moved per transaction.')
+        parser.add_argument('--database', action='append', help='Only archive this database (repeatable).')
+        parser.add_argument('--dry-run', action='store_true', help='Count the archivable tasks without moving them.')
+
+    def handle(self, *args, **options):
+        aliases = options['database'] or data_aliases()
+
+        if options['dry_run']:
+            for alias in aliases:
+                self.stdout.write(f"{alias}: {archivable_tasks(options['days'], using=alias).count()} tasks to archive")
+            return
+
+        totals = dict.fromkeys(aliases, 0)
+
+        for alias, moved in archive_tasks(options['days'], options['batch_size'], aliases=aliases):
+            totals[alias] += moved
+            self.stdout.write(f'{alias}: archived {totals[alias]} tasks')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {sum(totals.values())} tasks.'))
@@ -0,0 +1,73 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from manager.analytics.plot_generator import PLOT_BACKENDS
+
+def sample_chart_inputs(size, seed=0):
+    """
+    Build deterministic chart inputs of a given size.
+
+    Args:
+    - size (int): Number of points, slices or bars of each chart.
+    - seed (int): Seed of the random counts.
+
+    Returns:
+    - dict: The arguments of each PlotGenerator method, keyed by method name.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    counts = [rng.randint(0, 50) for _ in range(size)]
+
+    return {
+        'generate_task_per_day': ([today - timedelta(days=size - day) for day in range(size)], counts),
+        'generate_task_by_status': ([f'Status {index}' for index in range(size)], counts),
+        'generate_task_duration': (
+            [f'{index}-{index + 1}' for index in range(size)], counts,
+            [('p50', 3), ('p90', 12), ('p99', 40)],
+            [(f'Task {index}', 100 - index) for index in range(min(size, 10))],
+        ),
+        'generate_assignee_productivity': ([f'user{index}' for index in range(size)], counts),
+    }
+
+class Command(BaseCommand):
+    """
+    Compare the render time and output size of the chart backends on the home page charts.
+
+    Charts are rendered in the current process, without the render pool or the chart cache.
+
+    Usage:
+    >>> python manage.py benchmark_charts
+    >>> python manage.py benchmark_charts --size 30 --repeat 50
+    """
+    help = 'Compare the render time and output size of the chart backends.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10, help='Number of points, slices or bars of each chart.')
+        parser.add_argument('--repeat', type=int, default=20, help='Number of renders of each chart.')
+        parser.add_argument('--backend', action='append', choices=sorted(PLOT_BACKENDS), help='Backend to benchmark (repeatable), all by default.')
+
+    def handle(self, *args, **options):
+        inputs = sample_chart_inputs(options['size'])
+        backends = options['backend'] or list(PLOT_BACKENDS)
+
+        self.stdout.write(f"{'chart':<32} {'backend':<8} {'first ms':>9} {'mean ms':>9} {'KB':>9}")
+
+        for method, chart_args in inputs.items():
+            for backend in backends:
+                generator = PLOT_BACKENDS[backend]()
+
+                start = time.perf_counter()
+                chart = getattr(generator, method)(*chart_args)
+                first = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    getattr(generator, method)(*chart_args)
+                mean = (time.perf_counter() - start) / max(options['repeat'], 1)
+
+                size = len(chart.encode()) if isinstance(chart, str) else sum(len(part.encode()) for part in chart)
+
+                self.stdout.write(f'{method:<32} {backend:<8} {first * 1000:>9.2f} {mean * 1000:>9.2f} {size / 1024:>9.1f}')
@@ -0,0 +1,87 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: loads the WSGI application and the URL conf, like a worker
+# handling its first request, then reports the time, peak memory and heavy modules loaded.
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+
+start = time.perf_counter()
+
+import taskmanager.wsgi
+from django.urls import get_resolver
+
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+max_rss = max_rss / 1024 if sys.platform == 'darwin' else max_rss
+
+print(json.dumps({
+    'seconds': elapsed,
+    'max_rss_kb': max_rss,
+    'modules': sorted(name for name in ('plotly', 'numpy') if name in sys.modules),
+}))
+"""
+
+class Command(BaseCommand):
+    """
+    Measure the cold start time and peak memory of a worker loading taskmanager.wsgi.
+
+    Each run starts a new interpreter, so the numbers include Python, Django and every module
+    imported by the settings, the apps and the URL conf.
+
+    Usage:
+    >>> python manage.py benchmark_startup
+    >>> python manage.py benchmark_startup --runs 10 --preload
+    """
+    help = 'Measure the cold start time and peak memory of a worker loading taskmanager.wsgi.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Number of interpreters started.')
+        parser.add_argument('--preload', action='store_true', help='Start the workers with PLOT_PRELOAD on.')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='taskmanager.settings', PLOT_PRELOAD=str(options['preload']))
+        results = []
+
+        for _ in range(max(options['runs'], 1)):
+            process = subprocess.run(
+                [sys.executable, '-c', STARTUP_SCRIPT],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+
+            if process.returncode:
+                raise CommandError(f'Worker failed to start:\n{process.stderr}')
+
+            results.append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+        seconds = [result['seconds'] for result in results]
+        max_rss = [result['max_rss_kb'] for result in results]
+        summary = {
+            'runs': len(results),
+            'preload': options['preload'],
+            'median_seconds': statistics.median(seconds),
+            'min_seconds': min(seconds),
+            'median_max_rss_mb': statistics.median(max_rss) / 1024,
+            'modules': results[-1]['modules'],
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary))
+            return
+
+        self.stdout.write(
+            f"{summary['runs']} runs, preload {'on' if summary['preload'] else 'off'}: "
+            f"median {summary['median_seconds'] * 1000:.0f} ms (min {summary['min_seconds'] * 1000:.0f} ms), "
+            f"median peak memory {summary['median_max_rss_mb']:.1f} MB, "
+            f"heavy modules loaded: {', '.join(summary['modules']) or 'none'}"
+        )
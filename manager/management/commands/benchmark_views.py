@@ -0,0 +1,254 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from manager.cache import SHARED_CACHE_ALIAS
+from manager.models import Task
+from manager.seeding import Seeder
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'views.json'
+PERCENTILES = (50, 95, 99)
+
+def view_scenarios(user, task):
+    """
+    Return the requests benchmarked for a seeded user.
+
+    Args:
+    - user (User): The logged in user.
+    - task (Task): A task owned by the user, with tags.
+
+    Returns:
+    - list: (name, method, url, data) tuples.
+    """
+    edit_data = {
+        'title': task.title,
+        'description': task.description or '',
+        'due_date': task.due_date.isoformat(),
+        'status': task.status_id,
+        'assignee': task.assignee_id,
+        'priority': task.priority_id,
+        'tags': list(task.tags.values_list('id', flat=True)),
+    }
+
+    return [
+        ('home', 'get', reverse('manager:home'), None),
+        ('list', 'get', reverse('manager:list'), None),
+        # Paginator.get_page serves out of range page numbers as the last page
+        ('list_last_page', 'get', reverse('manager:list'), {'page': 10 ** 9}),
+        ('search', 'get', reverse('manager:search'), {'title': task.title.split()[0], 'priority': task.priority_id}),
+        ('detail', 'get', reverse('manager:detail', args=[task.pk]), None),
+        ('new', 'get', reverse('manager:new'), None),
+        ('edit', 'get', reverse('manager:edit', args=[task.pk]), None),
+        # Saves the task unchanged, so the dataset stays the same between runs
+        ('edit_post', 'post', reverse('manager:edit', args=[task.pk]), edit_data),
+        ('configuration', 'get', reverse('manager:configuration'), None),
+    ]
+
+def percentile(values, rank):
+    """
+    Return the nearest-rank percentile of a list of values.
+
+    Args:
+    - values (list): The measurements.
+    - rank (int): The percentile, between 0 and 100.
+
+    Returns:
+    - float: The smallest value greater than or equal to rank percent of the values.
+    """
+    ordered = sorted(values)
+    index = max(0, -(-rank * len(ordered) // 100) - 1)
+
+    return ordered[index]
+
+def measure(client, method, url, data, repeat, warmup):
+    """
+    Time a request through the test client.
+
+    Args:
+    - client (Client): A logged in test client.
+    - method (str): 'get' or 'post'.
+    - url (str): The requested path.
+    - data (dict): Query string or form data.
+    - repeat (int): Number of timed requests.
+    - warmup (int): Number of untimed requests sent first.
+
+    Returns:
+    - dict: Latency percentiles in milliseconds, query count, response bytes and status code.
+    """
+    send = getattr(client, method)
+
+    for _ in range(warmup):
+        send(url, data)
+
+    latencies = []
+
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = send(url, data)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    result = {f'p{rank}_ms': round(percentile(latencies, rank), 3) for rank in PERCENTILES}
+    result.update(queries=len(queries), bytes=len(response.content), status=response.status_code)
+
+    return result
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """
+    Compare benchmark results with a baseline.
+
+    Latency regresses when the p50 or p95 grows by more than the threshold and by more than
+    min_delta_ms, query counts when they grow at all, response sizes when they grow by more
+    than the threshold.
+
+    Args:
+    - results (dict): Measurements keyed by dataset then view name.
+    - baseline (dict): Baseline measurements with the same layout.
+    - threshold (float): Allowed relative growth, e.g. 0.25 for 25%.
+    - min_delta_ms (float): Latency growth always tolerated, absorbing noise on fast views.
+
+    Returns:
+    - list: Descriptions of the regressions.
+    """
+    regressions = []
+
+    for dataset, views in results.items():
+        for name, current in views.items():
+            previous = baseline.get(dataset, {}).get(name)
+
+            if previous is None:
+                continue
+
+            for key in ('p50_ms', 'p95_ms'):
+                if current[key] > previous[key] * (1 + threshold) and current[key] - previous[key] > min_delta_ms:
+                    regressions.append(f'{dataset} {name}: {key} {previous[key]:.1f} -> {current[key]:.1f}')
+
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{dataset} {name}: queries {previous['queries']} -> {current['queries']}")
+
+            if current['bytes'] > previous['bytes'] * (1 + threshold):
+                regressions.append(f"{dataset} {name}: bytes {previous['bytes']} -> {current['bytes']}")
+
+    return regressions
+
+class Command(BaseCommand):
+    """
+    Benchmark the main views through the test client against seeded datasets of several sizes.
+
+    Runs in a throwaway test database. Records latency percentiles, query counts and response
+    sizes, compares them with a stored baseline and fails when a view regressed past the
+    threshold. The chart, fragment and data caches and the render pool are disabled unless
+    --chart-cache is passed, so queries and rendering are measured on every request.
+
+    Usage:
+    >>> python manage.py benchmark_views --update-baseline
+    >>> python manage.py benchmark_views --sizes 100,1000,10000 --repeat 50
+    >>> python manage.py benchmark_views --view home --view list --threshold 0.5
+    """
+    help = 'Benchmark the main views against seeded datasets and compare them with a baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Number of seeded users.')
+        parser.add_argument('--sizes', default='100,1000', help='Comma separated numbers of tasks per user, one dataset each.')
+        parser.add_argument('--repeat', type=int, default=20, help='Number of timed requests per view.')
+        parser.add_argument('--warmup', type=int, default=2, help='Number of untimed requests per view.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated datasets.')
+        parser.add_argument('--view', action='append', default=[], help='Only benchmark this view (repeatable).')
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='Path of the baseline JSON file.')
+        parser.add_argument('--update-baseline', action='store_true', help='Store the results as the new baseline.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative growth of latency and response size.')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0, help='Latency growth always tolerated.')
+        parser.add_argument('--chart-cache', action='store_true', help='Keep the cache and render pool settings.')
+        parser.add_argument('--output', type=Path, help='Also write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+        overrides = {} if options['chart_cache'] else {
+            'CHART_CACHE': {'BACKEND': None},
+            'FRAGMENT_CACHE': {'BACKEND': None},
+            'CACHES': {**settings.CACHES, SHARED_CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            'LOCAL_CACHE_MAX_ENTRIES': 0,
+            'PLOT_RENDER_WORKERS': 0,
+        }
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            with override_settings(**overrides):
+                results = {f"{options['users']}x{size}": self.run_dataset(size, options) for size in sizes}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2))
+
+        if options['update_baseline']:
+            options['baseline'].parent.mkdir(parents=True, exist_ok=True)
+            options['baseline'].write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}."))
+            return
+
+        if not options['baseline'].exists():
+            self.stdout.write(f"No baseline at {options['baseline']}, run with --update-baseline to store one.")
+            return
+
+        regressions = compare(results, json.loads(options['baseline'].read_text()), options['threshold'], options['min_delta_ms'])
+
+        if regressions:
+            raise CommandError('Views regressed past the threshold:\n' + '\n'.join(regressions))
+
+        self.stdout.write(self.style.SUCCESS('No regression against the baseline.'))
+
+    def run_dataset(self, size, options):
+        """
+        Seed a dataset and benchmark every view on it.
+
+        Args:
+        - size (int): Number of tasks per user.
+        - options (dict): The command options.
+
+        Returns:
+        - dict: Measurements keyed by view name.
+        """
+        dataset = f"{options['users']}x{size}"
+        call_command('flush', interactive=False, verbosity=0)
+
+        seed_started = time.perf_counter()
+        Seeder(seed=options['seed']).seed(options['users'], size, prefix='bench')
+        self.stdout.write(f'Dataset {dataset} seeded in {time.perf_counter() - seed_started:.1f} s')
+
+        user = User.objects.order_by('pk').first()
+        task = Task.objects.filter(user=user, tags__isnull=False).order_by('pk').first()
+        client = Client()
+        client.force_login(user)
+
+        self.stdout.write(f"{'view':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'KB':>9}")
+        results = {}
+
+        for name, method, url, data in view_scenarios(user, task):
+            if options['view'] and name.split('_')[0] not in options['view'] and name not in options['view']:
+                continue
+
+            result = measure(client, method, url, data, options['repeat'], options['warmup'])
+
+            if result['status'] >= 400:
+                raise CommandError(f'{name} answered {result["status"]}.')
+
+            results[name] = result
+            self.stdout.write(
+                f"{name:<16} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+                f"{result['queries']:>8} {result['bytes'] / 1024:>9.1f}"
+            )
+
+        return results
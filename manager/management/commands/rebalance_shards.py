@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from manager.models import UserShard
+from manager.sharding import hash_shard, move_user, replicate_users, shard_aliases
+
+class Command(BaseCommand):
+    """
+    Move the data of each user to the shard its id hashes to, see DATABASE_SHARDS.
+
+    Run it after enabling sharding, to move the data kept on the default database to the shards,
+    and after appending a shard, to move the users it wins. Users are first copied to every shard.
+    Each user is moved in its own transactions and rows get new ids; run it while the moved users
+    are not writing, their writes during their move may be lost.
+
+    Usage:
+    >>> python manage.py rebalance_shards --dry-run
+    >>> python manage.py rebalance_shards
+    """
+    help = 'Move the data of each user to its shard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List the moves without moving anything.')
+
+    def handle(self, *args, **options):
+        if not shard_aliases():
+            raise CommandError('No shard configured, set DATABASE_SHARDS.')
+
+        users = User.objects.order_by('pk')
+
+        if not options['dry_run']:
+            replicate_users(users.iterator())
+
+        directory = dict(UserShard.objects.values_list('user_id', 'shard'))
+        moves = [
+            (user_id, directory.get(user_id, 'default'), hash_shard(user_id))
+            for user_id in users.values_list('pk', flat=True)
+            if directory.get(user_id) != hash_shard(user_id)
+        ]
+
+        for user_id, source, target in moves:
+            if options['dry_run']:
+                self.stdout.write(f'user {user_id}: {source} -> {target}')
+                continue
+
+            counts = move_user(user_id, target)
+            self.stdout.write(f"user {user_id}: {source} -> {target}, {counts.get('task', 0)} tasks")
+
+        self.stdout.write(f"{len(moves)} users {'to move' if options['dry_run'] else 'moved'}.")
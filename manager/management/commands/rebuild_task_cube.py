@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from manager.analytics import task_cube
+from manager.cache import get_cache
+from manager.models import Task
+
+class Command(BaseCommand):
+    """
+    Recompute the pre-aggregated daily task counts from the tasks and the archived tasks.
+
+    The counts are maintained incrementally on every task write. Run this command after writes
+    that bypass model signals (bulk inserts, raw SQL, QuerySet.update) or to repair them. The
+    cached dashboard data is invalidated.
+
+    Usage:
+    >>> python manage.py rebuild_task_cube
+    >>> python manage.py rebuild_task_cube --user alice --user bob
+    """
+    help = 'Recompute the pre-aggregated daily task counts from the tasks and the archived tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], help='Only rebuild the counts of this username (repeatable).')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='The database alias to rebuild.')
+
+    def handle(self, *args, **options):
+        database = options['database']
+
+        if options['user']:
+            users = User.objects.using(database).filter(username__in=options['user'])
+            tasks = Task.objects.using(database).filter(user__in=users)
+            rows = task_cube.rebuild(tasks)
+        else:
+            rows = task_cube.rebuild(using=database)
+
+        get_cache('dashboard').invalidate()
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} daily task count rows.'))
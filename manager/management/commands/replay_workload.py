@@ -0,0 +1,123 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from manager.seeding import Seeder
+from manager.workload import ClientTarget, HttpTarget, WorkloadResolver, read_workload, replay, summarize_replay
+
+class Command(BaseCommand):
+    """
+    Replay a recorded workload, see manager.middleware.RequestRecordingMiddleware, and report
+    throughput and latency percentiles per route.
+
+    Requests go through the in-process test client, or over HTTP to a running server when --target
+    is a URL. The recorded shapes are turned into URLs on the data of the replaying user. Requests
+    changing data on GET are never replayed. With --tasks, the workload is replayed in a throwaway
+    test database seeded with --users users of --tasks tasks each.
+
+    Usage:
+    >>> python manage.py replay_workload --log requests.jsonl --tasks 1000 --concurrency 4
+    >>> python manage.py replay_workload --log requests.jsonl --username alice
+    >>> python manage.py replay_workload --log requests.jsonl --target http://localhost:8000 --username user000000
+    """
+    help = 'Replay a recorded workload and report throughput and latency percentiles per route.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.REQUEST_RECORDING_LOG, help='The recorded workload, a JSON lines file.')
+        parser.add_argument('--target', default='client', help="'client' for the in-process test client, or a server URL.")
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of concurrent workers.')
+        parser.add_argument('--repeat', type=int, default=1, help='Number of times the workload is replayed.')
+        parser.add_argument('--limit', type=int, help='Only replay the first requests of the workload.')
+        parser.add_argument('--username', help='The replaying user, the first user by default.')
+        parser.add_argument('--password', default='password', help='Password of the replaying user, for HTTP targets.')
+        parser.add_argument('--users', type=int, default=20, help='Number of users seeded with --tasks.')
+        parser.add_argument('--tasks', type=int, help='Replay in a test database seeded with this many tasks per user.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the seeded dataset and of the replayed ids.')
+        parser.add_argument('--json', action='store_true', help='Output the report as JSON.')
+
+    def handle(self, *args, **options):
+        if not options['log']:
+            raise CommandError('No workload: pass --log or set REQUEST_RECORDING_LOG.')
+
+        try:
+            shapes = read_workload(options['log'])
+        except OSError as error:
+            raise CommandError(f'Could not read the workload: {error}')
+
+        shapes = shapes[:options['limit']] * options['repeat']
+
+        if options['tasks'] is None:
+            self.run(shapes, options)
+            return
+
+        if options['target'] != 'client':
+            raise CommandError('--tasks seeds a test database, it only works with the client target.')
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            call_command('flush', interactive=False, verbosity=0)
+            Seeder(seed=options['seed']).seed(options['users'], options['tasks'], prefix='replay')
+            self.run(shapes, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, shapes, options):
+        """
+        Replay the workload and output the report.
+
+        Args:
+        - shapes (list): The recorded request shapes.
+        - options (dict): The command options.
+        """
+        users = User.objects.order_by('pk')
+        user = users.filter(username=options['username']).first() if options['username'] else users.first()
+
+        if user is None:
+            raise CommandError('No replaying user, create one or pass --tasks to seed a test database.')
+
+        resolver = WorkloadResolver(user, seed=options['seed'])
+        requests = []
+
+        for shape in shapes:
+            url = resolver.url(shape)
+
+            if url is not None:
+                requests.append((shape['route'], url))
+
+        if not requests:
+            raise CommandError('The workload has no replayable request.')
+
+        if options['target'] == 'client':
+            target = ClientTarget(user)
+        else:
+            target = HttpTarget(options['target'], user.username, options['password'])
+
+        try:
+            report = summarize_replay(replay(target, requests, options['concurrency']))
+        except PermissionError as error:
+            raise CommandError(str(error))
+
+        report.update(skipped=len(shapes) - len(requests), concurrency=options['concurrency'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['requests']} requests in {report['seconds']:.1f} s with {options['concurrency']} workers, "
+            f"{report['skipped']} skipped"
+        )
+        self.stdout.write(f"{'route':<28} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+
+        for route, result in report['routes'].items():
+            self.stdout.write(
+                f"{route:<28} {result['requests']:>8} {result['errors']:>6} {result['throughput_rps']:>8.1f} "
+                f"{result['p50_ms']:>9.1f} {result['p90_ms']:>9.1f} {result['p99_ms']:>9.1f}"
+            )
+
+        self.stdout.write(f"{'total':<28} {report['requests']:>8} {'':>6} {report['throughput_rps']:>8.1f}")
@@ -0,0 +1,59 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from manager.seeding import Seeder
+
+class Command(BaseCommand):
+    """
+    Generate users with realistic tasks, tags and comments for scale testing.
+
+    The same options and seed always produce the same data. Every user's password is
+    the --password option.
+
+    Usage:
+    >>> python manage.py seed_data --users 100 --tasks 1000
+    >>> python manage.py seed_data --users 1000 --tasks 1000 --prefix load --seed 42 --comments 0.5
+    """
+    help = 'Generate users with realistic tasks, tags and comments for scale testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users.')
+        parser.add_argument('--tasks', type=int, default=100, help='Number of tasks owned by each user.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator.')
+        parser.add_argument('--prefix', default='user', help='Prefix of the usernames, followed by the user number.')
+        parser.add_argument('--password', default='password', help='Password of every user.')
+        parser.add_argument('--days', type=int, default=365, help='Number of days of task history.')
+        parser.add_argument('--today', type=date.fromisoformat, default=None, help='Last day of the history (YYYY-MM-DD), today by default.')
+        parser.add_argument('--assign-ratio', type=float, default=0.3, help='Share of the tasks assigned to another user.')
+        parser.add_argument('--comments', type=float, default=1.0, help='Average number of comments per task.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of tasks generated and inserted at once.')
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Users prefixed with '{options['prefix']}' already exist, choose another --prefix.")
+
+        seeder = Seeder(
+            seed=options['seed'],
+            today=options['today'],
+            days=options['days'],
+            assign_ratio=options['assign_ratio'],
+            comments_per_task=options['comments'],
+            batch_size=options['batch_size'],
+        )
+        total = options['users'] * options['tasks']
+        started = time.perf_counter()
+
+        def progress(inserted):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{inserted}/{total} tasks inserted ({time.perf_counter() - started:.1f} s)')
+
+        counts = seeder.seed(options['users'], options['tasks'], prefix=options['prefix'], password=options['password'], progress=progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['tasks']} tasks, {counts['tags']} task tags, "
+            f"{counts['comments']} comments and {counts['daily_task_counts']} daily task count rows "
+            f"in {time.perf_counter() - started:.1f} s."
+        ))
@@ -0,0 +1,55 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from manager.slow_queries import read_entries, summarize
+
+class Command(BaseCommand):
+    """
+    Summarize the slow query log, top offenders by total time first.
+
+    Usage:
+    >>> python manage.py slow_queries
+    >>> python manage.py slow_queries --top 5 --view manager:search --plans
+    """
+    help = 'Summarize the slow query log, top offenders by total time first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=None, help='Path of the slow query log, SLOW_QUERY_LOG by default.')
+        parser.add_argument('--top', type=int, default=10, help='Number of statements listed.')
+        parser.add_argument('--view', default=None, help='Only count the queries of this view name, e.g. manager:home.')
+        parser.add_argument('--plans', action='store_true', help='Print the query plan of each statement.')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON.')
+
+    def handle(self, *args, **options):
+        path = options['log'] or getattr(settings, 'SLOW_QUERY_LOG', None)
+
+        if not path:
+            raise CommandError('No slow query log, set SLOW_QUERY_LOG or pass --log.')
+
+        try:
+            groups = summarize(read_entries(path), view=options['view'])[:options['top']]
+        except (OSError, TypeError):
+            raise CommandError(f'Cannot read the slow query log {path!r}.')
+
+        if options['json']:
+            self.stdout.write(json.dumps(groups, indent=2))
+            return
+
+        if not groups:
+            self.stdout.write('No slow query logged.')
+            return
+
+        for rank, group in enumerate(groups, start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{rank}. {group['fingerprint']}: {group['total_ms']:.1f} ms total, {group['count']} queries, "
+                f"{group['mean_ms']:.1f} ms mean, {group['max_ms']:.1f} ms max"
+            ))
+            self.stdout.write(f"   views: {', '.join(group['views'])}")
+            self.stdout.write(f"   params: {json.dumps(group['params'])}")
+            self.stdout.write(f"   {group['sql']}")
+
+            if options['plans'] and group['plan']:
+                for line in group['plan']:
+                    self.stdout.write(f'     {line}')
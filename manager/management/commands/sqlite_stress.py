@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from manager.database import is_lock_error, run_write
+from manager.models import Comment, Task
+from manager.workload import percentile
+
+PROFILES = {'default': 'False', 'production': 'True'}
+OPERATIONS = ('read', 'comment', 'toggle', 'signup')
+
+def atomic_write(function, *args):
+    """
+    The write path without the production profile: a plain transaction, no serialization nor retry.
+    """
+    with transaction.atomic():
+        return function(*args)
+
+def add_comment(task_id, user_id):
+    Comment.objects.create(task_id=task_id, author_id=user_id, content='Stress test comment')
+
+def toggle_task(task_id):
+    # Reads then writes in the same transaction, like the mark completed view
+    task = Task.objects.get(pk=task_id)
+    task.completed = not task.completed
+    task.completed_at = timezone.now() if task.completed else None
+    task.save()
+
+def sign_up(username):
+    # Creating a user also creates its default tag
+    User.objects.create_user(username, password=None)
+
+def read_tasks(user_id):
+    tasks = Task.objects.filter(user_id=user_id).select_related('status', 'priority').order_by('-due_date')
+    tasks.count()
+    list(tasks[:25])
+
+class Command(BaseCommand):
+    """
+    Stress a SQLite database with concurrent readers and writers, with and without the
+    production SQLite profile (see SQLITE_PRODUCTION), and compare throughput and lock errors.
+
+    For each profile, a throwaway database is migrated and seeded, then --processes worker
+    processes of --threads threads each read task lists, add comments, toggle task completion
+    and sign up users for --duration seconds.
+
+    Usage:
+    >>> python manage.py sqlite_stress
+    >>> python manage.py sqlite_stress --processes 4 --threads 8 --duration 20 --write-ratio 0.5
+    >>> python manage.py sqlite_stress --profile production --json
+    """
+    help = 'Stress SQLite with concurrent readers and writers and compare the default and production profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', choices=PROFILES, help='Profile stressed (repeatable), both by default.')
+        parser.add_argument('--processes', type=int, default=2, help='Number of worker processes.')
+        parser.add_argument('--threads', type=int, default=4, help='Number of threads per worker process.')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds each profile is stressed.')
+        parser.add_argument('--write-ratio', type=float, default=0.5, help='Share of the operations writing.')
+        parser.add_argument('--users', type=int, default=20, help='Number of seeded users.')
+        parser.add_argument('--tasks', type=int, default=200, help='Number of seeded tasks per user.')
+        parser.add_argument('--json', action='store_true', help='Output the results as JSON.')
+        parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.work(options)))
+            return
+
+        results = {}
+
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in options['profile'] or PROFILES:
+                results[profile] = self.stress(profile, Path(directory) / f'{profile}.sqlite3', options)
+
+                if not options['json']:
+                    self.write_result(profile, results[profile])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+
+    def stress(self, profile, path, options):
+        """
+        Seed a database and run the worker processes against it.
+
+        Args:
+        - profile (str): 'default' or 'production'.
+        - path (Path): The database file.
+        - options (dict): The command options.
+
+        Returns:
+        - dict: Operations per second, lock and other errors and latency percentiles, overall and by operation.
+        """
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='taskmanager.settings',
+            DATABASE_NAME=str(path),
+            SQLITE_PRODUCTION=PROFILES[profile],
+            SLOW_QUERY_THRESHOLD_MS='0',
+            REQUEST_RECORDING_LOG='',
+        )
+        manage = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py')]
+
+        for command in (['migrate'], ['seed_data', '--users', str(options['users']), '--tasks', str(options['tasks'])]):
+            process = subprocess.run([*manage, *command, '--verbosity', '0'], env=env, capture_output=True, text=True)
+
+            if process.returncode:
+                raise CommandError(f'{command[0]} failed:\n{process.stderr}')
+
+        worker = [
+            *manage, 'sqlite_stress', '--worker',
+            '--threads', str(options['threads']),
+            '--duration', str(options['duration']),
+            '--write-ratio', str(options['write_ratio']),
+        ]
+        processes = [
+            subprocess.Popen([*worker, '--profile', profile], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            for _ in range(max(options['processes'], 1))
+        ]
+        operations = {operation: {'count': 0, 'lock_errors': 0, 'errors': 0, 'latencies': []} for operation in OPERATIONS}
+
+        for process in processes:
+            stdout, stderr = process.communicate()
+
+            if process.returncode:
+                raise CommandError(f'Worker failed:\n{stderr}')
+
+            for operation, result in json.loads(stdout.strip().splitlines()[-1]).items():
+                for key, value in result.items():
+                    operations[operation][key] += value
+
+        return self.summarize(operations, options['duration'])
+
+    @staticmethod
+    def summarize(operations, duration):
+        """
+        Compute throughput, errors and latency percentiles from the worker counts.
+        """
+        summary = {'ops_per_second': 0.0, 'lock_errors': 0, 'errors': 0, 'operations': {}}
+
+        for operation, result in operations.items():
+            latencies = result['latencies']
+            summary['ops_per_second'] += result['count'] / duration
+            summary['lock_errors'] += result['lock_errors']
+            summary['errors'] += result['errors']
+            summary['operations'][operation] = {
+                'ops_per_second': round(result['count'] / duration, 1),
+                'lock_errors': result['lock_errors'],
+                'errors': result['errors'],
+                'p50_ms': round(percentile(latencies, 50), 3) if latencies else None,
+                'p99_ms': round(percentile(latencies, 99), 3) if latencies else None,
+            }
+
+        summary['ops_per_second'] = round(summary['ops_per_second'], 1)
+
+        return summary
+
+    def write_result(self, profile, result):
+        self.stdout.write(
+            f"{profile}: {result['ops_per_second']:.1f} successful operations/s, "
+            f"{result['lock_errors']} lock errors, {result['errors']} other errors"
+        )
+        self.stdout.write(f"  {'operation':<10} {'ops/s':>8} {'locked':>7} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9}")
+
+        for operation, values in result['operations'].items():
+            self.stdout.write(
+                f"  {operation:<10} {values['ops_per_second']:>8.1f} {values['lock_errors']:>7} {values['errors']:>7} "
+                f"{values['p50_ms'] or 0:>9.1f} {values['p99_ms'] or 0:>9.1f}"
+            )
+
+    def work(self, options):
+        """
+        Run the worker threads of a worker process until the duration elapses.
+
+        Returns:
+        - dict: Successful operation counts, errors and latencies in milliseconds, by operation.
+        """
+        write = run_write if settings.SQLITE_PRODUCTION else atomic_write
+        user_ids = [*User.objects.values_list('pk', flat=True)]
+        task_ids = [*Task.objects.values_list('pk', flat=True)]
+        deadline = time.monotonic() + options['duration']
+        results = {operation: {'count': 0, 'lock_errors': 0, 'errors': 0, 'latencies': []} for operation in OPERATIONS}
+        results_lock = threading.Lock()
+
+        def stress(thread_index):
+            rng = random.Random(f'{os.getpid()}-{thread_index}')
+            index = 0
+
+            while time.monotonic() < deadline:
+                index += 1
+
+                if rng.random() >= options['write_ratio']:
+                    operation, function, args = 'read', read_tasks, (rng.choice(user_ids),)
+                else:
+                    operation = rng.choices(OPERATIONS[1:], weights=(10, 10, 1))[0]
+                    function, args = {
+                        'comment': (add_comment, (rng.choice(task_ids), rng.choice(user_ids))),
+                        'toggle': (toggle_task, (rng.choice(task_ids),)),
+                        'signup': (sign_up, (f'stress-{os.getpid()}-{thread_index}-{index}',)),
+                    }[operation]
+                    args = (function, *args)
+                    function = write
+
+                start = time.perf_counter()
+
+                try:
+                    function(*args)
+                except OperationalError as error:
+                    outcome = 'lock_errors' if is_lock_error(error) else 'errors'
+                else:
+                    outcome = None
+
+                latency = (time.perf_counter() - start) * 1000
+
+                with results_lock:
+                    if outcome is None:
+                        results[operation]['count'] += 1
+                        results[operation]['latencies'].append(latency)
+                    else:
+                        results[operation][outcome] += 1
+
+            connections.close_all()
+
+        threads = [threading.Thread(target=stress, args=(index,)) for index in range(max(options['threads'], 1))]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
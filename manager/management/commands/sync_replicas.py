@@ -0,0 +1,63 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+class Command(BaseCommand):
+    """
+    Copy the primary SQLite database to the read replicas, see DATABASE_REPLICAS.
+
+    Uses the SQLite online backup API: the copy is consistent, the primary keeps serving reads
+    and writes, and replica readers wait for the copy through their busy timeout. Run it with
+    --interval to keep the replicas a few seconds behind the primary, less than
+    REPLICA_STICKY_SECONDS.
+
+    Usage:
+    >>> python manage.py sync_replicas
+    >>> python manage.py sync_replicas --interval 5
+    """
+    help = 'Copy the primary SQLite database to the read replicas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Seconds between copies, 0 copies once.')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only SQLite replicas are synced here, other databases replicate themselves.')
+
+        if not settings.DATABASE_REPLICA_ALIASES:
+            raise CommandError('No replica configured, set DATABASE_REPLICAS.')
+
+        while True:
+            for alias in settings.DATABASE_REPLICA_ALIASES:
+                start = time.perf_counter()
+                self.copy(primary.settings_dict['NAME'], connections[alias].settings_dict['NAME'])
+                self.stdout.write(f'{alias} synced in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+            if not options['interval']:
+                return
+
+            time.sleep(options['interval'])
+
+    @staticmethod
+    def copy(source_name, replica_name):
+        """
+        Copy a database file into another with the online backup API.
+
+        Args:
+        - source_name (str): The primary database file.
+        - replica_name (str): The replica database file, created when missing.
+        """
+        timeout = settings.SQLITE_BUSY_TIMEOUT
+        source = sqlite3.connect(source_name, timeout=timeout)
+        replica = sqlite3.connect(replica_name, timeout=timeout)
+
+        try:
+            source.backup(replica)
+        finally:
+            replica.close()
+            source.close()
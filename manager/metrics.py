@@ -0,0 +1,442 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from .analytics.chart_cache import get_chart_cache
+from .cache import cache_stats
+from .fragment_cache import get_fragment_cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Statistics of the request being handled, shared with the threads it hands work to
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+def escape_label(value):
+    """
+    Escape a label value for the Prometheus text format.
+
+    Args:
+    - value: The label value, converted to a string.
+
+    Returns:
+    - str: The escaped value.
+    """
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(names, values, extra=''):
+    """
+    Format a label set for the Prometheus text format.
+
+    Args:
+    - names (tuple): The label names.
+    - values (tuple): The label values.
+    - extra (str): An already formatted label appended to the set, e.g. 'le="0.5"'.
+
+    Returns:
+    - str: The label set in braces, or an empty string without labels.
+    """
+    labels = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+
+    if extra:
+        labels.append(extra)
+
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+class Counter:
+    """
+    A monotonically increasing count per label set.
+
+    Attributes:
+    - name: str - The metric name.
+    - help: str - The metric description.
+    - labels: tuple - The label names.
+    """
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        """
+        Increase the count of a label set.
+
+        Args:
+        - *label_values: The label values, in the order of the label names.
+        - amount (float): The increment.
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        """
+        Return the exposition lines of the counter.
+
+        Returns:
+        - list: Prometheus text format lines.
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+
+        return [f'{self.name}{format_labels(self.labels, labels)} {value}' for labels, value in values]
+
+class Histogram:
+    """
+    Observations counted in cumulative buckets per label set, with their sum and count.
+
+    Attributes:
+    - name: str - The metric name.
+    - help: str - The metric description.
+    - labels: tuple - The label names.
+    - buckets: tuple - Increasing upper bounds of the buckets, +Inf is implied.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        Record an observation.
+
+        Args:
+        - value (float): The observed value.
+        - *label_values: The label values, in the order of the label names.
+        """
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            state = self._values.get(label_values)
+
+            if state is None:
+                # Per bucket counts (the last one for +Inf), sum and count
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        """
+        Return the exposition lines of the histogram.
+
+        Returns:
+        - list: Prometheus text format lines.
+        """
+        with self._lock:
+            values = sorted((labels, ([*counts], total, count)) for labels, (counts, total, count) in self._values.items())
+
+        lines = []
+
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labels, labels, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+
+            lines.append(f'{self.name}_sum{format_labels(self.labels, labels)} {total}')
+            lines.append(f'{self.name}_count{format_labels(self.labels, labels)} {count}')
+
+        return lines
+
+class CallbackMetric:
+    """
+    Values read from a callback when the metrics are exposed, for counters kept elsewhere.
+
+    Attributes:
+    - name: str - The metric name.
+    - help: str - The metric description.
+    - collect: callable - Returns (label values tuple, value) pairs.
+    - labels: tuple - The label names.
+    - type: str - The Prometheus metric type, 'gauge' or 'counter'.
+    """
+    def __init__(self, name, help, collect, labels=(), type='gauge'):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.labels = labels
+        self.type = type
+
+    def samples(self):
+        """
+        Return the exposition lines of the metric.
+
+        Returns:
+        - list: Prometheus text format lines.
+        """
+        return [f'{self.name}{format_labels(self.labels, labels)} {value}' for labels, value in self.collect()]
+
+class MetricsRegistry:
+    """
+    The in-process metrics, exposed in the Prometheus text format.
+
+    Each worker process keeps its own registry, Prometheus aggregates them across scraped workers.
+
+    Methods:
+    - register(metric): Add a metric and return it.
+    - render(): Return every metric in the Prometheus text format.
+    """
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """
+        Add a metric, replacing one with the same name.
+
+        Args:
+        - metric: A Counter, Histogram or CallbackMetric.
+
+        Returns:
+        - The metric.
+        """
+        self.metrics[metric.name] = metric
+
+        return metric
+
+    def render(self):
+        """
+        Return every metric in the Prometheus text exposition format.
+
+        Returns:
+        - str: The exposition text.
+        """
+        lines = []
+
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+
+        return '\n'.join(lines) + '\n'
+
+def chart_cache_samples(counter):
+    """
+    Read a chart cache counter for the chart cache metrics.
+
+    Args:
+    - counter (str): 'hits' or 'misses'.
+
+    Returns:
+    - list: A single sample without labels, none when the chart cache is disabled.
+    """
+    chart_cache = get_chart_cache()
+
+    return [((), chart_cache.stats()[counter])] if chart_cache is not None else []
+
+def fragment_cache_samples(counter):
+    """
+    Read a fragment cache counter for the fragment cache metrics.
+
+    Args:
+    - counter (str): 'hits' or 'misses'.
+
+    Returns:
+    - list: One sample per fragment name, none when the fragment cache is disabled.
+    """
+    fragment_cache = get_fragment_cache()
+
+    if fragment_cache is None:
+        return []
+
+    return [((name,), stats[counter]) for name, stats in fragment_cache.stats().items()]
+
+def cache_samples():
+    """
+    Read the counters of the manager.cache namespaces for the cache metrics.
+
+    Returns:
+    - list: One sample per namespace and result: a hit of the local or the shared tier, or a miss.
+    """
+    return [
+        ((namespace, result), stats[counter])
+        for namespace, stats in cache_stats().items()
+        for result, counter in (('local_hit', 'local_hits'), ('shared_hit', 'shared_hits'), ('miss', 'misses'))
+    ]
+
+registry = MetricsRegistry()
+
+requests_total = registry.register(Counter(
+    'taskmanager_requests_total', 'Requests handled, by view and status code.', ('view', 'status'),
+))
+request_duration = registry.register(Histogram(
+    'taskmanager_request_duration_seconds', 'Time to produce a response, by view.', ('view',),
+))
+request_db_queries = registry.register(Histogram(
+    'taskmanager_request_db_queries', 'Database queries run per request, by view.', ('view',), QUERY_COUNT_BUCKETS,
+))
+request_db_duration = registry.register(Histogram(
+    'taskmanager_request_db_duration_seconds', 'Time spent in database queries per request, by view.', ('view',),
+))
+request_template_duration = registry.register(Histogram(
+    'taskmanager_request_template_duration_seconds', 'Time spent rendering templates per request, by view.', ('view',),
+))
+request_chart_duration = registry.register(Histogram(
+    'taskmanager_request_chart_duration_seconds', 'Time spent rendering charts per request, by view.', ('view',),
+))
+response_size = registry.register(Histogram(
+    'taskmanager_response_size_bytes', 'Size of non-streaming response bodies, by view.', ('view',), SIZE_BUCKETS,
+))
+chart_render_duration = registry.register(Histogram(
+    'taskmanager_chart_render_duration_seconds', 'Time to render a chart missing from the chart cache.', ('method', 'backend'),
+))
+registry.register(CallbackMetric(
+    'taskmanager_chart_cache_hits_total', 'Charts served from the chart cache.',
+    lambda: chart_cache_samples('hits'), type='counter',
+))
+registry.register(CallbackMetric(
+    'taskmanager_chart_cache_misses_total', 'Charts missing from the chart cache.',
+    lambda: chart_cache_samples('misses'), type='counter',
+))
+registry.register(CallbackMetric(
+    'taskmanager_cache_lookups_total', 'Lookups in the two-tier cache, by namespace and result.',
+    cache_samples, ('namespace', 'result'), type='counter',
+))
+registry.register(CallbackMetric(
+    'taskmanager_fragment_cache_hits_total', 'Template fragments served from the fragment cache, by fragment.',
+    lambda: fragment_cache_samples('hits'), ('fragment',), type='counter',
+))
+registry.register(CallbackMetric(
+    'taskmanager_fragment_cache_misses_total', 'Template fragments missing from the fragment cache, by fragment.',
+    lambda: fragment_cache_samples('misses'), ('fragment',), type='counter',
+))
+
+def view_name(request):
+    """
+    Return the metrics label of the view handling a request.
+
+    Args:
+    - request: HttpRequest - The handled request.
+
+    Returns:
+    - str: The URL pattern name, so labels stay few whatever the URL parameters.
+    """
+    match = getattr(request, 'resolver_match', None)
+
+    return match.view_name if match is not None else 'unresolved'
+
+class RequestStats:
+    """
+    Time and query counters of a request, filled while it is handled.
+
+    Attributes:
+    - request: HttpRequest - The handled request.
+    - queries: int - Number of database queries.
+    - db_seconds: float - Time spent in database queries.
+    - template_seconds: float - Time spent rendering templates.
+    - chart_seconds: float - Time spent rendering charts.
+    """
+    __slots__ = ('request', 'queries', 'db_seconds', 'template_seconds', 'chart_seconds')
+
+    def __init__(self, request=None):
+        self.request = request
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.chart_seconds = 0.0
+
+    def record(self, view, status, seconds, size):
+        """
+        Add the request to the registry metrics.
+
+        Args:
+        - view (str): The view name.
+        - status (int): The response status code.
+        - seconds (float): Time to produce the response.
+        - size (int): Size of the response body, None for streaming responses.
+        """
+        requests_total.inc(view, status)
+        request_duration.observe(seconds, view)
+        request_db_queries.observe(self.queries, view)
+        request_db_duration.observe(self.db_seconds, view)
+        request_template_duration.observe(self.template_seconds, view)
+        request_chart_duration.observe(self.chart_seconds, view)
+
+        if size is not None:
+            response_size.observe(size, view)
+
+def query_timer(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding query counts and time to the current request statistics.
+
+    Installed on every connection, see manager.signals.install_query_wrappers. Queries run
+    outside of a request cost one context variable lookup.
+    """
+    stats = current_request_stats.get()
+
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+def record_chart_render(method, backend, seconds):
+    """
+    Record the rendering time of a chart.
+
+    Args:
+    - method (str): The generator method name.
+    - backend (str): The chart backend name.
+    - seconds (float): The rendering time.
+    """
+    chart_render_duration.observe(seconds, method, backend)
+
+def record_chart_batch(seconds):
+    """
+    Add the time spent rendering a batch of charts to the current request statistics.
+
+    Args:
+    - seconds (float): Wall time of the batch, cache lookups included.
+    """
+    stats = current_request_stats.get()
+
+    if stats is not None:
+        stats.chart_seconds += seconds
+
+class InstrumentedTemplate(Template):
+    """
+    A Django template adding its rendering time to the current request statistics.
+    """
+    def render(self, context=None, request=None):
+        stats = current_request_stats.get()
+
+        if stats is None:
+            return super().render(context, request)
+
+        start = time.perf_counter()
+
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - start
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, timing the templates rendered during requests.
+
+    Included templates render inside their parent template and are not counted twice.
+    """
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
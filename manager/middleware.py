@@ -0,0 +1,333 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import RequestStats, current_request_stats, view_name
+from .profiling import RequestProfiler
+from .routers import RoutingState, replica_aliases, routing_state
+from .sharding import ShardState, shard_aliases, shard_for_id, shard_state, user_shard
+from .workload import describe_request, record_request
+
+logger = logging.getLogger(__name__)
+
+class RequestMetricsMiddleware:
+    """
+    Records the latency, database queries and time, template and chart rendering time and
+    response size of every request in the in-process metrics registry, labelled by view name.
+
+    Database queries are counted by the execute wrapper installed on every connection and templates
+    by the instrumented template backend, both report to the statistics of the current request
+    through a context variable, so work handed to other threads by async views is counted too.
+    Works in both sync and async stacks.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def record(self, request, response, stats, start):
+        """
+        Add a handled request to the metrics.
+        """
+        size = None if response.streaming else len(response.content)
+        stats.record(view_name(request), response.status_code, time.perf_counter() - start, size)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats(request)
+        token = current_request_stats.set(stats)
+        start = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+
+        self.record(request, response, stats, start)
+
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats(request)
+        token = current_request_stats.set(stats)
+        start = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+
+        self.record(request, response, stats, start)
+
+        return response
+
+class ProfilingMiddleware:
+    """
+    Profiles a sample of the requests, one in PROFILE_SAMPLE_RATE, and the requests of staff users
+    sending the PROFILE_HEADER header, see manager.profiling.RequestProfiler.
+
+    Profiled responses carry the profile id in an X-Profile-Id header. Must come after the
+    authentication middleware. In async views only the event loop thread is profiled, not the
+    work handed to other threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def profile_reason(request):
+        """
+        Tell whether a request is profiled.
+
+        Args:
+        - request: HttpRequest - The incoming request.
+
+        Returns:
+        - str: 'header' or 'sample' for profiled requests, None otherwise.
+        """
+        header = getattr(settings, 'PROFILE_HEADER', None)
+
+        if header and request.headers.get(header) and request.user.is_staff:
+            return 'header'
+
+        sample_rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+
+        if sample_rate and random.randrange(sample_rate) == 0:
+            return 'sample'
+
+        return None
+
+    @staticmethod
+    def finish(profiler, request, response):
+        """
+        Store a profile and tag the response with its id.
+        """
+        profiler.stop(request, response)
+
+        if response is not None:
+            response['X-Profile-Id'] = profiler.id
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        reason = self.profile_reason(request)
+        profiler = RequestProfiler(reason) if reason else None
+
+        if profiler is None or not profiler.start():
+            return self.get_response(request)
+
+        response = None
+
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finish(profiler, request, response)
+
+        return response
+
+    async def __acall__(self, request):
+        # Reading request.user may query the database, only do it when the header is sent
+        header = getattr(settings, 'PROFILE_HEADER', None)
+
+        if header and request.headers.get(header):
+            reason = await sync_to_async(self.profile_reason)(request)
+        else:
+            reason = self.profile_reason(request)
+
+        profiler = RequestProfiler(reason) if reason else None
+
+        if profiler is None or not profiler.start():
+            return await self.get_response(request)
+
+        response = None
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            # The profiler must be disabled from the thread it was enabled in
+            self.finish(profiler, request, response)
+
+        return response
+
+class RequestRecordingMiddleware:
+    """
+    Records the shape of every request to the REQUEST_RECORDING_LOG JSON lines file, to replay
+    production-like traffic with the replay_workload command, see manager.workload.
+
+    Only the route, the URL parameter names and a description of the query parameters are
+    recorded: ids become placeholders, texts their length and dates their offset from the
+    request day. No value, path or user is stored. Unused when REQUEST_RECORDING_LOG is empty.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_RECORDING_LOG', None):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def record(request, response, start):
+        """
+        Append the shape of a handled request to the recording.
+        """
+        try:
+            record_request(describe_request(request, response, time.perf_counter() - start))
+        except OSError:
+            logger.exception('Could not write the request recording')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, start)
+
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, start)
+
+        return response
+
+class ReplicaRoutingMiddleware:
+    """
+    Gives each request its replica routing state, see manager.routers.PrimaryReplicaRouter.
+
+    Requests with an unsafe method read from the primary. A request that wrote keeps the reads of
+    its session on the primary for REPLICA_STICKY_SECONDS, so users see their own writes while the
+    replicas catch up. Must come after the session middleware. Unused without replicas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    session_key = '_primary_until'
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def start(self, request):
+        """
+        Return the routing state of an incoming request.
+        """
+        sticky = request.session.get(self.session_key, 0) > time.time()
+
+        return RoutingState(primary=sticky or request.method not in ('GET', 'HEAD', 'OPTIONS'))
+
+    def finish(self, request, state):
+        """
+        Keep the session on the primary after a write.
+        """
+        if state.wrote:
+            request.session[self.session_key] = time.time() + settings.REPLICA_STICKY_SECONDS
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = self.start(request)
+        token = routing_state.set(state)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+
+        self.finish(request, state)
+
+        return response
+
+    async def __acall__(self, request):
+        # Loading the session reads the database
+        state = await sync_to_async(self.start)(request)
+        token = routing_state.set(state)
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+
+        await sync_to_async(self.finish)(request, state)
+
+        return response
+
+class ShardMiddleware:
+    """
+    Gives each request its shard, see manager.routers.ShardRouter.
+
+    Requests use the shard of the authenticated user. Views addressing a row with a 'pk' argument
+    use the shard holding it instead, so assignees reach tasks owned by users of other shards.
+    Must come after the authentication middleware. Unused without shards.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not shard_aliases():
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def start(self, request):
+        """
+        Return the shard state of an incoming request.
+        """
+        return ShardState(user_shard(request.user.pk) if request.user.is_authenticated else None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = shard_state.get()
+
+        if state is not None and 'pk' in view_kwargs:
+            state.alias = shard_for_id(view_kwargs['pk'])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = shard_state.set(self.start(request))
+
+        try:
+            return self.get_response(request)
+        finally:
+            shard_state.reset(token)
+
+    async def __acall__(self, request):
+        # Loading the user reads the database
+        token = shard_state.set(await sync_to_async(self.start)(request))
+
+        try:
+            return await self.get_response(request)
+        finally:
+            shard_state.reset(token)
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+
+
+def backfill_daily_task_counts(apps, schema_editor):
+    Task = apps.get_model('manager', 'Task')
+    DailyTaskCount = apps.get_model('manager', 'DailyTaskCount')
+    db_alias = schema_editor.connection.alias
+    dimensions = ('user_id', 'status_id', 'priority_id', 'assignee_id')
+
+    counts = defaultdict(lambda: [0, 0])
+    tasks = Task.objects.using(db_alias).order_by()
+
+    for row in tasks.values(*dimensions, 'created_at').annotate(count=models.Count('id')):
+        counts[tuple(row[name] for name in dimensions) + (row['created_at'],)][0] += row['count']
+
+    completed = tasks.filter(completed=True, completed_at__isnull=False)
+    for row in completed.values(*dimensions, 'completed_at').annotate(count=models.Count('id')):
+        counts[tuple(row[name] for name in dimensions) + (row['completed_at'],)][1] += row['count']
+
+    DailyTaskCount.objects.using(db_alias).bulk_create([
+        DailyTaskCount(
+            user_id=user_id, status_id=status_id, priority_id=priority_id, assignee_id=assignee_id, day=day,
+            created_count=created, completed_count=completed,
+        )
+        for (user_id, status_id, priority_id, assignee_id, day), (created, completed) in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('manager', '0011_task_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTaskCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('created_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('assignee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assigned_daily_task_counts', to=settings.AUTH_USER_MODEL)),
+                ('priority', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='manager.priority')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='manager.status')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['assignee', 'day'], name='manager_dai_assigne_3cd8ea_idx')],
+                'unique_together': {('user', 'day', 'status', 'priority', 'assignee')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_task_counts, migrations.RunPython.noop),
+    ]
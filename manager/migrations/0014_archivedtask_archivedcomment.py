@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('manager', '0013_usershard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(db_index=True)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateField()),
+                ('due_date', models.DateField()),
+                ('completed', models.BooleanField(default=True)),
+                ('completed_at', models.DateField(blank=True, null=True)),
+                ('archived_at', models.DateField()),
+                ('assignee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_assignee', to=settings.AUTH_USER_MODEL)),
+                ('priority', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='manager.priority')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='manager.status')),
+                ('tags', models.ManyToManyField(related_name='archived_tasks', to='manager.tag')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='manager.archivedtask')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['user', 'completed_at'], name='manager_arc_user_id_4144c1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['assignee', 'completed_at'], name='manager_arc_assigne_03447a_idx'),
+        ),
+    ]
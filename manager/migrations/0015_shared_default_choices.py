@@ -0,0 +1,154 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:24
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+import django.db.models.deletion
+
+
+DEFAULT_STATUSES = ('To Do', 'In Progress', 'On Hold', 'Archived')
+DEFAULT_PRIORITIES = ('Low', 'Medium', 'High')
+
+
+def collapse_default_choices(apps, schema_editor):
+    DailyTaskCount = apps.get_model('manager', 'DailyTaskCount')
+    db_alias = schema_editor.connection.alias
+    quote = schema_editor.connection.ops.quote_name
+    counts = quote(DailyTaskCount._meta.db_table)
+    choice_tables = {name: quote(apps.get_model('manager', name)._meta.db_table) for name in ('Status', 'Priority')}
+    owners = ' UNION '.join(f'SELECT user_id FROM {choices} WHERE user_id IS NOT NULL' for choices in choice_tables.values())
+
+    # The users holding choices on the database who deleted a default keep it deleted: they get a
+    # hidden row of its name, overriding the shared default
+    with schema_editor.connection.cursor() as cursor:
+        for model_name, names in (('Status', DEFAULT_STATUSES), ('Priority', DEFAULT_PRIORITIES)):
+            choices = choice_tables[model_name]
+
+            for name in names:
+                cursor.execute(
+                    f'INSERT INTO {choices} (user_id, name, hidden) SELECT owners.user_id, %s, %s FROM ({owners}) owners '
+                    f'WHERE NOT EXISTS (SELECT 1 FROM {choices} WHERE user_id = owners.user_id AND name = %s)',
+                    [name, True, name],
+                )
+
+    for model_name, field, other, names in (
+        ('Status', 'status', 'priority', DEFAULT_STATUSES),
+        ('Priority', 'priority', 'status', DEFAULT_PRIORITIES),
+    ):
+        model = apps.get_model('manager', model_name)
+
+        for name in names:
+            default = model.objects.using(db_alias).create(user=None, name=name)
+            copies = model.objects.using(db_alias).filter(user__isnull=False, name=name, hidden=False)
+            copy_ids = f'SELECT id FROM {quote(model._meta.db_table)} WHERE user_id IS NOT NULL AND name = %s AND NOT hidden'
+
+            for task_model in ('Task', 'ArchivedTask'):
+                apps.get_model('manager', task_model).objects.using(db_alias).filter(**{f'{field}__in': copies}).update(**{field: default})
+
+            with schema_editor.connection.cursor() as cursor:
+                # The copies of a user become one default, their daily counts are summed
+                cursor.execute(
+                    f'INSERT INTO {counts} (user_id, day, {field}_id, {other}_id, assignee_id, created_count, completed_count) '
+                    f'SELECT user_id, day, %s, {other}_id, assignee_id, SUM(created_count), SUM(completed_count) '
+                    f'FROM {counts} WHERE {field}_id IN ({copy_ids}) GROUP BY user_id, day, {other}_id, assignee_id',
+                    [default.pk, name],
+                )
+                cursor.execute(f'DELETE FROM {counts} WHERE {field}_id IN ({copy_ids})', [name])
+                cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE id IN ({copy_ids})', [name])
+
+
+def copy_default_choices(apps, schema_editor):
+    """
+    Give back each user its own copy of the defaults, as before the migration: the users holding
+    data on the database get one, unless they hid the default, and the tasks, archived tasks and
+    daily counts of each user move to its copy (or to its own row of the same name) before the
+    defaults are deleted. The rows hiding a default are deleted last, without the field they would
+    be offered under its name.
+    """
+    db_alias = schema_editor.connection.alias
+    quote = schema_editor.connection.ops.quote_name
+    table = lambda app_label, model_name: quote(apps.get_model(app_label, model_name)._meta.db_table)
+    counts = table('manager', 'DailyTaskCount')
+    owner_tables = (table('manager', 'Task'), table('manager', 'ArchivedTask'), counts)
+    holders = ' UNION '.join(
+        f'SELECT user_id FROM {table("manager", model_name)} WHERE user_id IS NOT NULL' for model_name in ('Status', 'Priority')
+    )
+
+    if db_alias == DEFAULT_DB_ALIAS:
+        # Users never moved to a shard keep their data, and their choices, on the default database
+        holders += (
+            f' UNION SELECT id FROM {table(*settings.AUTH_USER_MODEL.split("."))} '
+            f'WHERE id NOT IN (SELECT user_id FROM {table("manager", "UserShard")})'
+        )
+
+    for model_name, field, other in (('Status', 'status', 'priority'), ('Priority', 'priority', 'status')):
+        choices = table('manager', model_name)
+        defaults = f'SELECT id FROM {choices} WHERE user_id IS NULL'
+        referencing = ' UNION '.join(f'SELECT user_id FROM {owner} WHERE {field}_id IN ({defaults})' for owner in owner_tables)
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'SELECT id, name FROM {choices} WHERE user_id IS NULL')
+
+            for default_id, name in cursor.fetchall():
+                copy = f'SELECT MIN(id) FROM {choices} WHERE user_id = {{owner}}.user_id AND name = %s AND NOT hidden'
+
+                cursor.execute(
+                    f'INSERT INTO {choices} (user_id, name, hidden) SELECT users.user_id, %s, %s FROM ('
+                    f'{referencing} UNION SELECT user_id FROM ({holders}) holders WHERE NOT EXISTS ('
+                    f'SELECT 1 FROM {choices} WHERE user_id = holders.user_id AND name = %s AND hidden)'
+                    f') users WHERE NOT EXISTS (SELECT 1 FROM {choices} WHERE user_id = users.user_id AND name = %s AND NOT hidden)',
+                    [name, False, name, name],
+                )
+
+                for owner in owner_tables[:2]:
+                    cursor.execute(
+                        f'UPDATE {owner} SET {field}_id = ({copy.format(owner=owner)}) WHERE {field}_id = %s',
+                        [name, default_id],
+                    )
+
+                # Added to the rows the user's own choice may already have for the same dimensions
+                cursor.execute(
+                    f'INSERT INTO {counts} (user_id, day, {field}_id, {other}_id, assignee_id, created_count, completed_count) '
+                    f'SELECT user_id, day, ({copy.format(owner=counts)}), {other}_id, assignee_id, SUM(created_count), SUM(completed_count) '
+                    f'FROM {counts} WHERE {field}_id = %s GROUP BY user_id, day, {other}_id, assignee_id '
+                    f'ON CONFLICT (user_id, day, status_id, priority_id, assignee_id) DO UPDATE SET '
+                    f'created_count = created_count + excluded.created_count, '
+                    f'completed_count = completed_count + excluded.completed_count',
+                    [name, default_id],
+                )
+                cursor.execute(f'DELETE FROM {counts} WHERE {field}_id = %s', [default_id])
+                cursor.execute(f'DELETE FROM {choices} WHERE id = %s', [default_id])
+
+    for model_name in ('Status', 'Priority'):
+        apps.get_model('manager', model_name).objects.using(db_alias).filter(hidden=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('manager', '0014_archivedtask_archivedcomment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='priority',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='status',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='priority',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='status',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(collapse_default_choices, copy_default_choices),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0016_task_updated_at_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.PositiveBigIntegerField()),
+            ],
+        ),
+    ]
@@ -2,13 +2,61 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.db import models
 
+class ChoiceQuerySet(models.QuerySet):
+    """
+    QuerySet of the choices offered on tasks: statuses, priorities and tags.
+
+    Methods:
+    - visible_to(user): Keeps the choices offered to a user.
+    """
+    def visible_to(self, user):
+        """
+        Keep the choices offered to a user: its own rows and the shared defaults (rows without
+        user) it does not override with a row of the same name.
+
+        Args:
+        - user: The user, or its id.
+
+        Returns:
+        - QuerySet: The choices of the user.
+        """
+        overridden = self.model.objects.filter(user=user).values('name')
+
+        return self.filter(models.Q(user=user) | models.Q(user__isnull=True) & ~models.Q(name__in=overridden))
+
+class DefaultChoiceQuerySet(ChoiceQuerySet):
+    """
+    QuerySet of the choices with shared defaults: statuses and priorities.
+
+    Methods:
+    - visible_to(user): Keeps the choices offered to a user, without the defaults it hides.
+    """
+    def visible_to(self, user):
+        """
+        Keep the choices offered to a user, see ChoiceQuerySet.visible_to. A hidden row of the
+        user overrides the default of the same name without being offered itself.
+
+        Args:
+        - user: The user, or its id.
+
+        Returns:
+        - QuerySet: The choices of the user.
+        """
+        return super().visible_to(user).exclude(hidden=True)
+
 class Status(models.Model):
     """
-    Represents the status of a task for a specific user.
+    Represents the status of a task, shared by every user or specific to one.
+
+    The shared defaults are stored once, without user. The rows of a user are its own additions,
+    or overrides of the default of the same name, see ChoiceQuerySet.visible_to. A hidden row
+    removes the default of the same name from the choices of its user.
 
     Fields:
-    - user: ForeignKey to the User model representing the owner of the status.
+    - user: ForeignKey to the User model representing the owner of the status, null for the
+      shared defaults.
     - name: CharField representing the name of the status.
+    - hidden: BooleanField telling whether the row only hides the default of the same name.
 
     Meta:
     - verbose_name_plural: Display name for the model in the Django admin.
@@ -16,8 +64,11 @@ class Status(models.Model):
     Methods:
     - __str__(): Returns the string representation of the status, which is its name.
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     name = models.CharField(max_length=50)
+    hidden = models.BooleanField(default=False)
+
+    objects = DefaultChoiceQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = 'Statuses'
@@ -33,11 +84,17 @@ class Status(models.Model):
 
 class Priority(models.Model):
     """
-    Represents the priority of a task for a specific user.
+    Represents the priority of a task, shared by every user or specific to one.
+
+    The shared defaults are stored once, without user. The rows of a user are its own additions,
+    or overrides of the default of the same name, see ChoiceQuerySet.visible_to. A hidden row
+    removes the default of the same name from the choices of its user.
 
     Fields:
-    - user: ForeignKey to the User model representing the owner of the priority.
+    - user: ForeignKey to the User model representing the owner of the priority, null for the
+      shared defaults.
     - name: CharField representing the name of the priority.
+    - hidden: BooleanField telling whether the row only hides the default of the same name.
 
     Meta:
     - verbose_name_plural: Display name for the model in the Django admin.
@@ -45,8 +102,11 @@ class Priority(models.Model):
     Methods:
     - __str__(): Returns the string representation of the priority, which is its name.
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     name = models.CharField(max_length=50)
+    hidden = models.BooleanField(default=False)
+
+    objects = DefaultChoiceQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = 'Priorities'
@@ -76,6 +136,8 @@ class Task(models.Model):
     - completed: BooleanField indicating whether the task is completed.
     - completed_at: DateField representing the date when the task was completed (if completed).
     - tags: ManyToManyField to the Tag model representing tags associated with the task.
+    - updated_at: DateTimeField representing the last change of the task, its tags or its
+      comments, the version of its detail page.
 
     Methods:
     - __str__(): Returns the string representation of the task, which is its title.
@@ -91,6 +153,7 @@ class Task(models.Model):
     completed = models.BooleanField(default=False)
     completed_at = models.DateField(null=True, blank=True)
     tags = models.ManyToManyField('Tag')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         """
@@ -143,6 +206,8 @@ class Tag(models.Model):
     name = models.CharField(max_length=50)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = ChoiceQuerySet.as_manager()
+
     def __str__(self):
         """
         Returns the string representation of the tag.
@@ -151,3 +216,183 @@ class Tag(models.Model):
         - String: The name of the tag.
         """
         return self.name
+
+class DailyTaskCount(models.Model):
+    """
+    Pre-aggregated task counts, one row per owner, day, status, priority and assignee.
+
+    Maintained incrementally on every task write (see manager.analytics.task_cube) so dashboard
+    charts slice these rows instead of aggregating the tasks themselves.
+
+    Fields:
+    - user: ForeignKey to the User model representing the owner of the counted tasks.
+    - day: DateField representing the day the tasks were created or completed.
+    - status: ForeignKey to the Status model representing the status of the counted tasks.
+    - priority: ForeignKey to the Priority model representing the priority of the counted tasks.
+    - assignee: ForeignKey to the User model representing the user assigned to the counted tasks.
+    - created_count: IntegerField representing the number of tasks created on the day.
+    - completed_count: IntegerField representing the number of tasks completed on the day.
+
+    Meta:
+    - unique_together: One row per combination of the dimensions, its index also serves slices by owner.
+    - indexes: Slices by assignee over a date range.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateField()
+    status = models.ForeignKey(Status, on_delete=models.CASCADE)
+    priority = models.ForeignKey(Priority, on_delete=models.CASCADE)
+    assignee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assigned_daily_task_counts')
+    created_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day', 'status', 'priority', 'assignee')
+        indexes = [
+            models.Index(fields=['assignee', 'day']),
+        ]
+
+    def __str__(self):
+        """
+        Returns the string representation of the counts.
+
+        Returns:
+        - String: The day and the created and completed task counts.
+        """
+        return f"{self.day}: {self.created_count} created, {self.completed_count} completed"
+
+class ArchivedTask(models.Model):
+    """
+    A completed task moved out of the Task table by the archival, see manager.archive.
+
+    Mirrors the columns of Task so the same filters and aggregates apply to both tables, and
+    stays counted in the DailyTaskCount rows.
+
+    Fields:
+    - original_id: BigIntegerField representing the id of the task it was archived from.
+    - user, title, description, created_at, due_date, status, assignee, priority, completed,
+      completed_at, tags, updated_at: The fields of the archived task, see Task.
+    - archived_at: DateField representing the date when the task was archived.
+
+    Meta:
+    - indexes: Visibility queries by owner and by assignee, narrowed by completion date.
+    """
+    original_id = models.BigIntegerField(db_index=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    title = models.CharField(max_length=100)
+    description = models.TextField(null=True, blank=True)
+    created_at = models.DateField()
+    due_date = models.DateField()
+    status = models.ForeignKey(Status, on_delete=models.PROTECT)
+    assignee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_assignee')
+    priority = models.ForeignKey(Priority, on_delete=models.PROTECT)
+    completed = models.BooleanField(default=True)
+    completed_at = models.DateField(null=True, blank=True)
+    tags = models.ManyToManyField('Tag', related_name='archived_tasks')
+    updated_at = models.DateTimeField()
+    archived_at = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'completed_at']),
+            models.Index(fields=['assignee', 'completed_at']),
+        ]
+
+    def __str__(self):
+        """
+        Returns the string representation of the archived task, which is its title.
+
+        Returns:
+        - String: The title of the task.
+        """
+        return self.title
+
+class ArchivedComment(models.Model):
+    """
+    A comment of an archived task, see ArchivedTask.
+
+    Fields:
+    - task: ForeignKey to the ArchivedTask model representing the task the comment belongs to.
+    - author, content, created_at: The fields of the archived comment, see Comment.
+    """
+    task = models.ForeignKey(ArchivedTask, on_delete=models.CASCADE, related_name='comments')
+    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    content = models.TextField()
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        """
+        Returns the string representation of the archived comment.
+
+        Returns:
+        - String: A formatted string including the author's username and the title of the associated task.
+        """
+        return f"Comment by {self.author.username} on {self.task.title}"
+
+class UserShard(models.Model):
+    """
+    Directory of the database holding the data of each user when sharding is on, see manager.sharding.
+
+    Stays on the default database. Users without an entry keep their data on the default database.
+
+    Fields:
+    - user: OneToOneField to the User model, the primary key.
+    - shard: CharField representing the database alias of the shard.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    shard = models.CharField(max_length=100)
+
+    def __str__(self):
+        """
+        Returns the string representation of the directory entry.
+
+        Returns:
+        - String: The user id and the shard alias.
+        """
+        return f"{self.user_id}: {self.shard}"
+
+class DataVersion(models.Model):
+    """
+    Version of the data shown to a user, bumped after every write changing its pages, see
+    manager.versions.
+
+    Stays on the default database. Users without a row are at version 0.
+
+    Fields:
+    - user: OneToOneField to the User model, the primary key.
+    - version: PositiveBigIntegerField incremented by each bump.
+    - updated_at: DateTimeField representing the date and time of the last bump.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        """
+        Returns the string representation of the data version.
+
+        Returns:
+        - String: The user id and the version.
+        """
+        return f"{self.user_id}: {self.version}"
+
+class CacheEpoch(models.Model):
+    """
+    Epoch of the database, started by every migrate and flush, see manager.signals.start_cache_epoch.
+
+    The keys of manager.cache include it: the data versions restart when the database is
+    recreated, flushed or restored, and must not find the values cached for the previous data.
+    Stays on the default database, in a single row.
+
+    Fields:
+    - epoch: PositiveBigIntegerField representing the start of the epoch in nanoseconds.
+    """
+    epoch = models.PositiveBigIntegerField()
+
+    def __str__(self):
+        """
+        Returns the string representation of the epoch.
+
+        Returns:
+        - String: The epoch.
+        """
+        return str(self.epoch)
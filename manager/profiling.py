@@ -0,0 +1,208 @@
+import cProfile
+import datetime
+import json
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from .metrics import view_name
+
+PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+
+# A single request is profiled at a time: tracemalloc is process wide and profiling
+# overlapping requests would slow them all down
+_profile_lock = threading.Lock()
+
+def profile_dir():
+    """
+    Return the directory holding the profiles, creating it when missing.
+
+    Returns:
+    - Path: The PROFILE_DIR setting.
+    """
+    path = Path(settings.PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+
+    return path
+
+def profile_path(profile_id, kind):
+    """
+    Return the path of a stored profile file.
+
+    Args:
+    - profile_id (str): The profile id.
+    - kind (str): 'prof' for the cProfile stats, 'json' for the summary.
+
+    Returns:
+    - Path: The file path, None for a malformed id or kind.
+    """
+    if not PROFILE_ID.match(profile_id) or kind not in ('prof', 'json'):
+        return None
+
+    return profile_dir() / f'{profile_id}.{kind}'
+
+def list_profiles():
+    """
+    Return the summaries of the stored profiles, most recent first.
+
+    Returns:
+    - list: The summary dicts, without their function and allocation tables.
+    """
+    summaries = []
+
+    for path in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            summary = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+
+        summaries.append({key: value for key, value in summary.items() if key not in ('functions', 'allocations')})
+
+    return summaries
+
+def prune_profiles(keep):
+    """
+    Delete the oldest profiles beyond a maximum number.
+
+    Args:
+    - keep (int): Number of profiles kept.
+    """
+    summaries = sorted(profile_dir().glob('*.json'), reverse=True)
+
+    for path in summaries[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+
+class RequestProfiler:
+    """
+    Profiles the handling of a single request with cProfile and, when PROFILE_MEMORY is on,
+    tracemalloc, then stores the stats and a JSON summary in PROFILE_DIR.
+
+    Attributes:
+    - id: str - The profile id, starting with its UTC timestamp.
+    - reason: str - Why the request is profiled, 'sample' or 'header'.
+
+    Methods:
+    - start(): Start profiling, returns False when another request is being profiled.
+    - stop(request, response): Stop profiling and store the profile.
+    """
+    def __init__(self, reason):
+        self.id = f"{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.reason = reason
+        self.profiler = cProfile.Profile()
+        self.memory = getattr(settings, 'PROFILE_MEMORY', True)
+        self.started_tracemalloc = False
+        self.snapshot = None
+        self.start_time = None
+
+    def start(self):
+        """
+        Start profiling the current thread.
+
+        Returns:
+        - bool: False when another request is already being profiled.
+        """
+        if not _profile_lock.acquire(blocking=False):
+            return False
+
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self.started_tracemalloc = True
+
+            tracemalloc.reset_peak()
+            self.snapshot = tracemalloc.take_snapshot()
+
+        self.start_time = time.perf_counter()
+        self.profiler.enable()
+
+        return True
+
+    def stop(self, request, response):
+        """
+        Stop profiling and store the cProfile stats and the summary.
+
+        Args:
+        - request: HttpRequest - The profiled request.
+        - response: HttpResponse - Its response, None when the view raised.
+        """
+        self.profiler.disable()
+        duration = time.perf_counter() - self.start_time
+
+        try:
+            summary = {
+                'id': self.id,
+                'reason': self.reason,
+                'path': request.path,
+                'method': request.method,
+                'view': view_name(request),
+                'status': response.status_code if response is not None else None,
+                'duration_ms': round(duration * 1000, 3),
+                'functions': self.top_functions(),
+            }
+
+            if self.memory:
+                summary.update(self.memory_summary())
+
+            self.profiler.dump_stats(profile_path(self.id, 'prof'))
+            profile_path(self.id, 'json').write_text(json.dumps(summary, indent=2))
+            prune_profiles(getattr(settings, 'PROFILE_MAX_FILES', 100))
+        finally:
+            if self.started_tracemalloc:
+                tracemalloc.stop()
+
+            _profile_lock.release()
+
+    def top_functions(self, limit=40):
+        """
+        Return the functions with the highest cumulative time.
+
+        Args:
+        - limit (int): Number of functions.
+
+        Returns:
+        - list: Dicts with the function location, call count, own time and cumulative time.
+        """
+        stats = pstats.Stats(self.profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+
+        return [
+            {
+                'function': f'{filename}:{line}({name})',
+                'calls': calls,
+                'own_ms': round(own_time * 1000, 3),
+                'cumulative_ms': round(cumulative_time * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, own_time, cumulative_time, _) in rows
+        ]
+
+    def memory_summary(self, limit=25):
+        """
+        Compare the memory allocated during the request with the snapshot taken before it.
+
+        Args:
+        - limit (int): Number of allocation sites listed.
+
+        Returns:
+        - dict: The peak traced memory and the allocation sites that grew the most.
+        """
+        _, peak = tracemalloc.get_traced_memory()
+        differences = tracemalloc.take_snapshot().compare_to(self.snapshot, 'lineno')[:limit]
+
+        return {
+            'peak_memory_kb': round(peak / 1024, 1),
+            'allocations': [
+                {
+                    'location': str(difference.traceback[0]),
+                    'size_diff_kb': round(difference.size_diff / 1024, 1),
+                    'count_diff': difference.count_diff,
+                }
+                for difference in differences
+            ],
+        }
@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+
+from .database import run_write
+from .models import ArchivedComment, ArchivedTask, Comment, DailyTaskCount, Priority, Status, Tag, Task
+from .sharding import data_aliases
+from .versions import bump_data_versions
+
+def purge_steps(quote):
+    """
+    Return the rows removed by a purge, in dependency order: the rows referencing a table are
+    deleted before its own rows, like Django's cascade does.
+
+    The cascade of deleting a user reaches the tasks it owns or is assigned to (with their tag
+    links and comments), the comments it wrote, the tag links to its tags and the daily counts
+    of its tasks or of the tasks assigned to it, in the live and the archive tables.
+
+    Args:
+    - quote (callable): Quotes a table name for the database.
+
+    Returns:
+    - list: (model, SQL condition) pairs, each '%s' of the conditions stands for the user id.
+    """
+    def tasks_of(model):
+        return f'SELECT id FROM {quote(model._meta.db_table)} WHERE user_id = %s OR assignee_id = %s'
+
+    tags = f'SELECT id FROM {quote(Tag._meta.db_table)} WHERE user_id = %s'
+
+    return [
+        (Comment, f'task_id IN ({tasks_of(Task)}) OR author_id = %s'),
+        (Task.tags.through, f'task_id IN ({tasks_of(Task)}) OR tag_id IN ({tags})'),
+        (ArchivedComment, f'task_id IN ({tasks_of(ArchivedTask)}) OR author_id = %s'),
+        (ArchivedTask.tags.through, f'archivedtask_id IN ({tasks_of(ArchivedTask)}) OR tag_id IN ({tags})'),
+        (DailyTaskCount, 'user_id = %s OR assignee_id = %s'),
+        (Task, 'user_id = %s OR assignee_id = %s'),
+        (ArchivedTask, 'user_id = %s OR assignee_id = %s'),
+        (Tag, 'user_id = %s'),
+        (Priority, 'user_id = %s'),
+        (Status, 'user_id = %s'),
+    ]
+
+def delete_batch(table, condition, user_id, batch_size, using):
+    """
+    Delete up to batch_size rows of a table matching a purge condition, see purge_steps.
+
+    Returns:
+    - int: The number of deleted rows.
+    """
+    quote = connections[using].ops.quote_name
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(table)} WHERE id IN (SELECT id FROM {quote(table)} WHERE {condition} LIMIT %s)',
+            [user_id] * condition.count('%s') + [batch_size],
+        )
+
+        return cursor.rowcount
+
+def count_purged_rows(user_id, using=DEFAULT_DB_ALIAS):
+    """
+    Count the rows a purge of a user would delete from a database.
+
+    Args:
+    - user_id (int): The user id.
+    - using (str): The database alias.
+
+    Returns:
+    - dict: Row counts keyed by table name, without the tables with no row to delete.
+    """
+    quote = connections[using].ops.quote_name
+    counts = {}
+
+    with connections[using].cursor() as cursor:
+        for model, condition in purge_steps(quote):
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {quote(model._meta.db_table)} WHERE {condition}',
+                [user_id] * condition.count('%s'),
+            )
+            count = cursor.fetchone()[0]
+
+            if count:
+                counts[model._meta.db_table] = count
+
+    return counts
+
+def purge_user(user_id, batch_size=None):
+    """
+    Delete a user and everything the deletion cascades to, with set-based DELETE statements.
+
+    Unlike QuerySet.delete, no row is loaded: each table is emptied of the user's rows in
+    batches of batch_size rows, one run_write transaction per batch so other writers interleave,
+    in dependency order on every database holding task data. No signal is sent for the deleted
+    rows: the daily counts of the deleted tasks are deleted with them and no live update is
+    published. The user row is then deleted by the ORM, whose collector only finds the few rows
+    left (shard directory entry, data version, groups, permissions, admin log), and the data
+    versions of the users sharing tasks with it are bumped. An interrupted purge is resumed by
+    running it again.
+
+    Args:
+    - user_id (int): The user id.
+    - batch_size (int): Number of rows deleted per transaction. Defaults to the PURGE_BATCH_SIZE setting.
+
+    Yields:
+    - tuple: The database alias, the table name and the number of rows deleted from it so far,
+      after each batch.
+    """
+    batch_size = settings.PURGE_BATCH_SIZE if batch_size is None else batch_size
+    shared = Q(user_id=user_id) | Q(assignee_id=user_id)
+    users = {
+        other for alias in data_aliases() for model in (Task, ArchivedTask)
+        for pair in model.objects.using(alias).filter(shared).values_list('user_id', 'assignee_id').distinct()
+        for other in pair
+    }
+
+    for alias in data_aliases():
+        for model, condition in purge_steps(connections[alias].ops.quote_name):
+            table = model._meta.db_table
+            deleted = 0
+
+            while True:
+                count = run_write(delete_batch, table, condition, user_id, batch_size, alias, using=alias)
+                deleted += count
+
+                if count:
+                    yield alias, table, deleted
+
+                if count < batch_size:
+                    break
+
+    run_write(lambda: User.objects.filter(pk=user_id).delete(), using=DEFAULT_DB_ALIAS)
+    bump_data_versions(users - {user_id})
@@ -0,0 +1,175 @@
+from django.db.models import Exists, F, OuterRef, Subquery
+
+from .models import ArchivedTask, DailyTaskCount, Tag, Task
+from .versions import touch_tasks
+
+def referencing_tasks(instance, user=None):
+    """
+    Return the live and archived tasks referencing a status, a priority or a tag.
+
+    Args:
+    - instance: The Status, Priority or Tag.
+    - user (int): Only return the tasks owned by this user id, e.g. for shared defaults.
+
+    Returns:
+    - tuple: The Task and the ArchivedTask querysets.
+    """
+    field = 'tags' if isinstance(instance, Tag) else type(instance).__name__.lower()
+    using = instance._state.db
+    owner = {} if user is None else {'user': user}
+
+    return (
+        Task.objects.using(using).filter(**{field: instance}, **owner),
+        ArchivedTask.objects.using(using).filter(**{field: instance}, **owner),
+    )
+
+def count_referencing_tasks(instance, user=None):
+    """
+    Count the live and archived tasks referencing a status, a priority or a tag.
+
+    Args:
+    - instance: The Status, Priority or Tag.
+    - user (int): Only count the tasks owned by this user id.
+
+    Returns:
+    - int: The number of tasks.
+    """
+    return sum(tasks.count() for tasks in referencing_tasks(instance, user))
+
+def reassign_tag_links(through, column, instance, replacement):
+    """
+    Move the links of a tag to its replacement with an UPDATE, then delete the links left, those
+    of the tasks already tagged with the replacement.
+
+    Args:
+    - through (Model): The through model of the tags field.
+    - column (str): The name of the field of the through model pointing at the task.
+    - instance (Tag): The replaced tag.
+    - replacement (Tag): The replacement tag.
+    """
+    links = through.objects.using(instance._state.db)
+    tagged = links.filter(tag=replacement, **{column: OuterRef(column)})
+
+    links.filter(tag=instance).exclude(Exists(tagged)).update(tag=replacement)
+    links.filter(tag=instance).delete()
+
+def reassign_daily_counts(field, instance, replacement, user=None):
+    """
+    Move the cube rows of a status or a priority to its replacement, adding them to the rows the
+    replacement already has for the same day and dimensions.
+
+    Args:
+    - field (str): 'status' or 'priority'.
+    - instance: The replaced Status or Priority.
+    - replacement: The replacement Status or Priority.
+    - user (int): Only move the rows of the tasks owned by this user id.
+    """
+    rows = DailyTaskCount.objects.using(instance._state.db)
+
+    if user is not None:
+        rows = rows.filter(user=user)
+
+    dimensions = {name: OuterRef(name) for name in ('user', 'day', 'status', 'priority', 'assignee') if name != field}
+    replaced = rows.filter(**{field: instance}, **dimensions)
+    merged = rows.filter(**{field: replacement}, **dimensions)
+
+    rows.filter(**{field: replacement}).filter(Exists(replaced)).update(
+        created_count=F('created_count') + Subquery(replaced.values('created_count')[:1]),
+        completed_count=F('completed_count') + Subquery(replaced.values('completed_count')[:1]),
+    )
+    rows.filter(**{field: instance}).exclude(Exists(merged)).update(**{field: replacement})
+    rows.filter(**{field: instance}).delete()
+
+def reassign(instance, replacement, user=None):
+    """
+    Point the tasks referencing a status or a priority to a replacement, with set-based UPDATE
+    statements on the live and archived tasks and the DailyTaskCount rows.
+
+    Args:
+    - instance: The replaced Status or Priority.
+    - replacement: The replacement Status or Priority, on the same database.
+    - user (int): Only move the tasks owned by this user id.
+
+    Returns:
+    - int: The number of live and archived tasks reassigned.
+    """
+    field = type(instance).__name__.lower()
+    reassigned = sum(touch_tasks(tasks, **{field: replacement}) for tasks in referencing_tasks(instance, user))
+    reassign_daily_counts(field, instance, replacement, user)
+
+    return reassigned
+
+def override_default(instance):
+    """
+    Move the tasks of the owner of a new status or priority from the shared default of the same
+    name, if any, to it: the new row overrides the default for its owner, and replaces the row
+    hiding the default, see hide_default.
+
+    Args:
+    - instance: The saved Status or Priority of a user.
+
+    Returns:
+    - int: The number of live and archived tasks reassigned.
+    """
+    choices = type(instance).objects.using(instance._state.db)
+    choices.filter(user=instance.user_id, name=instance.name, hidden=True).delete()
+    default = choices.filter(user__isnull=True, name=instance.name).first()
+
+    if default is None:
+        return 0
+
+    return reassign(default, instance, instance.user_id)
+
+def hide_default(default, user, replacement=None):
+    """
+    Remove a shared default status or priority from the choices of a user, with a hidden row of
+    the same name overriding it. The user's tasks are pointed to a replacement first.
+
+    Args:
+    - default: The shared default Status or Priority, on the database of the user.
+    - user (int): The user id.
+    - replacement: The Status or Priority replacing the default in the user's tasks, None when
+      no task uses it.
+
+    Returns:
+    - int: The number of live and archived tasks reassigned.
+    """
+    reassigned = 0 if replacement is None else reassign(default, replacement, user)
+    type(default).objects.using(default._state.db).create(user_id=user, name=default.name, hidden=True)
+
+    return reassigned
+
+def reassign_and_delete(instance, replacement=None):
+    """
+    Point the tasks referencing a status, a priority or a tag to a replacement, then delete it.
+
+    Every table is rewritten with set-based UPDATE statements, whatever the number of tasks: the
+    live and archived tasks, stamped as updated, the tag links and the DailyTaskCount rows, which
+    are merged into the rows of the replacement instead of being rebuilt. No task is loaded, so no
+    signal is sent and no live update is published. Run it through run_write, the deletion must see every
+    reference moved.
+
+    Args:
+    - instance: The Status, Priority or Tag to delete.
+    - replacement: A Status, Priority or Tag of the same type and database, None to delete a tag
+      with its links.
+
+    Returns:
+    - int: The number of live and archived tasks reassigned.
+    """
+    reassigned = 0
+
+    if isinstance(instance, Tag):
+        for tasks in referencing_tasks(instance):
+            touch_tasks(tasks)
+
+        if replacement is not None:
+            reassigned = count_referencing_tasks(instance)
+            reassign_tag_links(Task.tags.through, 'task', instance, replacement)
+            reassign_tag_links(ArchivedTask.tags.through, 'archivedtask', instance, replacement)
+    elif replacement is not None:
+        reassigned = reassign(instance, replacement)
+
+    instance.delete()
+
+    return reassigned
@@ -0,0 +1,143 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+
+from .sharding import current_shard, is_sharded
+
+# Apps whose reads always go to the primary: sessions decide who the user is and whether
+# their reads must see their own recent writes
+PRIMARY_ONLY_APPS = ('sessions',)
+
+class RoutingState:
+    """
+    Routing decisions of the request being handled.
+
+    Attributes:
+    - primary: bool - Whether reads go to the primary.
+    - wrote: bool - Whether the request wrote to the primary.
+    """
+    __slots__ = ('primary', 'wrote')
+
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.wrote = False
+
+# Shared with the threads the request hands work to, like the request metrics
+routing_state = ContextVar('routing_state', default=None)
+
+def replica_aliases():
+    """
+    Return the aliases of the read replicas.
+
+    Returns:
+    - list: The DATABASE_REPLICA_ALIASES setting.
+    """
+    return getattr(settings, 'DATABASE_REPLICA_ALIASES', [])
+
+@contextmanager
+def use_primary():
+    """
+    Send the reads of the block to the primary, e.g. the reads of a transaction that writes.
+
+    Once the block wrote, the rest of the request reads from the primary as well.
+    """
+    state = routing_state.get()
+
+    if state is None:
+        token = routing_state.set(RoutingState(primary=True))
+
+        try:
+            yield
+        finally:
+            routing_state.reset(token)
+
+        return
+
+    previous = state.primary
+    state.primary = True
+
+    try:
+        yield
+    finally:
+        state.primary = previous or state.wrote
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes to the primary database and the reads of requests to a random replica, see
+    DATABASE_REPLICAS.
+
+    Reads go to the primary outside of requests (commands read then write and cannot tell the
+    replication delay), when no replica is configured, for the PRIMARY_ONLY_APPS models, inside
+    use_primary blocks and, for read-your-writes consistency, for the rest of a request once it
+    wrote and for the following requests of the session during REPLICA_STICKY_SECONDS, see
+    manager.middleware.ReplicaRoutingMiddleware.
+    """
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        state = routing_state.get()
+
+        if not replicas or state is None or state.primary or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+
+        if state is not None:
+            state.wrote = True
+            state.primary = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, see the sync_replicas command
+        if db in replica_aliases():
+            return False
+
+        return None
+
+class ShardRouter:
+    """
+    Sends the sharded models to the shard of the request, see DATABASE_SHARDS and manager.sharding.
+
+    Rows already loaded stay on their database. Otherwise the shard comes from the using_shard
+    block or the request, see manager.middleware.ShardMiddleware. The default database and the
+    unsharded models are left to the next router. Users are copied to every shard, so any row
+    may reference a user. Every database gets every table.
+    """
+    def db_for_shard(self, model, instance=None, **hints):
+        if not is_sharded(model):
+            return None
+
+        # Related managers hint the instance they start from, users live on every database
+        if instance is not None and is_sharded(type(instance)) and instance._state.db is not None:
+            return instance._state.db
+
+        alias = current_shard()
+
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_read(self, model, **hints):
+        return self.db_for_shard(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_shard(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._state.db == obj2._state.db or isinstance(obj1, User) or isinstance(obj2, User):
+            return True
+
+        return None
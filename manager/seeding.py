@@ -0,0 +1,310 @@
+import random
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import invalidate_all
+from .models import Comment, DailyTaskCount, Priority, Status, Tag, Task
+
+# Same defaults as the shared rows of the 0015 migration and the post_save signal creating the
+# tag, which bulk inserts do not send
+DEFAULT_STATUSES = ('To Do', 'In Progress', 'On Hold', 'Archived')
+DEFAULT_PRIORITIES = ('Low', 'Medium', 'High')
+DEFAULT_TAGS = ('Home Task',)
+EXTRA_TAGS = ('Work', 'Urgent', 'Bug', 'Meeting', 'Research')
+
+# Relative weights, in the order of DEFAULT_STATUSES and DEFAULT_PRIORITIES
+OPEN_STATUS_WEIGHTS = (45, 35, 15, 5)
+COMPLETED_STATUS_WEIGHTS = (10, 50, 5, 35)
+PRIORITY_WEIGHTS = (30, 50, 20)
+
+VERBS = ('Review', 'Write', 'Fix', 'Plan', 'Update', 'Test', 'Deploy', 'Prepare', 'Clean up', 'Call')
+NOUNS = ('report', 'budget', 'release', 'invoice', 'meeting notes', 'roadmap', 'bug', 'garden', 'slides', 'backup')
+TASK_FIELDS = ('id', 'user', 'title', 'description', 'created_at', 'due_date', 'status', 'priority', 'assignee', 'completed', 'completed_at', 'updated_at')
+COMMENT_FIELDS = ('task', 'author', 'content', 'created_at')
+
+COMMENTS = ('Started on this.', 'Blocked, waiting for feedback.', 'Almost done.', 'Can you take a look?', 'Done, please check.')
+
+def next_id(model):
+    """
+    Return the first free primary key of a model, ids being assigned by the seeder.
+
+    Args:
+    - model: The model class.
+
+    Returns:
+    - int: One more than the largest primary key in use.
+    """
+    return (model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+
+def insert_rows(model, fields, rows):
+    """
+    Insert rows with a single parameterized statement, skipping model instances.
+
+    Dates and datetimes must already be adapted for the database by connection.ops.
+
+    Args:
+    - model: The model class.
+    - fields (tuple): Names of the fields, in the order of the row values.
+    - rows (list): Tuples of field values.
+    """
+    if not rows:
+        return
+
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(model._meta.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})', rows)
+
+def shared_defaults(model, names):
+    """
+    Return the ids of the shared default rows of a choice model, creating the missing ones.
+
+    Args:
+    - model: Status or Priority.
+    - names (tuple): The names of the defaults.
+
+    Returns:
+    - list: The ids of the defaults, in the order of names.
+    """
+    return [model.objects.get_or_create(user=None, name=name)[0].pk for name in names]
+
+def reset_sequences(*models):
+    """
+    Move the primary key sequences past the ids assigned by the seeder, where the database has them.
+
+    Args:
+    - *models: The model classes.
+    """
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+class Seeder:
+    """
+    Generates users with realistic task histories, using bulk inserts and a deterministic seed.
+
+    Task creation days lean towards recent days, older tasks are more likely completed, durations
+    and due dates follow log-normal distributions and part of the tasks are assigned to other users.
+    Rows are inserted without building model instances or sending signals, so the default tags
+    and the daily task counts the signals would maintain are written here too.
+
+    Attributes:
+    - rng: Random - The seeded random generator.
+    - today: date - The last day of the generated history.
+    - days: int - Number of days of history.
+    - assign_ratio: float - Share of the tasks assigned to another user.
+    - comments_per_task: float - Average number of comments per task.
+    - batch_size: int - Number of tasks generated and inserted at once.
+
+    Methods:
+    - seed(users, tasks_per_user, prefix, password, progress): Create the users and their data.
+    """
+    def __init__(self, seed=0, today=None, days=365, assign_ratio=0.3, comments_per_task=1.0, batch_size=5000):
+        self.rng = random.Random(seed)
+        self.today = today or date.today()
+        self.days = days
+        self.assign_ratio = assign_ratio
+        self.comments_per_task = comments_per_task
+        self.batch_size = batch_size
+
+    def create_users(self, count, prefix, password):
+        """
+        Create users with their default tags, tasks use the shared default statuses and priorities.
+
+        Args:
+        - count (int): Number of users.
+        - prefix (str): Prefix of the usernames, followed by the user number.
+        - password (str): The password of every user, hashed once.
+
+        Returns:
+        - list: (user id, status ids, priority ids, tag ids) tuples, in DEFAULT_* order.
+        """
+        hashed_password = make_password(password)
+        date_joined = connection.ops.adapt_datetimefield_value(timezone.now())
+        tag_names = DEFAULT_TAGS + EXTRA_TAGS
+        first_user, first_tag = next_id(User), next_id(Tag)
+        status_ids, priority_ids = shared_defaults(Status, DEFAULT_STATUSES), shared_defaults(Priority, DEFAULT_PRIORITIES)
+        owners = []
+
+        for index in range(count):
+            owners.append((
+                first_user + index,
+                status_ids,
+                priority_ids,
+                list(range(first_tag + index * len(tag_names), first_tag + (index + 1) * len(tag_names))),
+            ))
+
+        insert_rows(
+            User,
+            ('id', 'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff', 'is_active', 'date_joined'),
+            [
+                (user_id, hashed_password, False, f'{prefix}{index:06d}', '', '', f'{prefix}{index:06d}@example.com', False, True, date_joined)
+                for index, (user_id, _, _, _) in enumerate(owners)
+            ],
+        )
+
+        insert_rows(Tag, ('id', 'user', 'name'), [
+            (tag_id, owner[0], name) for owner in owners for tag_id, name in zip(owner[3], tag_names)
+        ])
+
+        reset_sequences(User, Tag)
+
+        return owners
+
+    def make_task(self, task_id, owner, user_ids):
+        """
+        Generate the field values of a task.
+
+        Args:
+        - task_id (int): The id of the task.
+        - owner (tuple): The owner, as returned by create_users.
+        - user_ids (list): Ids of the users tasks can be assigned to.
+
+        Returns:
+        - tuple: The values of the TASK_FIELDS, dates not adapted yet.
+        """
+        rng = self.rng
+        user_id, status_ids, priority_ids, _ = owner
+
+        age = int(self.days * rng.random() ** 2)
+        created_at = self.today - timedelta(days=age)
+        due_date = created_at + timedelta(days=int(rng.lognormvariate(2, 0.8)))
+        completed = rng.random() < min(0.95, 0.15 + age / max(self.days, 1))
+        completed_at = None
+
+        if completed:
+            duration = min(int(rng.lognormvariate(1.5, 1)), age)
+            completed_at = created_at + timedelta(days=duration)
+
+        weights = COMPLETED_STATUS_WEIGHTS if completed else OPEN_STATUS_WEIGHTS
+        assignee_id = rng.choice(user_ids) if rng.random() < self.assign_ratio else user_id
+
+        return (
+            task_id,
+            user_id,
+            f'{rng.choice(VERBS)} {rng.choice(NOUNS)} #{rng.randint(1, 9999)}',
+            rng.choice(COMMENTS) if rng.random() < 0.3 else None,
+            created_at,
+            due_date,
+            rng.choices(status_ids, weights)[0],
+            rng.choices(priority_ids, PRIORITY_WEIGHTS)[0],
+            assignee_id,
+            completed,
+            completed_at,
+            # Last changed when completed, or when created
+            timezone.make_aware(datetime.combine(completed_at or created_at, time(12))),
+        )
+
+    def make_comments(self, task):
+        """
+        Generate the comments of a task, by its owner or its assignee.
+
+        Args:
+        - task (tuple): The task, as returned by make_task.
+
+        Returns:
+        - list: Tuples of the COMMENT_FIELDS values, adapted for the database.
+        """
+        rng = self.rng
+        count = int(rng.expovariate(1 / self.comments_per_task)) if self.comments_per_task > 0 else 0
+
+        if not count:
+            return []
+
+        task_id, user_id, _, _, created_at, _, _, _, assignee_id, _, completed_at, _ = task
+        span = ((completed_at or self.today) - created_at).days
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+
+        return [
+            (
+                task_id,
+                rng.choice((user_id, assignee_id)),
+                rng.choice(COMMENTS),
+                adapt_datetime(timezone.make_aware(datetime.combine(
+                    created_at + timedelta(days=rng.randint(0, span)), time(rng.randint(8, 19), rng.randint(0, 59)),
+                ))),
+            )
+            for _ in range(count)
+        ]
+
+    def seed(self, users, tasks_per_user, prefix='user', password='password', progress=None):
+        """
+        Create users and their tasks, tags, comments and daily task counts, then invalidate the
+        caches of manager.cache.
+
+        Args:
+        - users (int): Number of users.
+        - tasks_per_user (int): Number of tasks owned by each user.
+        - prefix (str): Prefix of the usernames.
+        - password (str): The password of every user.
+        - progress (callable): Optional callback receiving the number of tasks inserted so far.
+
+        Returns:
+        - dict: The number of users, tasks, tag links, comments and daily task count rows created.
+        """
+        adapt_date = connection.ops.adapt_datefield_value
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        counts = {'users': users, 'tasks': 0, 'tags': 0, 'comments': 0}
+        cube = defaultdict(lambda: [0, 0])
+
+        with transaction.atomic():
+            owners = self.create_users(users, prefix, password)
+
+        user_ids = [owner[0] for owner in owners]
+        pending = [owner for owner in owners for _ in range(tasks_per_user)]
+        next_task_id = next_id(Task)
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            tasks = [self.make_task(next_task_id + start + index, owner, user_ids) for index, owner in enumerate(batch)]
+            task_tags = [
+                (task[0], tag_id)
+                for task, owner in zip(tasks, batch)
+                for tag_id in self.rng.sample(owner[3], self.rng.choice((1, 1, 1, 2, 2, 3)))
+            ]
+            comments = [comment for task in tasks for comment in self.make_comments(task)]
+
+            for task in tasks:
+                # Same contributions as task_cube.state_deltas, without a dict per task
+                user_id, created_at, status_id, priority_id, assignee_id, completed_at = task[1], task[4], task[6], task[7], task[8], task[10]
+                cube[(user_id, status_id, priority_id, assignee_id, created_at)][0] += 1
+
+                if completed_at is not None:
+                    cube[(user_id, status_id, priority_id, assignee_id, completed_at)][1] += 1
+
+            with transaction.atomic():
+                insert_rows(Task, TASK_FIELDS, [
+                    task[:4] + (adapt_date(task[4]), adapt_date(task[5])) + task[6:10] + (adapt_date(task[10]), adapt_datetime(task[11]))
+                    for task in tasks
+                ])
+                insert_rows(Task.tags.through, ('task', 'tag'), task_tags)
+                insert_rows(Comment, COMMENT_FIELDS, comments)
+
+            counts['tasks'] += len(tasks)
+            counts['tags'] += len(task_tags)
+            counts['comments'] += len(comments)
+
+            if progress is not None:
+                progress(counts['tasks'])
+
+        reset_sequences(Task)
+
+        with transaction.atomic():
+            insert_rows(DailyTaskCount, ('user', 'status', 'priority', 'assignee', 'day', 'created_count', 'completed_count'), [
+                key[:4] + (adapt_date(key[4]), created, completed) for key, (created, completed) in cube.items()
+            ])
+
+        counts['daily_task_counts'] = len(cube)
+
+        # The new rows are behind no data version, e.g. when reseeding a database
+        invalidate_all()
+
+        return counts
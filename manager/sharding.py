@@ -0,0 +1,510 @@
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+
+from .models import ArchivedComment, ArchivedTask, Comment, DailyTaskCount, Priority, Status, Tag, Task, UserShard
+from .versions import bump_data_versions
+
+# Row ids of the sharded tables of the n-th shard start at n << SHARD_ID_SHIFT, so an id tells
+# which database holds its row. The default database keeps the ids below 1 << SHARD_ID_SHIFT.
+SHARD_ID_SHIFT = 40
+
+# Models of the manager app that stay on the default database
+UNSHARDED_MODELS = ('usershard', 'dataversion', 'cacheepoch')
+
+# Fields copied to the shards for each user, the other User fields only matter to authentication
+REPLICATED_USER_FIELDS = ('username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff', 'is_superuser', 'date_joined')
+
+class ShardState:
+    """
+    Shard of the block or request being handled.
+
+    Attributes:
+    - alias: str - The database alias the sharded models are routed to, None for the default routing.
+    """
+    __slots__ = ('alias',)
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+# Shared with the threads the request hands work to, like the replica routing state
+shard_state = ContextVar('shard_state', default=None)
+
+def shard_aliases():
+    """
+    Return the aliases of the shards.
+
+    Returns:
+    - list: The DATABASE_SHARD_ALIASES setting.
+    """
+    return getattr(settings, 'DATABASE_SHARD_ALIASES', [])
+
+def data_aliases():
+    """
+    Return the databases that may hold task data: the default one (users who were never moved
+    to a shard) then the shards.
+
+    Returns:
+    - list: The database aliases.
+    """
+    return [DEFAULT_DB_ALIAS, *shard_aliases()]
+
+def is_sharded(model):
+    """
+    Tell whether the rows of a model are spread over the shards.
+
+    Args:
+    - model: The model class.
+
+    Returns:
+    - bool: True for the models of the manager app, except the shard directory.
+    """
+    return model._meta.app_label == 'manager' and model._meta.model_name not in UNSHARDED_MODELS
+
+def current_shard():
+    """
+    Return the shard of the block or request being handled.
+
+    Returns:
+    - str: The database alias, None outside of requests and using_shard blocks.
+    """
+    state = shard_state.get()
+
+    return None if state is None else state.alias
+
+@contextmanager
+def using_shard(alias):
+    """
+    Route the sharded models used in the block to a database.
+
+    Args:
+    - alias (str): The database alias.
+    """
+    token = shard_state.set(ShardState(alias))
+
+    try:
+        yield
+    finally:
+        shard_state.reset(token)
+
+def hash_shard(user_id, aliases=None):
+    """
+    Pick the shard of a user by rendezvous hashing: adding a shard only moves the users it wins.
+
+    Args:
+    - user_id (int): The user id.
+    - aliases (list): The candidate shards, defaults to every shard.
+
+    Returns:
+    - str: The database alias.
+    """
+    aliases = shard_aliases() if aliases is None else aliases
+
+    return max(aliases, key=lambda alias: hashlib.sha1(f'{alias}:{user_id}'.encode()).digest())
+
+def user_shard(user_id):
+    """
+    Return the database holding the data of a user, from the shard directory.
+
+    Args:
+    - user_id (int): The user id.
+
+    Returns:
+    - str: The database alias, the default database for users without a directory entry.
+    """
+    if not shard_aliases():
+        return DEFAULT_DB_ALIAS
+
+    shard = UserShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).values_list('shard', flat=True).first()
+
+    return shard or DEFAULT_DB_ALIAS
+
+def shard_for_id(pk):
+    """
+    Return the database holding a row of a sharded model from its id.
+
+    Args:
+    - pk (int): The row id.
+
+    Returns:
+    - str: The database alias.
+    """
+    index = int(pk) >> SHARD_ID_SHIFT
+    aliases = shard_aliases()
+
+    return aliases[index - 1] if 0 < index <= len(aliases) else DEFAULT_DB_ALIAS
+
+def prepare_shard_sequences(alias):
+    """
+    Start the ids of the sharded tables of a shard at its range, see SHARD_ID_SHIFT.
+
+    Args:
+    - alias (str): The shard alias.
+
+    Raises:
+    - ImproperlyConfigured: If the shard is not a SQLite database.
+    """
+    connection = connections[alias]
+
+    if connection.vendor != 'sqlite':
+        raise ImproperlyConfigured('Shards are SQLite databases, their id ranges are set in sqlite_sequence.')
+
+    start = (shard_aliases().index(alias) + 1) << SHARD_ID_SHIFT
+    tables = [
+        model._meta.db_table
+        for model in apps.get_app_config('manager').get_models(include_auto_created=True)
+        if is_sharded(model)
+    ]
+
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [start, table, start])
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                [table, start, table],
+            )
+
+def replicate_users(users, aliases=None):
+    """
+    Copy users to the shards, so the tasks of a shard can reference any assignee or comment author.
+
+    Args:
+    - users (iterable): User instances.
+    - aliases (list): The shards written, defaults to every shard.
+    """
+    users = [
+        User(pk=user.pk, password='', **{field: getattr(user, field) for field in REPLICATED_USER_FIELDS})
+        for user in users
+    ]
+
+    for alias in shard_aliases() if aliases is None else aliases:
+        User.objects.using(alias).bulk_create(
+            users, batch_size=500, update_conflicts=True, unique_fields=['id'], update_fields=REPLICATED_USER_FIELDS,
+        )
+
+class FanOutQuerySet:
+    """
+    The same query run on several databases, with the rows merged as if a single database held them.
+
+    Chaining methods apply to every database. Iteration merges the rows in the order_by order,
+    and a slice only fetches the rows up to its end from each database, so a page costs one query
+    per database. Aggregates other than count must be computed per database from querysets.
+
+    Attributes:
+    - querysets: list - The query of each database.
+    - ordering: tuple - The order_by fields the rows are merged by.
+    """
+    def __init__(self, querysets, ordering=()):
+        self.querysets = querysets
+        self.ordering = tuple(ordering)
+        self._result_cache = None
+
+    def _chain(self, method, *args, **kwargs):
+        return FanOutQuerySet([getattr(queryset, method)(*args, **kwargs) for queryset in self.querysets], self.ordering)
+
+    def filter(self, *args, **kwargs):
+        return self._chain('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._chain('exclude', *args, **kwargs)
+
+    def select_related(self, *fields):
+        return self._chain('select_related', *fields)
+
+    def prefetch_related(self, *lookups):
+        return self._chain('prefetch_related', *lookups)
+
+    def distinct(self, *fields):
+        return self._chain('distinct', *fields)
+
+    def order_by(self, *fields):
+        return FanOutQuerySet([queryset.order_by(*fields) for queryset in self.querysets], fields)
+
+    @property
+    def ordered(self):
+        # Read by the Paginator, which warns about unordered querysets
+        return bool(self.ordering)
+
+    def count(self):
+        if self._result_cache is not None:
+            return len(self._result_cache)
+
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def exists(self):
+        return any(queryset.exists() for queryset in self.querysets)
+
+    def _sort(self, rows):
+        # Stable sorts from the last field to the first, NULLs first like SQLite
+        for field in reversed(self.ordering):
+            name = field.lstrip('-')
+            rows.sort(key=lambda row: self._sort_key(row, name), reverse=field.startswith('-'))
+
+        return rows
+
+    @staticmethod
+    def _sort_key(row, name):
+        value = row[name] if isinstance(row, dict) else getattr(row, name)
+
+        return (value is not None, value)
+
+    def __iter__(self):
+        if self._result_cache is None:
+            self._result_cache = self._sort([*chain.from_iterable(self.querysets)])
+
+        return iter(self._result_cache)
+
+    def __len__(self):
+        return len([*iter(self)])
+
+    def __bool__(self):
+        return self.exists() if self._result_cache is None else bool(self._result_cache)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            rows = self[index:index + 1]
+
+            if not rows:
+                raise IndexError('FanOutQuerySet index out of range')
+
+            return rows[0]
+
+        if self._result_cache is not None or index.stop is None:
+            return [*iter(self)][index]
+
+        # The first rows of the merge are among the first rows of each database
+        return self._sort([row for queryset in self.querysets for row in queryset[:index.stop]])[index]
+
+def visible_tasks(user, model=Task):
+    """
+    Return the tasks a user owns or is assigned to.
+
+    Owned tasks live on the user's shard, assigned tasks on their owners' shards: with shards
+    the query fans out to every database holding task data.
+
+    Args:
+    - user: The user.
+    - model: Task, or ArchivedTask for the archived tasks.
+
+    Returns:
+    - QuerySet: The tasks, a FanOutQuerySet when sharding is on.
+    """
+    tasks = model.objects.filter(Q(user=user) | Q(assignee=user))
+
+    if not shard_aliases():
+        return tasks
+
+    return FanOutQuerySet([tasks.using(alias) for alias in data_aliases()])
+
+def fan_out_loaders(build, merges):
+    """
+    Run data loaders on every database holding task data and merge their results.
+
+    Args:
+    - build (callable): Returns the loaders of a database, callables keyed by data name, see
+      manager.views.get_dashboard_loaders. Called once per database inside using_shard.
+    - merges (dict): For each data name, a callable merging the list of results of the databases.
+
+    Returns:
+    - dict: Callables taking no argument, keyed by data name.
+    """
+    loaders = {}
+
+    for alias in data_aliases():
+        with using_shard(alias):
+            loaders[alias] = build()
+
+    def merged(name):
+        def load():
+            results = []
+
+            for alias, shard_loaders in loaders.items():
+                with using_shard(alias):
+                    results.append(shard_loaders[name]())
+
+            return merges[name](results)
+
+        return load
+
+    return {name: merged(name) for name in loaders[DEFAULT_DB_ALIAS]}
+
+def copy_rows(queryset, target, remap, batch_size=500):
+    """
+    Copy rows to another database under new ids, without sending signals.
+
+    Args:
+    - queryset (QuerySet): The rows to copy.
+    - target (str): The database alias the rows are copied to.
+    - remap (dict): For foreign key attribute names, a dict mapping old ids to new ids.
+    - batch_size (int): Number of rows inserted per query.
+
+    Returns:
+    - dict: The new id of each copied row, keyed by its old id.
+    """
+    model = queryset.model
+    fields = [field.attname for field in model._meta.concrete_fields if not field.primary_key]
+    # Inserting stamps the auto_now(_add) fields with the current time, they are restored after
+    stamped = [
+        field.attname for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    ids = {}
+    batch = []
+
+    def flush():
+        created = model.objects.using(target).bulk_create([instance for _, instance, _ in batch])
+
+        for (old, instance, row), _ in zip(batch, created):
+            ids[old] = instance.pk
+
+            for name in stamped:
+                setattr(instance, name, row[name])
+
+        if stamped:
+            model.objects.using(target).bulk_update(created, stamped)
+
+        batch.clear()
+
+    for row in queryset.order_by('pk').values('pk', *fields).iterator(chunk_size=batch_size):
+        values = {name: remap[name][row[name]] if name in remap else row[name] for name in fields}
+        batch.append((row['pk'], model(**values), row))
+
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    return ids
+
+def map_shared_defaults(model, source, target):
+    """
+    Map the ids of the shared default rows of a choice model on a database to the ids of the
+    defaults of the same name on another: each database creates its own in the 0015 migration.
+
+    Args:
+    - model: Status or Priority.
+    - source (str): The database alias the ids come from.
+    - target (str): The database alias the ids are mapped to.
+
+    Returns:
+    - dict: The target id of each source id.
+    """
+    defaults = model.objects.filter(user__isnull=True)
+    target_ids = dict(defaults.using(target).values_list('name', 'pk'))
+
+    return {pk: target_ids[name] for name, pk in defaults.using(source).values_list('name', 'pk')}
+
+def delete_user_data(user_id, alias):
+    """
+    Delete the data owned by a user from a database with plain DELETE statements: no signal is
+    sent, so no event is published and the daily counts are deleted rather than decremented.
+
+    Args:
+    - user_id (int): The user id.
+    - alias (str): The database alias.
+    """
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    owned_tasks = f'SELECT id FROM {quote(Task._meta.db_table)} WHERE user_id = %s'
+    owned_archived_tasks = f'SELECT id FROM {quote(ArchivedTask._meta.db_table)} WHERE user_id = %s'
+    statements = [
+        (Comment, f'task_id IN ({owned_tasks})'),
+        (Task.tags.through, f'task_id IN ({owned_tasks})'),
+        (ArchivedComment, f'task_id IN ({owned_archived_tasks})'),
+        (ArchivedTask.tags.through, f'archivedtask_id IN ({owned_archived_tasks})'),
+        (DailyTaskCount, 'user_id = %s'),
+        (Task, 'user_id = %s'),
+        (ArchivedTask, 'user_id = %s'),
+        (Tag, 'user_id = %s'),
+        (Priority, 'user_id = %s'),
+        (Status, 'user_id = %s'),
+    ]
+
+    with connection.cursor() as cursor:
+        for model, condition in statements:
+            cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE {condition}', [user_id])
+
+def move_user(user_id, target):
+    """
+    Move the data owned by a user to another database.
+
+    The data is copied under new ids in a transaction of the target database, the directory is
+    updated, then the source rows are deleted. A move interrupted before the deletion leaves the
+    source authoritative and is redone by the next move. Rows get new ids, so links to the
+    user's tasks change.
+
+    Args:
+    - user_id (int): The user id.
+    - target (str): The database alias the data is moved to.
+
+    Returns:
+    - dict: The number of rows copied per model name.
+    """
+    source = user_shard(user_id)
+    counts = {}
+
+    if source == target:
+        return counts
+
+    # Links to the moved tasks change on the pages of their assignees
+    assignees = [*Task.objects.using(source).filter(user_id=user_id).values_list('assignee_id', flat=True).distinct()]
+
+    with transaction.atomic(using=target):
+        # Leftovers of an interrupted move
+        delete_user_data(user_id, target)
+
+        def copy(model, queryset, remap=None):
+            ids = copy_rows(queryset, target, remap or {})
+            counts[model._meta.model_name] = len(ids)
+
+            return ids
+
+        statuses = copy(Status, Status.objects.using(source).filter(user_id=user_id))
+        statuses.update(map_shared_defaults(Status, source, target))
+        priorities = copy(Priority, Priority.objects.using(source).filter(user_id=user_id))
+        priorities.update(map_shared_defaults(Priority, source, target))
+        tags = copy(Tag, Tag.objects.using(source).filter(user_id=user_id))
+        tasks = copy(
+            Task, Task.objects.using(source).filter(user_id=user_id),
+            {'status_id': statuses, 'priority_id': priorities},
+        )
+        copy(
+            Task.tags.through, Task.tags.through.objects.using(source).filter(task__user_id=user_id),
+            {'task_id': tasks, 'tag_id': tags},
+        )
+        copy(Comment, Comment.objects.using(source).filter(task__user_id=user_id), {'task_id': tasks})
+        archived_tasks = copy(
+            ArchivedTask, ArchivedTask.objects.using(source).filter(user_id=user_id),
+            {'status_id': statuses, 'priority_id': priorities},
+        )
+        copy(
+            ArchivedTask.tags.through, ArchivedTask.tags.through.objects.using(source).filter(archivedtask__user_id=user_id),
+            {'archivedtask_id': archived_tasks, 'tag_id': tags},
+        )
+        copy(
+            ArchivedComment, ArchivedComment.objects.using(source).filter(task__user_id=user_id),
+            {'task_id': archived_tasks},
+        )
+        copy(
+            DailyTaskCount, DailyTaskCount.objects.using(source).filter(user_id=user_id),
+            {'status_id': statuses, 'priority_id': priorities},
+        )
+
+    UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(user_id=user_id, defaults={'shard': target})
+
+    with transaction.atomic(using=source):
+        delete_user_data(user_id, source)
+
+    bump_data_versions([user_id, *assignees])
+
+    return counts
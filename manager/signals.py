@@ -1,72 +1,128 @@
-from django.db.models.signals import post_save
+import time
+from datetime import datetime
+
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete, post_migrate
+from django.db.backends.signals import connection_created
 from django.dispatch import receiver
-from django.db import transaction
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
 from django.contrib.auth.models import User
-from .models import Status, Priority, Tag
+from .models import CacheEpoch, Comment, Priority, Status, Tag, Task, UserShard
+from .cache import reset_all
+from .events import broker
+from .metrics import query_timer
+from .slow_queries import slow_query_logger
+from .analytics import task_cube
+from .reassign import referencing_tasks
+from .sharding import data_aliases, hash_shard, prepare_shard_sequences, replicate_users, shard_aliases, user_shard, using_shard
+from .versions import bump_all_data_versions, bump_data_versions_on_commit, touch_tasks
 
 @receiver(post_save, sender=User)
-def set_default_status(sender, instance, created, **kwargs):
+def replicate_user(sender, instance, created, using, update_fields, **kwargs):
     """
-    Set default status choices for a new user upon creation.
+    Copy a saved user to the shards and assign the shard of a new user.
+
+    Runs before the receiver creating the default tag of a new user, which goes to its shard.
+    Logins only update last_login, which is not copied.
 
     Args:
     - sender: The sender of the signal.
     - instance: The User instance being saved.
     - created: A boolean indicating whether the instance is being created.
+    - using: The database alias the user is saved to.
+    - update_fields: The fields being updated, None for all of them.
     - **kwargs: Additional keyword arguments.
+    """
+    if not shard_aliases() or using != DEFAULT_DB_ALIAS or update_fields == frozenset(['last_login']):
+        return
 
-    Notes:
-    - Creates default status entries ('To Do', 'In Progress', 'On Hold', 'Archived')
-      for a newly created user.
-    - If an exception occurs during the creation process, the user instance is deleted.
+    if created:
+        UserShard.objects.using(DEFAULT_DB_ALIAS).create(user=instance, shard=hash_shard(instance.pk))
 
-    Example:
-    >>> @receiver(post_save, sender=User)
-    >>> def my_callback(sender, instance, created, **kwargs):
-    >>>     set_default_status(sender, instance, created, **kwargs)
+    replicate_users([instance])
+
+@receiver(post_delete, sender=User)
+def delete_replicated_user(sender, instance, using, **kwargs):
     """
-    if created:
-        try:
-            with transaction.atomic():
-                #Task ready
-                Status.objects.create(user=instance, name='To Do')
-                #The assigned user or team is actively working on the task
-                Status.objects.create(user=instance, name='In Progress')
-                #The task is temporarily paused or on hold due to some reason.
-                Status.objects.create(user=instance, name='On Hold')
-                #The task has been archived and is no longer active.
-                Status.objects.create(user=instance, name='Archived')
-        except Exception as e:
-            instance.delete()
+    Delete a deleted user from the shards, with the data it owns there.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The User instance being deleted.
+    - using: The database alias the user is deleted from.
+    - **kwargs: Additional keyword arguments.
+    """
+    if using != DEFAULT_DB_ALIAS:
+        return
+
+    for alias in shard_aliases():
+        User.objects.using(alias).filter(pk=instance.pk).delete()
+
+@receiver(pre_save, sender=User)
+def load_stored_username(sender, instance, raw, using, update_fields, **kwargs):
+    """
+    Remember the stored username of a user before it is saved, so a rename can be detected.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The User instance being saved.
+    - raw: A boolean indicating whether the instance is loaded from a fixture.
+    - using: The database alias the user is saved to.
+    - update_fields: The fields being updated, None for all of them.
+    - **kwargs: Additional keyword arguments.
+    """
+    if raw or instance.pk is None or using != DEFAULT_DB_ALIAS or (update_fields is not None and 'username' not in update_fields):
+        instance._stored_username = None
+    else:
+        instance._stored_username = User.objects.using(using).filter(pk=instance.pk).values_list('username', flat=True).first()
 
 @receiver(post_save, sender=User)
-def set_default_priority(sender, instance, created, **kwargs):
+def touch_renamed_user_tasks(sender, instance, created, **kwargs):
     """
-    Set default priority choices for a new user upon creation.
+    Stamp the tasks owned by or assigned to a renamed user as updated: the task pages and the
+    cached rows of the task list show the username.
 
     Args:
     - sender: The sender of the signal.
     - instance: The User instance being saved.
     - created: A boolean indicating whether the instance is being created.
     - **kwargs: Additional keyword arguments.
+    """
+    stored_username = getattr(instance, '_stored_username', None)
 
-    Notes:
-    - Creates default priority entries ('Low', 'Medium', 'High') for a newly created user.
-    - If an exception occurs during the creation process, the user instance is deleted.
+    if created or stored_username is None or stored_username == instance.username:
+        return
 
-    Example:
-    >>> @receiver(post_save, sender=User)
-    >>> def my_callback(sender, instance, created, **kwargs):
-    >>>     set_default_priority(sender, instance, created, **kwargs)
+    for alias in data_aliases():
+        touch_tasks(Task.objects.using(alias).filter(Q(user_id=instance.pk) | Q(assignee_id=instance.pk)))
+
+@receiver(post_migrate)
+def prepare_shard(sender, using, **kwargs):
     """
-    if created:
-        try:
-            with transaction.atomic():
-                Priority.objects.create(user=instance, name='Low')
-                Priority.objects.create(user=instance, name='Medium')
-                Priority.objects.create(user=instance, name='High')
-        except Exception as e:
-            instance.delete()
+    Start the ids of a migrated shard at its range, see manager.sharding.SHARD_ID_SHIFT.
+
+    Args:
+    - sender: The AppConfig of the migrated app.
+    - using: The database alias of the migrated database.
+    - **kwargs: Additional keyword arguments.
+    """
+    if sender.name == 'manager' and using in shard_aliases():
+        prepare_shard_sequences(using)
+
+@receiver(post_migrate)
+def start_cache_epoch(sender, using, **kwargs):
+    """
+    Start a new epoch of the default database once migrated or flushed, see
+    manager.models.CacheEpoch: the values cached for its previous data are no longer read.
+
+    Args:
+    - sender: The AppConfig of the migrated app.
+    - using: The database alias of the migrated database.
+    - **kwargs: Additional keyword arguments.
+    """
+    if sender.name == 'manager' and using == DEFAULT_DB_ALIAS:
+        CacheEpoch.objects.using(using).update_or_create(pk=1, defaults={'epoch': time.time_ns()})
+        reset_all()
 
 @receiver(post_save, sender=User)
 def set_default_tag(sender, instance, created, **kwargs):
@@ -90,7 +146,249 @@ def set_default_tag(sender, instance, created, **kwargs):
     """
     if created:
         try:
-            with transaction.atomic():
+            shard = user_shard(instance.pk)
+
+            with using_shard(shard), transaction.atomic(using=shard):
                 Tag.objects.create(user=instance, name='Home Task')
         except Exception as e:
-            instance.delete()
\ No newline at end of file
+            instance.delete()
+
+def task_event_data(task):
+    """
+    Build the event payload describing the current state of a task.
+
+    Args:
+    - task: The Task instance.
+
+    Returns:
+    - dict: The fields the list and detail pages patch in place.
+    """
+    completed_at = task.completed_at
+
+    # mark_completed_task assigns a datetime to the DateField, keep the date part only
+    if isinstance(completed_at, datetime):
+        completed_at = completed_at.date()
+
+    return {
+        'id': task.id,
+        'title': task.title,
+        'due_date': str(task.due_date),
+        'priority': str(task.priority),
+        'status': 'Completed' if task.completed else str(task.status),
+        'assignee': str(task.assignee),
+        'completed': task.completed,
+        'completed_at': str(completed_at) if completed_at else None,
+    }
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, using, **kwargs):
+    """
+    Publish a task change to the owner and the assignee once the transaction commits.
+
+    The payload is only built, loading the status, priority and assignee names when they are
+    not cached yet, when one of them is subscribed.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Task instance being saved.
+    - created: A boolean indicating whether the instance is being created.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    user_ids = (instance.user_id, instance.assignee_id)
+
+    def publish():
+        if broker.has_subscriptions(user_ids):
+            broker.publish(user_ids, 'task', task_event_data(instance))
+
+    transaction.on_commit(publish, using=using)
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, using, **kwargs):
+    """
+    Publish a task deletion to the owner and the assignee once the transaction commits.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Task instance being deleted.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    data = {'id': instance.id}
+    user_ids = (instance.user_id, instance.assignee_id)
+
+    transaction.on_commit(lambda: broker.publish(user_ids, 'task_deleted', data), using=using)
+
+@receiver(post_save, sender=Comment)
+def publish_comment_created(sender, instance, created, using, **kwargs):
+    """
+    Publish a new comment to the owner and the assignee of its task once the transaction commits.
+
+    The task and the author are only loaded when someone is subscribed.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Comment instance being saved.
+    - created: A boolean indicating whether the instance is being created.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    if not created:
+        return
+
+    def publish():
+        if not broker.has_subscriptions():
+            return
+
+        task = instance.task
+        user_ids = (task.user_id, task.assignee_id)
+
+        if broker.has_subscriptions(user_ids):
+            broker.publish(user_ids, 'comment', {
+                'id': instance.id,
+                'task': task.id,
+                'author': str(instance.author),
+                'content': instance.content,
+                'created_at': instance.created_at.isoformat(),
+            })
+
+    transaction.on_commit(publish, using=using)
+
+
+@receiver(pre_save, sender=Task)
+def load_task_cube_state(sender, instance, raw, using, **kwargs):
+    """
+    Remember the stored state of a task before it is saved, so its daily counts can be moved.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Task instance being saved.
+    - raw: A boolean indicating whether the instance is loaded from a fixture.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    instance._task_cube_state = None if raw or instance.pk is None else task_cube.load_task_state(instance.pk, using)
+
+@receiver(post_save, sender=Task)
+def update_task_cube_on_save(sender, instance, raw, using, **kwargs):
+    """
+    Move the daily counts of a saved task from its previous state to its new one.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Task instance being saved.
+    - raw: A boolean indicating whether the instance is loaded from a fixture.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    if not raw:
+        task_cube.record_task_change(getattr(instance, '_task_cube_state', None), task_cube.task_state(instance), using)
+
+@receiver(post_delete, sender=Task)
+def update_task_cube_on_delete(sender, instance, using, **kwargs):
+    """
+    Remove the daily counts of a deleted task.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Task instance being deleted.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    task_cube.record_task_change(task_cube.task_state(instance), None, using)
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def bump_task_data_versions(sender, instance, using, **kwargs):
+    """
+    Bump the data versions of the owner and the assignees, current and previous, of a saved or
+    deleted task.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Task instance being saved or deleted.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    previous = getattr(instance, '_task_cube_state', None)
+
+    bump_data_versions_on_commit((instance.user_id, instance.assignee_id, previous and previous[3]), using)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_task(sender, instance, using, **kwargs):
+    """
+    Stamp the task of a saved or deleted comment as updated.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Comment instance being saved or deleted.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    touch_tasks(Task.objects.using(using).filter(pk=instance.task_id))
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def touch_tagged_tasks(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    Stamp the tasks whose tags changed as updated.
+
+    Args:
+    - sender: The through model of Task.tags.
+    - instance: The Task instance, or the Tag instance for changes made from the tag side.
+    - action: The kind of change.
+    - reverse: A boolean indicating whether the change is made from the tag side.
+    - pk_set: The ids of the added or removed tags, or tasks from the tag side.
+    - using: The database alias.
+    - **kwargs: Additional keyword arguments.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        touch_tasks(Task.objects.using(using).filter(pk=instance.pk))
+    elif pk_set:
+        touch_tasks(Task.objects.using(using).filter(pk__in=pk_set))
+
+@receiver(post_save, sender=Status)
+@receiver(post_save, sender=Priority)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Status)
+@receiver(post_delete, sender=Priority)
+@receiver(post_delete, sender=Tag)
+def bump_choice_data_versions(sender, instance, using, created=False, **kwargs):
+    """
+    Bump the data versions of the users offered a saved or deleted status, priority or tag, and
+    stamp the tasks showing a renamed one as updated.
+
+    Args:
+    - sender: The sender of the signal.
+    - instance: The Status, Priority or Tag instance being saved or deleted.
+    - using: The database alias.
+    - created: A boolean indicating whether the instance is being created.
+    - **kwargs: Additional keyword arguments.
+    """
+    if kwargs['signal'] is post_save and not created and not kwargs.get('raw'):
+        touch_tasks(referencing_tasks(instance)[0])
+
+    if instance.user_id is None:
+        transaction.on_commit(bump_all_data_versions, using=using)
+    else:
+        bump_data_versions_on_commit([instance.user_id], using)
+
+@receiver(connection_created)
+def install_query_wrappers(sender, connection, **kwargs):
+    """
+    Time the queries of every new database connection for the request metrics and the slow query log.
+
+    Args:
+    - sender: The database wrapper class.
+    - connection: The database wrapper that connected.
+    - **kwargs: Additional keyword arguments.
+
+    Notes:
+    - The wrappers stay on the database wrapper when it reconnects, they are only added once.
+    """
+    for wrapper in (query_timer, slow_query_logger):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
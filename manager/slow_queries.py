@@ -0,0 +1,261 @@
+import datetime
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .metrics import current_request_stats, view_name
+
+logger = logging.getLogger(__name__)
+
+_log_lock = threading.Lock()
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|\?')
+VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to its shape, so executions differing only by their values group together.
+
+    Literals and placeholders become '?', lists of them '(...)' whatever their length, and
+    whitespace is collapsed.
+
+    Args:
+    - sql (str): The statement.
+
+    Returns:
+    - str: The normalized statement.
+    """
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    sql = VALUE_LIST.sub('(...)', sql)
+
+    return WHITESPACE.sub(' ', sql).strip()
+
+def fingerprint(normalized_sql):
+    """
+    Return a short identifier of a normalized statement.
+
+    Args:
+    - normalized_sql (str): The statement, see normalize_sql.
+
+    Returns:
+    - str: The first 16 hex digits of its SHA-1 digest.
+    """
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+def param_shape(value):
+    """
+    Describe a query parameter without its value.
+
+    Args:
+    - value: The parameter.
+
+    Returns:
+    - str: Its type, with the length of strings, bytes and sequences.
+    """
+    if value is None:
+        return 'null'
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f'{type(value).__name__}({len(value)})'
+
+    return type(value).__name__
+
+def params_shape(params, many):
+    """
+    Describe the parameters of a query without their values, which may hold user data.
+
+    Args:
+    - params: The query parameters, a sequence of them for executemany.
+    - many (bool): Whether the query was run with executemany.
+
+    Returns:
+    - dict or list: The shape of each parameter, with the number of parameter sets for executemany.
+    """
+    if params is None:
+        return []
+
+    if many:
+        params = list(params)
+
+        return {'executions': len(params), 'params': [param_shape(value) for value in params[0]] if params else []}
+
+    if isinstance(params, dict):
+        return {name: param_shape(value) for name, value in params.items()}
+
+    return [param_shape(value) for value in params]
+
+def explain(connection, sql, params):
+    """
+    Return the query plan of a SELECT statement.
+
+    Runs EXPLAIN QUERY PLAN on SQLite (the EXPLAIN variant of other databases) on a raw cursor,
+    so the plan query itself is neither wrapped nor logged.
+
+    Args:
+    - connection: The database wrapper that ran the statement.
+    - sql (str): The statement.
+    - params: The statement parameters.
+
+    Returns:
+    - list: The plan lines, indented by depth on SQLite, None when the statement cannot be explained.
+    """
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')) or not connection.features.supports_explaining_query_execution:
+        return None
+
+    try:
+        with closing(connection.create_cursor()) as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+
+    if connection.vendor != 'sqlite':
+        return [' '.join(str(column) for column in row) for row in rows]
+
+    # SQLite rows are (id, parent id, unused, detail)
+    depths = {0: -1}
+    lines = []
+
+    for node_id, parent_id, _, detail in rows:
+        depths[node_id] = depths.get(parent_id, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+
+    return lines
+
+def write_entry(entry):
+    """
+    Append a slow query entry to the SLOW_QUERY_LOG JSON lines file.
+
+    Args:
+    - entry (dict): The JSON serializable entry.
+    """
+    path = getattr(settings, 'SLOW_QUERY_LOG', None)
+
+    if not path:
+        return
+
+    line = json.dumps(entry, default=str)
+
+    with _log_lock:
+        with open(path, 'a', encoding='utf-8') as log:
+            log.write(line + '\n')
+
+def slow_query_logger(execute, sql, params, many, context):
+    """
+    Database execute wrapper logging the statements slower than SLOW_QUERY_THRESHOLD_MS, when
+    SLOW_QUERY_LOG is set.
+
+    Installed on every connection, see manager.signals.install_query_wrappers. Each entry records
+    the view handling the current request, the statement fingerprint, the shape of the parameters
+    and the query plan.
+    """
+    threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 0)
+
+    if not threshold or not getattr(settings, 'SLOW_QUERY_LOG', None):
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if duration_ms >= threshold:
+            log_slow_query(context['connection'], sql, params, many, duration_ms)
+
+def log_slow_query(connection, sql, params, many, duration_ms):
+    """
+    Log a slow statement.
+
+    Args:
+    - connection: The database wrapper that ran the statement.
+    - sql (str): The statement.
+    - params: The statement parameters.
+    - many (bool): Whether the statement was run with executemany.
+    - duration_ms (float): The execution time in milliseconds.
+    """
+    stats = current_request_stats.get()
+    normalized_sql = normalize_sql(sql)
+    entry = {
+        'time': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'view': view_name(stats.request) if stats is not None and stats.request is not None else None,
+        'database': connection.alias,
+        'duration_ms': round(duration_ms, 3),
+        'fingerprint': fingerprint(normalized_sql),
+        'sql': normalized_sql,
+        'params': params_shape(params, many),
+        'plan': None if many else explain(connection, sql, params),
+    }
+
+    logger.warning('Slow query %s in %s: %.1f ms', entry['fingerprint'], entry['view'], duration_ms)
+
+    try:
+        write_entry(entry)
+    except OSError:
+        logger.exception('Could not write the slow query log')
+
+def read_entries(path):
+    """
+    Read the entries of a slow query log, skipping truncated lines.
+
+    Args:
+    - path (str): The JSON lines file.
+
+    Returns:
+    - generator: The entries.
+    """
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def summarize(entries, view=None):
+    """
+    Group slow query entries by statement fingerprint.
+
+    Args:
+    - entries (iterable): Slow query log entries.
+    - view (str): Only keep the entries of this view.
+
+    Returns:
+    - list: One dict per fingerprint with the count, total, mean and max duration, the views
+      and the latest statement and plan, by decreasing total duration.
+    """
+    groups = {}
+
+    for entry in entries:
+        if view is not None and entry.get('view') != view:
+            continue
+
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': set(),
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['views'].add(entry.get('view') or '-')
+        group.update(sql=entry['sql'], params=entry['params'], plan=entry.get('plan'))
+
+    for group in groups.values():
+        group['mean_ms'] = group['total_ms'] / group['count']
+        group['views'] = sorted(group['views'])
+
+    return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
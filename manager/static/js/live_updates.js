@@ -0,0 +1,77 @@
+/*
+ * Patches the task list and task detail pages in place from the server-sent event stream,
+ * so users no longer need to reload them to see status changes or new comments.
+ *
+ * The page root must carry data-events-url and data-username attributes. Detail pages also
+ * carry data-task-id.
+ */
+(function () {
+  var root = document.querySelector('[data-events-url]');
+
+  if (!root || !window.EventSource) {
+    return;
+  }
+
+  var username = root.dataset.username;
+  var source = new EventSource(root.dataset.eventsUrl);
+
+  function setField(container, field, value) {
+    var element = container.querySelector('[data-field="' + field + '"]');
+
+    if (element) {
+      element.textContent = value;
+    }
+  }
+
+  function displayUser(name) {
+    return name === username ? 'You' : name;
+  }
+
+  source.addEventListener('task', function (event) {
+    var task = JSON.parse(event.data);
+    var container = document.querySelector('[data-task-row="' + task.id + '"]') || (
+      root.dataset.taskId == task.id ? root : null
+    );
+
+    if (!container) {
+      return;
+    }
+
+    setField(container, 'title', task.title);
+    setField(container, 'due_date', task.due_date);
+    setField(container, 'priority', task.priority);
+    setField(container, 'status', task.status);
+    setField(container, 'assignee', container === root ? task.assignee : displayUser(task.assignee));
+    setField(container, 'completed_at', task.completed_at || '');
+  });
+
+  source.addEventListener('task_deleted', function (event) {
+    var task = JSON.parse(event.data);
+    var row = document.querySelector('[data-task-row="' + task.id + '"]');
+
+    if (row) {
+      row.remove();
+    }
+  });
+
+  source.addEventListener('comment', function (event) {
+    var comment = JSON.parse(event.data);
+    var list = root.querySelector('[data-comments]');
+
+    if (!list || root.dataset.taskId != comment.task) {
+      return;
+    }
+
+    var subtitle = document.createElement('h6');
+    subtitle.className = 'card-subtitle mb-2 text-muted';
+    subtitle.textContent = comment.author + ' - ' + new Date(comment.created_at).toLocaleString();
+
+    var content = document.createElement('p');
+    content.className = 'card-text';
+    content.textContent = comment.content;
+
+    list.appendChild(subtitle);
+    list.appendChild(content);
+    root.querySelector('[data-comments-section]').classList.remove('d-none');
+  });
+})();
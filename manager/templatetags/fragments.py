@@ -0,0 +1,56 @@
+from django import template
+
+from ..fragment_cache import get_fragment_cache
+
+register = template.Library()
+
+class CachedFragmentNode(template.Node):
+    """
+    Renders its content once per version, see cachedfragment.
+    """
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        cache = get_fragment_cache()
+        vary_on = [value.resolve(context) for value in self.vary_on]
+
+        # An unknown version is never cached
+        if cache is None or None in vary_on:
+            return self.nodelist.render(context)
+
+        name = self.name.resolve(context)
+        fragment = cache.get(name, vary_on)
+
+        if fragment is None:
+            fragment = self.nodelist.render(context)
+            cache.set(name, vary_on, fragment)
+
+        return fragment
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Cache the rendered content of the tag in the fragment cache, see manager.fragment_cache.
+
+    The content is rendered again when any of the values it varies on changes, so they must
+    include every value it depends on: a version of the data and the user when it is shown. The
+    content is rendered without caching when one of them is None.
+
+    Usage:
+    >>> {% load fragments %}
+    >>> {% cachedfragment 'task_row' task.id task.updated_at user.pk %}
+    >>>   ...
+    >>> {% endcachedfragment %}
+    """
+    bits = token.split_contents()
+
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least a fragment name.")
+
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+
+    return CachedFragmentNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]])
@@ -1,3 +1,1222 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date, timedelta
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .analytics.chart_cache import ChartCache, LocalChartCacheBackend, SharedChartCacheBackend
+from .analytics.svg_generator import SvgPlotGenerator
+from .analytics.task_metrics import TaskMetrics
+from .archive import archivable_tasks, archive_batch, restore_task
+from .cache import SHARED_CACHE_ALIAS, TwoTierCache, invalidate_all
+from .database import run_write
+from .events import EventBroker, Subscription, broker, format_sse
+from .fragment_cache import FragmentCache, LocalFragmentCacheBackend
+from .middleware import ReplicaRoutingMiddleware, ShardMiddleware
+from .models import ArchivedTask, Comment, DailyTaskCount, DataVersion, Priority, Status, Tag, Task, UserShard
+from .purge import purge_user
+from .reassign import reassign_and_delete, reassign_daily_counts
+from .routers import PrimaryReplicaRouter, RoutingState, ShardRouter, routing_state, use_primary
+from .sharding import (
+    SHARD_ID_SHIFT, FanOutQuerySet, current_shard, move_user, shard_for_id, shard_state, user_shard, using_shard,
+    visible_tasks,
+)
+from .signals import start_cache_epoch
+from .slow_queries import fingerprint, normalize_sql, params_shape, read_entries, summarize
+from .versions import get_data_version
+from .views import event_stream, get_task_durations, merge_task_durations, summarize_task_durations
+from .workload import WorkloadResolver, describe_value, read_workload
+
+SHARDS = ('shard1', 'shard2')
+
+def add_database(alias, path):
+    """
+    Add a SQLite database to the connections, configured like the default one.
+
+    Args:
+    - alias (str): The database alias.
+    - path (str): The database file.
+    """
+    connections.settings[alias] = {**connections.settings[DEFAULT_DB_ALIAS], 'NAME': path}
+
+def remove_database(alias):
+    """
+    Close and forget a database added by add_database.
+
+    Args:
+    - alias (str): The database alias.
+    """
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+class TaskTestCase(TestCase):
+    """
+    Tests creating users and tasks. Cached values are keyed on data versions, which restart with
+    each test, so the shared cache is kept in memory and invalidated before each test.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.enterClassContext(override_settings(
+            CACHES={**settings.CACHES, SHARED_CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        ))
+        super().setUpClass()
+
+    def setUp(self):
+        invalidate_all()
+
+    def create_user(self, username, shard=None):
+        """
+        Create a user.
+
+        Args:
+        - username (str): The username.
+        - shard (str): The database alias of the shard keeping its data, None for its default one.
+
+        Returns:
+        - User: The user.
+        """
+        user = User.objects.create_user(username, password='password')
+
+        if shard is not None:
+            move_user(user.pk, shard)
+
+        return user
+
+    def create_task(self, user, title='Task', assignee=None, **fields):
+        """
+        Create a task on the shard of its owner, with the default To Do status and Low priority.
+
+        Args:
+        - user (User): The owner.
+        - title (str): The title.
+        - assignee (User): The assignee, defaults to the owner.
+        - **fields: Other field values.
+
+        Returns:
+        - Task: The task.
+        """
+        alias = user_shard(user.pk)
+        fields.setdefault('status', Status.objects.using(alias).get(user__isnull=True, name='To Do'))
+        fields.setdefault('priority', Priority.objects.using(alias).get(user__isnull=True, name='Low'))
+
+        with using_shard(alias):
+            return Task.objects.create(
+                user=user, title=title, assignee=assignee or user, due_date=date.today() + timedelta(days=7), **fields,
+            )
+
+    def run_on_commit(self):
+        """
+        Run the on_commit callbacks of every database registered in the block when it exits.
+
+        Returns:
+        - ExitStack: The context manager.
+        """
+        stack = ExitStack()
+
+        for alias in self.databases:
+            stack.enter_context(self.captureOnCommitCallbacks(using=alias, execute=True))
+
+        return stack
+
+class ShardedTestCase(TaskTestCase):
+    """
+    Tests running with the default database and two shards, each a SQLite file migrated once
+    per class. The shards are added to the connections before the class resolves '__all__'.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        directory = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(DATABASE_SHARD_ALIASES=[*SHARDS]))
+
+        for alias in SHARDS:
+            add_database(alias, os.path.join(directory, f'{alias}.sqlite3'))
+            cls.addClassCleanup(remove_database, alias)
+            call_command('migrate', database=alias, verbosity=0)
+
+        super().setUpClass()
+
+class ShardRoutingTests(ShardedTestCase):
+    def test_ids_embed_their_shard(self):
+        for alias in SHARDS:
+            user = self.create_user(f'user_{alias}', alias)
+            task = self.create_task(user)
+
+            self.assertEqual(task._state.db, alias)
+            self.assertEqual(task.pk >> SHARD_ID_SHIFT, SHARDS.index(alias) + 1)
+            self.assertEqual(shard_for_id(task.pk), alias)
+
+        self.assertEqual(shard_for_id(1), DEFAULT_DB_ALIAS)
+
+    def test_router_follows_the_current_shard(self):
+        router = ShardRouter()
+
+        with using_shard('shard2'):
+            self.assertEqual(router.db_for_read(Task), 'shard2')
+            self.assertIsNone(router.db_for_read(UserShard))
+            self.assertIsNone(router.db_for_read(User))
+
+        with using_shard(DEFAULT_DB_ALIAS):
+            self.assertIsNone(router.db_for_read(Task))
+
+        self.assertIsNone(router.db_for_write(Task))
+
+    def test_router_keeps_related_rows_on_their_database(self):
+        user = self.create_user('owner', 'shard2')
+        task = self.create_task(user)
+        Comment.objects.using('shard2').create(task=task, author=user, content='Comment')
+
+        with using_shard('shard1'):
+            self.assertEqual(ShardRouter().db_for_read(Comment, instance=task), 'shard2')
+            self.assertEqual(task.comments.count(), 1)
+
+    def test_middleware_routes_pk_views_to_the_shard_of_the_row(self):
+        owner = self.create_user('owner', 'shard1')
+        assignee = self.create_user('assignee', 'shard2')
+        task = self.create_task(owner, assignee=assignee)
+        request = RequestFactory().get(f'/{task.pk}/')
+        request.user = assignee
+        seen = []
+
+        def view(request):
+            middleware.process_view(request, view, (), {'pk': task.pk})
+            seen.append(current_shard())
+
+            return None
+
+        middleware = ShardMiddleware(view)
+        middleware(request)
+
+        self.assertEqual(seen, ['shard1'])
+        self.assertIsNone(shard_state.get())
+
+    def test_middleware_uses_the_shard_of_the_user(self):
+        user = self.create_user('owner', 'shard2')
+        request = RequestFactory().get('/list/')
+        request.user = user
+        seen = []
+
+        ShardMiddleware(lambda request: seen.append(current_shard()))(request)
+
+        self.assertEqual(seen, ['shard2'])
+
+class FanOutQuerySetTests(ShardedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user', 'shard1')
+        other = self.create_user('other', 'shard2')
+        self.titles = []
+
+        for index in range(7):
+            self.create_task(self.user, f'Task {index:02}')
+            self.create_task(other, f'Task {index:02}b', assignee=self.user)
+            self.titles += [f'Task {index:02}', f'Task {index:02}b']
+
+        self.create_task(other, 'Not visible')
+
+    def test_tasks_are_merged_from_every_shard(self):
+        tasks = visible_tasks(self.user).order_by('title')
+
+        self.assertIsInstance(tasks, FanOutQuerySet)
+        self.assertEqual(tasks.count(), 14)
+        self.assertEqual([task.title for task in tasks], self.titles)
+        self.assertEqual({task._state.db for task in tasks}, set(SHARDS))
+
+    def test_slices_fetch_the_merged_order(self):
+        tasks = visible_tasks(self.user).order_by('-title')
+
+        self.assertEqual([task.title for task in tasks[2:5]], self.titles[::-1][2:5])
+        self.assertEqual(tasks[0].title, self.titles[-1])
+
+        with self.assertRaises(IndexError):
+            tasks[14]
+
+    def test_paginator_pages(self):
+        paginator = Paginator(visible_tasks(self.user).order_by('title'), 5)
+
+        self.assertEqual(paginator.count, 14)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual([[task.title for task in paginator.page(number)] for number in paginator.page_range], [
+            self.titles[0:5], self.titles[5:10], self.titles[10:14],
+        ])
+
+class MoveUserTests(ShardedTestCase):
+    def test_data_moves_with_new_ids(self):
+        user = self.create_user('user', 'shard1')
+        assignee = self.create_user('assignee', 'shard2')
+        status = Status.objects.using('shard1').create(user=user, name='Blocked')
+        tag = Tag.objects.using('shard1').get(user=user)
+        task = self.create_task(user, assignee=assignee, status=status)
+        task.tags.add(tag)
+        Comment.objects.using('shard1').create(task=task, author=assignee, content='Comment')
+        done = self.create_task(user, 'Done', priority=Priority.objects.using('shard1').get(user__isnull=True, name='High'))
+
+        counts = move_user(user.pk, 'shard2')
+
+        self.assertEqual(counts['task'], 2)
+        self.assertEqual(user_shard(user.pk), 'shard2')
+        self.assertFalse(Task.objects.using('shard1').filter(user=user).exists())
+        self.assertFalse(Status.objects.using('shard1').filter(user=user).exists())
+        self.assertFalse(DailyTaskCount.objects.using('shard1').filter(user=user).exists())
+
+        moved = Task.objects.using('shard2').get(user=user, title='Task')
+        self.assertEqual(shard_for_id(moved.pk), 'shard2')
+        self.assertEqual(moved.status.name, 'Blocked')
+        self.assertEqual(moved.status._state.db, 'shard2')
+        self.assertEqual([*moved.tags.values_list('name', flat=True)], [tag.name])
+        self.assertEqual([*moved.comments.values_list('content', flat=True)], ['Comment'])
+
+        # Shared defaults are mapped by name to the defaults of the target
+        moved_done = Task.objects.using('shard2').get(user=user, title='Done')
+        self.assertEqual(moved_done.priority, Priority.objects.using('shard2').get(user__isnull=True, name='High'))
+        self.assertEqual(
+            sum(DailyTaskCount.objects.using('shard2').filter(user=user).values_list('created_count', flat=True)), 2,
+        )
+        self.assertNotEqual(moved.pk, task.pk)
+
+    def test_moving_to_the_same_shard_does_nothing(self):
+        user = self.create_user('user', 'shard1')
+        self.create_task(user)
+
+        self.assertEqual(move_user(user.pk, 'shard1'), {})
+        self.assertEqual(Task.objects.using('shard1').filter(user=user).count(), 1)
+
+class EventBrokerTests(SimpleTestCase):
+    async def test_events_are_delivered_to_every_subscription_of_their_users(self):
+        broker = EventBroker()
+        first, second, other = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+
+        broker.publish([1, 1, 3], 'task', {'id': 5})
+        await asyncio.sleep(0)
+
+        self.assertEqual([subscription.queue.qsize() for subscription in (first, second, other)], [1, 1, 0])
+        self.assertEqual(await first.get(), {'event': 'task', 'data': {'id': 5}})
+        self.assertTrue(broker.has_subscriptions([2, 3]))
+        self.assertFalse(broker.has_subscriptions([3]))
+
+        for subscription in (first, second, other):
+            broker.unsubscribe(subscription)
+
+        self.assertEqual(broker.subscriber_count(), 0)
+        self.assertFalse(broker.has_subscriptions())
+
+    async def test_slow_subscriptions_drop_their_oldest_events(self):
+        subscription = Subscription(1, asyncio.get_running_loop(), queue_size=2)
+
+        for index in range(3):
+            subscription.put({'event': 'task', 'data': {'id': index}})
+
+        self.assertEqual([(await subscription.get())['data']['id'] for index in range(2)], [1, 2])
+
+    async def test_stream_keeps_the_events_of_its_task(self):
+        stream = event_stream(1, task_id=5)
+
+        self.assertTrue((await anext(stream)).startswith('retry: '))
+
+        broker.publish([1], 'task', {'id': 4})
+        broker.publish([1], 'comment', {'id': 9, 'task': 5})
+
+        self.assertEqual(await anext(stream), format_sse({'event': 'comment', 'data': {'id': 9, 'task': 5}}))
+
+        await stream.aclose()
+
+        self.assertFalse(broker.has_subscriptions([1]))
+
+class LiveUpdateTests(ShardedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user', 'shard1')
+        self.assignee = self.create_user('assignee', 'shard2')
+        self.task = self.create_task(self.user, assignee=self.assignee)
+
+    def test_task_changes_are_published_once_the_shard_commits(self):
+        with mock.patch.object(broker, 'has_subscriptions', return_value=True), mock.patch.object(broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(using='shard1') as callbacks:
+                self.task.title = 'Renamed'
+                self.task.save()
+
+                with using_shard('shard1'):
+                    self.task.delete()
+
+            publish.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual([call.args[:2] for call in publish.call_args_list], [
+            ((self.user.pk, self.assignee.pk), 'task'), ((self.user.pk, self.assignee.pk), 'task_deleted'),
+        ])
+        self.assertEqual(publish.call_args_list[0].args[2]['title'], 'Renamed')
+
+    @override_settings(LIVE_UPDATES=True)
+    def test_events_are_not_streamed_through_wsgi(self):
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse('manager:events')).status_code, 204)
+
+    @override_settings(LIVE_UPDATES=True)
+    async def test_events_are_streamed_through_asgi(self):
+        url = reverse('manager:events')
+
+        self.assertEqual((await self.async_client.get(url)).status_code, 302)
+
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(url)
+        stream = response.streaming_content
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue((await anext(stream)).startswith(b'retry: '))
+
+        await stream.aclose()
+
+    def test_events_are_off_by_default(self):
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.get(reverse('manager:events')).status_code, 204)
+
+class ChartCacheTests(SimpleTestCase):
+    def test_least_recently_used_charts_are_evicted(self):
+        backend = LocalChartCacheBackend(max_entries=2)
+        backend.set('a', 'A')
+        backend.set('b', 'B')
+        backend.get('a')
+        backend.set('c', 'C')
+
+        self.assertEqual([backend.get(key) for key in 'abc'], ['A', None, 'C'])
+        self.assertEqual(len(backend), 2)
+
+    def test_charts_are_evicted_over_the_byte_budget(self):
+        backend = LocalChartCacheBackend(max_bytes=10)
+        backend.set('a', 'x' * 4)
+        backend.set('b', ('x' * 3, 'x' * 3))
+        backend.set('c', 'x' * 4)
+
+        self.assertEqual([backend.get(key) is not None for key in 'abc'], [False, True, True])
+
+        backend.set('d', 'x' * 11)
+
+        self.assertIsNone(backend.get('d'))
+        self.assertEqual(len(backend), 2)
+
+    def test_charts_are_addressed_by_their_input(self):
+        cache = ChartCache(LocalChartCacheBackend())
+        cache.set('generate_task_by_status', (['To Do'], [1]), 'chart')
+
+        self.assertEqual(cache.get('generate_task_by_status', (['To Do'], [1])), 'chart')
+        self.assertIsNone(cache.get('generate_task_by_status', (['To Do'], [2])))
+        self.assertIsNone(cache.get('generate_task_per_day', (['To Do'], [1])))
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 2, 'hit_ratio': 1 / 3})
+
+class TaskDurationTests(TaskTestCase):
+    def test_durations_are_counted_by_the_database(self):
+        user = self.create_user('user')
+        today = date.today()
+
+        for title, days in (('Quick', 0), ('Medium', 2), ('Medium', 2), ('Slow', 9)):
+            task = self.create_task(user, title)
+            Task.objects.filter(pk=task.pk).update(
+                created_at=today - timedelta(days=days), completed=True, completed_at=today,
+            )
+
+        self.create_task(user, 'Open')
+        tasks = Task.objects.filter(user=user)
+
+        self.assertEqual(get_task_durations(tasks, top_slowest=2), ({1: 1, 3: 2, 10: 1}, [('Slow', 10), ('Medium', 3)]))
+        self.assertEqual(get_task_durations(tasks, top_slowest=0)[1], [])
+
+    def test_durations_of_several_tables_merge(self):
+        merged = merge_task_durations([
+            ({1: 1, 3: 2}, [('Medium', 3), ('Quick', 1)]), ({3: 1, 8: 1}, [('Slow', 8)]),
+        ], top_slowest=2)
+
+        self.assertEqual(merged, ({1: 1, 3: 3, 8: 1}, [('Slow', 8), ('Medium', 3)]))
+
+    def test_summary_bins_and_percentiles(self):
+        labels, counts, percentiles, slowest = summarize_task_durations(
+            {1: 1, 3: 2, 10: 1}, [('Slow', 10)], bins=(1, 2, 5), percentiles=(50, 90),
+        )
+
+        self.assertEqual(labels, ['1', '2-4', '5+'])
+        self.assertEqual(counts, [1, 2, 1])
+        self.assertEqual(percentiles, [('p50', 3), ('p90', 10)])
+        self.assertEqual(slowest, [('Slow', 10)])
+
+    def test_summary_without_completed_tasks(self):
+        self.assertEqual(summarize_task_durations({}, [], bins=(1, 2), percentiles=(50,)), (['1', '2+'], [0, 0], [], []))
+
+class TaskMetricsTests(TaskTestCase):
+    """
+    Metrics of tasks created in the weeks of Monday 2026-10-05 and Monday 2026-10-12, on Monday 2026-10-19.
+    """
+    today = date(2026, 10, 19)
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+        monday = date(2026, 10, 5)
+
+        for title, created, completed, due in (
+            ('On time', 0, 0, 1), ('Late', 0, 4, 2), ('Open', 1, None, 30), ('New', 8, None, 30),
+        ):
+            task = self.create_task(self.user, title)
+            Task.objects.filter(pk=task.pk).update(
+                created_at=monday + timedelta(days=created), due_date=monday + timedelta(days=due),
+                completed=completed is not None, completed_at=None if completed is None else monday + timedelta(days=completed),
+            )
+
+        self.tasks = Task.objects.filter(user=self.user)
+
+    def test_metrics(self):
+        metrics = TaskMetrics.from_queryset(self.tasks)
+        to_do = Status.objects.get(user__isnull=True, name='To Do')
+
+        self.assertEqual(metrics.cycle_time_distribution((1, 3)), {
+            'count': 2, 'mean': 3.0, 'percentiles': {'p50': 1.0, 'p75': 5.0, 'p90': 5.0, 'p95': 5.0, 'p99': 5.0},
+            'bins': [1, 3], 'histogram': [1, 1],
+        })
+        self.assertEqual(metrics.on_time_completion_rate(), 0.5)
+        self.assertEqual(metrics.weekly_throughput(3, self.today), (['2026-10-05', '2026-10-12', '2026-10-19'], [2, 0, 0]))
+        self.assertEqual(metrics.wip_trend(3, self.today), (['2026-10-05', '2026-10-12', '2026-10-19'], [1, 2, 2]))
+        self.assertEqual(metrics.open_tasks_by('status_id'), {to_do.pk: 2})
+        self.assertEqual(metrics.open_tasks_by('assignee_id'), {self.user.pk: 2})
+
+    def test_metrics_of_several_querysets(self):
+        metrics = TaskMetrics.from_queryset(self.tasks.filter(completed=True), self.tasks.filter(completed=False))
+
+        self.assertEqual(
+            metrics.summary(3, (1, 3), self.today), TaskMetrics.from_queryset(self.tasks).summary(3, (1, 3), self.today),
+        )
+
+    def test_metrics_without_tasks(self):
+        metrics = TaskMetrics.from_queryset(Task.objects.none())
+
+        self.assertEqual(metrics.cycle_time_distribution((1, 3))['histogram'], [0, 0])
+        self.assertIsNone(metrics.on_time_completion_rate())
+        self.assertEqual(metrics.weekly_throughput(2, self.today)[1], [0, 0])
+
+    def test_analytics_view(self):
+        self.client.force_login(self.user)
+        summary = self.client.get(reverse('manager:analytics'), {'weeks': 2}).json()
+
+        self.assertEqual((summary['tasks'], summary['completed'], len(summary['weeks'])), (4, 2, 2))
+
+class SvgChartTests(SimpleTestCase):
+    label = '<script>alert("x")</script> & Co'
+
+    def assertLabelEscaped(self, *charts):
+        """
+        Assert that charts are well-formed markup showing the label as text only.
+
+        Args:
+        - *charts (str): The chart markup.
+        """
+        for chart in charts:
+            self.assertNotIn('<script>', chart)
+            root = ElementTree.fromstring(f'<div>{chart}</div>')
+            texts = [''.join(element.itertext()) for element in root.iter() if element.tag.endswith(('text', 'title'))]
+
+            self.assertTrue(any(text.startswith(self.label[:13]) for text in texts), texts)
+            self.assertFalse(any(element.tag.endswith('script') for element in root.iter()))
+
+    def test_labels_are_escaped(self):
+        generator = SvgPlotGenerator()
+
+        self.assertLabelEscaped(generator.generate_task_by_status([self.label, 'Done'], [2, 1]))
+        self.assertLabelEscaped(*generator.generate_assignee_productivity([self.label], [3]))
+        self.assertLabelEscaped(generator.generate_task_duration(['1', '2+'], [1, 0], [('p50', 1)], [(self.label, 9)]))
+
+    def test_charts_without_data(self):
+        generator = SvgPlotGenerator()
+
+        for chart in (
+            generator.generate_task_per_day([], []), generator.generate_task_by_status([], []),
+            generator.generate_task_duration(['1', '2+'], [0, 0], []),
+        ):
+            self.assertTrue(chart.startswith('<svg'))
+            ElementTree.fromstring(chart)
+
+    def test_task_per_day(self):
+        chart = SvgPlotGenerator().generate_task_per_day([date(2026, 10, 2), date(2026, 10, 1)], [3, 1])
+
+        self.assertIn('<title>2026-10-01: 1</title>', chart)
+        self.assertIn('<title>2026-10-02: 3</title>', chart)
+
+class SlowQueryTests(TestCase):
+    def test_statements_differing_by_their_values_share_a_fingerprint(self):
+        first = normalize_sql("SELECT *  FROM manager_task2\n WHERE title = 'it''s' AND id IN (%s, %s) AND priority_id = 3")
+        second = normalize_sql("SELECT * FROM manager_task2 WHERE title = 'other' AND id IN (%s) AND priority_id = 12.5")
+
+        self.assertEqual(first, 'SELECT * FROM manager_task2 WHERE title = ? AND id IN (...) AND priority_id = ?')
+        self.assertEqual(first, second)
+        self.assertEqual(fingerprint(first), fingerprint(second))
+        self.assertNotEqual(fingerprint(first), fingerprint(normalize_sql('SELECT * FROM manager_task2')))
+
+    def test_parameters_are_logged_by_shape(self):
+        self.assertEqual(params_shape(['secret', 3, None, b'xy'], False), ['str(6)', 'int', 'null', 'bytes(2)'])
+        self.assertEqual(params_shape({'title': 'secret'}, False), {'title': 'str(6)'})
+        self.assertEqual(params_shape([('secret', 1), ('other', 2)], True), {'executions': 2, 'params': ['str(6)', 'int']})
+
+    def test_slow_queries_are_logged_without_their_values(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow_queries.jsonl')
+
+            with override_settings(SLOW_QUERY_LOG=path, SLOW_QUERY_THRESHOLD_MS=1e-9), self.assertLogs('manager.slow_queries', 'WARNING'):
+                Task.objects.filter(title='secret').count()
+
+            entries = [*read_entries(path)]
+
+        self.assertNotIn('secret', repr(entries))
+        self.assertEqual([group['count'] for group in summarize(entries)], [1])
+        self.assertTrue(entries[0]['plan'])
+
+    def test_slow_queries_are_not_logged_by_default(self):
+        with self.assertNoLogs('manager.slow_queries'), override_settings(SLOW_QUERY_THRESHOLD_MS=1e-9):
+            Task.objects.count()
+
+class WorkloadTests(TaskTestCase):
+    def test_values_are_described_without_user_data(self):
+        today = date(2026, 10, 19)
+
+        self.assertEqual(describe_value('title', 'secret plan', today), {'kind': 'text', 'length': 11})
+        self.assertEqual(describe_value('status', '42', today), {'kind': 'id'})
+        self.assertEqual(describe_value('status', '-1', today), {'kind': 'int', 'value': -1})
+        self.assertEqual(describe_value('page', '3', today), {'kind': 'int', 'value': 3})
+        self.assertEqual(describe_value('due_date', '2026-10-21', today), {'kind': 'date', 'offset_days': 2})
+        self.assertEqual(describe_value('due_date', '2026-02-30', today), {'kind': 'text', 'length': 10})
+        self.assertEqual(describe_value('title', '', today), {'kind': 'empty'})
+
+    def test_requests_are_recorded_anonymized_and_replayed_on_other_data(self):
+        user = self.create_user('user')
+        task = self.create_task(user, 'Secret plan')
+        self.client.force_login(user)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'workload.jsonl')
+
+            with override_settings(REQUEST_RECORDING_LOG=path):
+                self.client.get(reverse('manager:search'), {'title': 'Secret', 'status': task.status_id, 'due_date': ''})
+                self.client.get(reverse('manager:detail', args=[task.pk]))
+                self.client.post(reverse('manager:detail', args=[task.pk]), {'content': 'Secret comment'})
+
+            with open(path, encoding='utf-8') as log:
+                recording = log.read()
+
+            shapes = read_workload(path)
+
+        self.assertNotIn('Secret', recording)
+        self.assertEqual([(shape['method'], shape['route'], shape['kwargs']) for shape in shapes], [
+            ('GET', 'manager:search', []), ('GET', 'manager:detail', ['pk']), ('POST', 'manager:detail', ['pk']),
+        ])
+        self.assertEqual(shapes[0]['query'], [
+            ['title', {'kind': 'text', 'length': 6}], ['status', {'kind': 'id'}], ['due_date', {'kind': 'empty'}],
+        ])
+
+        other = self.create_user('other')
+        other_task = self.create_task(other, 'Other task')
+        resolver = WorkloadResolver(other)
+        search = urllib.parse.urlsplit(resolver.url(shapes[0]))
+
+        self.assertEqual(search.path, reverse('manager:search'))
+        self.assertIn(urllib.parse.parse_qs(search.query)['title'][0], ('Other', 'task'))
+        self.assertIn(int(urllib.parse.parse_qs(search.query)['status'][0]), Status.objects.visible_to(other).values_list('pk', flat=True))
+        self.assertEqual(resolver.url(shapes[1]), reverse('manager:detail', args=[other_task.pk]))
+        self.assertIsNone(resolver.url(shapes[2]))
+
+@override_settings(DATABASE_WRITE_ATTEMPTS=3, DATABASE_WRITE_RETRY_WAIT=0)
+class RunWriteTests(TransactionTestCase):
+    """
+    run_write outside of the transaction wrapping each TestCase test.
+    """
+    serialized_rollback = True
+
+    def test_lock_conflicts_are_retried(self):
+        write = mock.Mock(side_effect=[
+            OperationalError('database is locked'), OperationalError('database table is locked'), 'written',
+        ])
+
+        self.assertEqual(run_write(write, 'task', using=DEFAULT_DB_ALIAS), 'written')
+        self.assertEqual(write.call_args_list, [mock.call('task')] * 3)
+
+    def test_retries_stop_after_the_last_attempt(self):
+        write = mock.Mock(side_effect=OperationalError('database is locked'))
+
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            run_write(write)
+
+        self.assertEqual(write.call_count, 3)
+
+    def test_other_errors_are_not_retried(self):
+        write = mock.Mock(side_effect=OperationalError('no such table: manager_task'))
+
+        with self.assertRaises(OperationalError):
+            run_write(write)
+
+        self.assertEqual(write.call_count, 1)
+
+    def test_outer_transactions_own_the_retries(self):
+        write = mock.Mock(side_effect=OperationalError('database is locked'))
+
+        with self.assertRaises(OperationalError), transaction.atomic():
+            run_write(write)
+
+        self.assertEqual(write.call_count, 1)
+
+    def test_writes_run_in_a_transaction(self):
+        def write():
+            User.objects.create_user('user')
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            run_write(write)
+
+        self.assertFalse(User.objects.filter(username='user').exists())
+
+@override_settings(DATABASE_REPLICA_ALIASES=['replica1'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        token = routing_state.set(RoutingState())
+        self.addCleanup(routing_state.reset, token)
+
+    def test_requests_read_from_the_primary_once_they_wrote(self):
+        self.assertEqual(self.router.db_for_read(Task), 'replica1')
+        self.assertEqual(self.router.db_for_read(Session), DEFAULT_DB_ALIAS)
+
+        self.assertEqual(self.router.db_for_write(Task), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(Task), DEFAULT_DB_ALIAS)
+
+    def test_use_primary_blocks(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Task), DEFAULT_DB_ALIAS)
+
+        self.assertEqual(self.router.db_for_read(Task), 'replica1')
+
+        with use_primary():
+            self.router.db_for_write(Task)
+
+        self.assertEqual(self.router.db_for_read(Task), DEFAULT_DB_ALIAS)
+
+    def test_reads_outside_of_requests_go_to_the_primary(self):
+        token = routing_state.set(None)
+
+        try:
+            self.assertEqual(self.router.db_for_read(Task), DEFAULT_DB_ALIAS)
+        finally:
+            routing_state.reset(token)
+
+    def test_sessions_stick_to_the_primary_after_a_write(self):
+        session = SessionStore()
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Task))
+
+            if request.method == 'POST':
+                self.router.db_for_write(Task)
+
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+
+        def request(method, at):
+            request = getattr(RequestFactory(), method)('/')
+            request.session = session
+
+            with mock.patch('time.time', return_value=at):
+                middleware(request)
+
+        request('get', 1000)
+        request('post', 1000)
+        request('get', 1009)
+        request('get', 1011)
+
+        self.assertEqual(databases, ['replica1', DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS, 'replica1'])
+
+class ArchiveTests(ShardedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user', 'shard2')
+        self.task = self.create_task(self.user, completed=True, completed_at=date.today() - timedelta(days=400))
+        self.tag = Tag.objects.using('shard2').get(user=self.user)
+        self.task.tags.add(self.tag)
+        Comment.objects.using('shard2').create(task=self.task, author=self.user, content='Comment')
+        self.create_task(self.user, 'Open')
+
+    def test_archive_batch_moves_old_completed_tasks(self):
+        tasks = archivable_tasks(days=180, using='shard2')
+
+        self.assertEqual(archive_batch(tasks, 10, date.today()), 1)
+        self.assertEqual(archive_batch(tasks, 10, date.today()), 0)
+
+        archived = ArchivedTask.objects.using('shard2').get()
+        self.assertEqual(archived.original_id, self.task.pk)
+        self.assertEqual([*archived.tags.all()], [self.tag])
+        self.assertEqual([*archived.comments.values_list('content', flat=True)], ['Comment'])
+        self.assertEqual([*Task.objects.using('shard2').values_list('title', flat=True)], ['Open'])
+        self.assertFalse(Comment.objects.using('shard2').exists())
+
+    def test_restore_task_gets_its_id_back(self):
+        archive_batch(archivable_tasks(days=180, using='shard2'), 10, date.today())
+        archived = ArchivedTask.objects.using('shard2').get()
+
+        task = restore_task(archived)
+
+        self.assertEqual(task.pk, self.task.pk)
+        self.assertEqual(task.created_at, self.task.created_at)
+        self.assertEqual([*task.tags.all()], [self.tag])
+        self.assertEqual([*task.comments.values_list('content', flat=True)], ['Comment'])
+        self.assertFalse(ArchivedTask.objects.using('shard2').exists())
+
+class PurgeUserTests(ShardedTestCase):
+    def test_purge_deletes_the_data_on_every_database(self):
+        user = self.create_user('user', 'shard1')
+        assignee = self.create_user('assignee', 'shard2')
+        task = self.create_task(user, assignee=assignee)
+        Comment.objects.using('shard1').create(task=task, author=assignee, content='Comment')
+        kept = self.create_task(assignee, 'Kept', assignee=user)
+        Comment.objects.using('shard2').create(task=kept, author=user, content='Gone')
+
+        steps = [*purge_user(user.pk, batch_size=1)]
+
+        self.assertTrue(steps)
+        self.assertFalse(User.objects.filter(pk=user.pk).exists())
+
+        for alias in SHARDS:
+            self.assertFalse(Task.objects.using(alias).filter(user_id=user.pk).exists())
+            self.assertFalse(Tag.objects.using(alias).filter(user_id=user.pk).exists())
+            self.assertFalse(DailyTaskCount.objects.using(alias).filter(user_id=user.pk).exists())
+            self.assertFalse(Comment.objects.using(alias).filter(author_id=user.pk).exists())
+
+        # Tasks of other owners assigned to the user are deleted with it, like the cascade does
+        self.assertFalse(Task.objects.using('shard2').filter(pk=kept.pk).exists())
+        self.assertTrue(User.objects.filter(pk=assignee.pk).exists())
+
+    def test_purge_resumes(self):
+        user = self.create_user('user', 'shard2')
+        self.create_task(user)
+        self.create_task(user, 'Other')
+
+        next(purge_user(user.pk, batch_size=1))
+        [*purge_user(user.pk, batch_size=1)]
+
+        self.assertFalse(Task.objects.using('shard2').filter(user_id=user.pk).exists())
+        self.assertFalse(User.objects.filter(pk=user.pk).exists())
+
+class ReassignDailyCountsTests(ShardedTestCase):
+    def test_rows_are_merged_into_the_replacement(self):
+        user = self.create_user('user', 'shard1')
+        other = self.create_user('other', 'shard1')
+        rows = DailyTaskCount.objects.using('shard1')
+        default = Status.objects.using('shard1').get(user__isnull=True, name='On Hold')
+        status = Status.objects.using('shard1').create(user=user, name='Waiting')
+        priority = Priority.objects.using('shard1').get(user__isnull=True, name='Low')
+        today, yesterday = date.today(), date.today() - timedelta(days=1)
+        count = lambda owner, day, status, created, completed=0: rows.create(
+            user_id=owner.pk, day=day, status_id=status.pk, priority_id=priority.pk, assignee_id=owner.pk,
+            created_count=created, completed_count=completed,
+        )
+        count(user, today, default, 2, 1)
+        count(user, today, status, 3, 1)
+        count(user, yesterday, default, 4)
+        count(other, today, default, 5)
+
+        reassign_daily_counts('status', default, status, user.pk)
+
+        self.assertEqual(
+            {(row.day, row.created_count, row.completed_count) for row in rows.filter(user=user, status=status)},
+            {(today, 5, 2), (yesterday, 4, 0)},
+        )
+        self.assertFalse(rows.filter(user=user, status=default).exists())
+        self.assertEqual(rows.get(user=other).status, default)
+
+    def test_reassign_and_delete_merges_every_owner(self):
+        user = self.create_user('user', 'shard1')
+        replaced = Status.objects.using('shard1').create(user=user, name='Old')
+        replacement = Status.objects.using('shard1').create(user=user, name='New')
+        self.create_task(user, status=replaced)
+        self.create_task(user, status=replacement)
+
+        self.assertEqual(reassign_and_delete(replaced, replacement), 1)
+        self.assertEqual(Task.objects.using('shard1').filter(status=replacement).count(), 2)
+        self.assertEqual(DailyTaskCount.objects.using('shard1').get(user=user).created_count, 2)
+
+class ETagTests(ShardedTestCase):
+    """
+    Every write path changes the ETag of the pages it changes.
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user', 'shard1')
+        self.assignee = self.create_user('assignee', 'shard2')
+        self.task = self.create_task(self.user, assignee=self.assignee)
+        self.client.force_login(self.user)
+
+    def assertChanges(self, url, write):
+        """
+        Assert that a page of the logged in user is not modified until the write, and modified after it.
+
+        Args:
+        - url (str): The page.
+        - write (callable): Performs the write.
+        """
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.run_on_commit():
+            write()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_task_save(self):
+        def write():
+            self.task.title = 'Renamed'
+            self.task.save()
+
+        self.assertChanges(reverse('manager:list'), write)
+        self.assertChanges(reverse('manager:detail', args=[self.task.pk]), write)
+
+    def test_task_save_changes_the_pages_of_the_assignee(self):
+        def write():
+            self.task.completed = True
+            self.task.save()
+
+        self.client.force_login(self.assignee)
+
+        self.assertChanges(reverse('manager:home'), write)
+
+    def test_edit_view(self):
+        data = {
+            'title': 'Edited', 'description': '', 'due_date': self.task.due_date.isoformat(),
+            'status': self.task.status_id, 'assignee': self.assignee.pk, 'priority': self.task.priority_id,
+            'tags': [Tag.objects.using('shard1').get(user=self.user).pk],
+        }
+        edit = lambda: self.client.post(reverse('manager:edit', args=[self.task.pk]), data)
+
+        self.assertChanges(reverse('manager:list'), edit)
+
+    def test_comment(self):
+        comment = lambda: self.client.post(reverse('manager:detail', args=[self.task.pk]), {'content': 'New comment'})
+
+        self.assertChanges(reverse('manager:detail', args=[self.task.pk]), comment)
+
+    def test_tags(self):
+        tag = Tag.objects.using('shard1').get(user=self.user)
+
+        self.assertChanges(reverse('manager:detail', args=[self.task.pk]), lambda: self.task.tags.add(tag))
+        self.assertChanges(reverse('manager:list'), lambda: self.task.tags.remove(tag))
+
+    def test_choice_reassignment(self):
+        status = Status.objects.using('shard1').create(user=self.user, name='Blocked')
+        Task.objects.using('shard1').filter(pk=self.task.pk).update(status=status)
+
+        self.assertChanges(reverse('manager:list'), lambda: reassign_and_delete(status, self.task.status))
+        self.assertEqual(Task.objects.using('shard1').get(pk=self.task.pk).status, self.task.status)
+
+    def test_hiding_a_default(self):
+        default = Status.objects.using('shard1').get(user__isnull=True, name='On Hold')
+        hide = lambda: self.client.get(reverse('manager:configuration_delete', args=[default.pk, 1]))
+
+        self.assertChanges(reverse('manager:list'), hide)
+        self.assertFalse(Status.objects.using('shard1').visible_to(self.user).filter(name='On Hold').exists())
+
+    def test_archive_and_restore(self):
+        Task.objects.using('shard1').filter(pk=self.task.pk).update(completed=True, completed_at=date.today() - timedelta(days=400))
+        archive = lambda: archive_batch(archivable_tasks(days=180, using='shard1'), 10, date.today())
+        restore = lambda: restore_task(ArchivedTask.objects.using('shard1').get())
+
+        self.assertChanges(reverse('manager:list'), archive)
+        self.assertChanges(reverse('manager:list'), restore)
+
+    def test_move_user(self):
+        self.assertChanges(reverse('manager:list'), lambda: move_user(self.user.pk, 'shard2'))
+
+    def test_username_change(self):
+        def rename(username):
+            self.assignee.username = username
+            self.assignee.save()
+
+        self.assertChanges(reverse('manager:list'), lambda: rename('renamed'))
+        self.assertChanges(reverse('manager:detail', args=[self.task.pk]), lambda: rename('renamed again'))
+
+    @override_settings(DATABASE_REPLICA_ALIASES=['replica1'])
+    def test_versions_are_read_from_the_primary(self):
+        # No replica1 database exists, reading from it would fail
+        with self.run_on_commit():
+            self.create_task(self.user)
+
+        version = DataVersion.objects.filter(user=self.user).values_list('version', 'updated_at').get()
+        token = routing_state.set(RoutingState())
+
+        try:
+            self.assertEqual(get_data_version(self.user.pk), version)
+        finally:
+            routing_state.reset(token)
+
+class FragmentCacheTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = FragmentCache(LocalFragmentCacheBackend())
+        self.enterContext(mock.patch('manager.fragment_cache._fragment_cache', self.cache))
+        self.user = self.create_user('user')
+        self.owner = self.create_user('owner')
+        self.task = self.create_task(self.owner, assignee=self.user)
+        self.client.force_login(self.user)
+
+    def test_cached_row_is_served_again(self):
+        self.client.get(reverse('manager:list'))
+        self.client.get(reverse('manager:list'))
+
+        self.assertEqual(self.cache.stats()['task_row'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_updated_task_is_rendered_again(self):
+        self.client.get(reverse('manager:list'))
+
+        self.task.title = 'Renamed'
+        self.task.save()
+
+        self.assertContains(self.client.get(reverse('manager:list')), 'Renamed')
+        self.assertEqual(self.cache.stats()['task_row']['misses'], 2)
+
+    def test_renamed_owner_is_rendered_again(self):
+        self.client.get(reverse('manager:list'))
+
+        with self.run_on_commit():
+            self.owner.username = 'renamed'
+            self.owner.save()
+
+        self.assertContains(self.client.get(reverse('manager:list')), 'renamed')
+
+    def test_unknown_version_is_not_cached(self):
+        template = Template("{% load fragments %}{% cachedfragment 'fragment' version %}{{ value }}{% endcachedfragment %}")
+
+        self.assertEqual(template.render(Context({'version': None, 'value': 1})), '1')
+        self.assertEqual(template.render(Context({'version': None, 'value': 2})), '2')
+        self.assertEqual(self.cache.stats(), {})
+
+class TwoTierCacheTests(TaskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = TwoTierCache('test')
+
+    def test_values_are_served_by_the_local_tier_then_the_shared_cache(self):
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+        self.cache.local.clear()
+        self.cache.get('key')
+        self.cache.get('missing')
+
+        self.assertEqual(self.cache.stats(), {'local_hits': 1, 'shared_hits': 1, 'misses': 1, 'hit_ratio': 2 / 3})
+
+    @override_settings(CACHE_GENERATION_CHECK_SECONDS=0)
+    def test_invalidation_reaches_every_worker(self):
+        other = TwoTierCache('test')
+        self.cache.set('key', 'value')
+
+        self.assertEqual(other.get('key'), 'value')
+
+        self.cache.invalidate()
+
+        self.assertIsNone(other.get('key'))
+
+        self.cache.set('key', 'value')
+        invalidate_all()
+
+        self.assertIsNone(other.get('key'))
+
+    @override_settings(CACHE_GENERATION_CHECK_SECONDS=0)
+    def test_new_database_epoch(self):
+        self.cache.set('key', 'value')
+        other = TwoTierCache('test')
+
+        # As after the database is recreated, flushed or restored and migrated again
+        start_cache_epoch(apps.get_app_config('manager'), DEFAULT_DB_ALIAS)
+
+        self.assertIsNone(other.get('key'))
+
+    def test_large_charts_are_kept_out_of_the_shared_cache(self):
+        self.enterContext(mock.patch.dict('manager.cache._caches', clear=True))
+        backend = SharedChartCacheBackend(max_bytes=10, max_shared_bytes=4)
+        backend.set('small', 'x' * 4)
+        backend.set('large', ('x' * 3, 'x' * 3))
+
+        self.assertEqual(len(backend.namespace.local), 2)
+
+        # Over the byte budget, the least recently used chart only remains in the shared cache
+        backend.set('other', 'x' * 4)
+
+        self.assertEqual(len(backend.namespace.local), 2)
+        self.assertEqual(backend.get('small'), 'x' * 4)
+        self.assertEqual(backend.namespace.stats()['shared_hits'], 1)
+
+        backend.namespace.local.clear()
+
+        self.assertIsNone(backend.get('large'))
+
+    @override_settings(CACHE_LOCK_POLL_SECONDS=0.01)
+    def test_missing_value_is_computed_once(self):
+        # Two workers, the epoch and generations are read before the threads start
+        workers = [self.cache, TwoTierCache('test')]
+        calls = []
+
+        for worker in workers:
+            worker.generation()
+
+        def compute():
+            calls.append(None)
+            time.sleep(0.2)
+
+            return 'value'
+
+        with ThreadPoolExecutor(8) as executor:
+            results = [*executor.map(lambda index: workers[index % 2].get_or_set('key', compute), range(8))]
+
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(calls), 1)
+
+class SharedDefaultChoicesMigrationTests(SimpleTestCase):
+    """
+    Migration 0015 collapses the per-user copies of the default statuses and priorities into
+    shared defaults, and migrating back copies them again.
+    """
+    before = [('manager', '0014_archivedtask_archivedcomment')]
+    after = [('manager', '0015_shared_default_choices')]
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        add_database('migration', os.path.join(directory.name, 'migration.sqlite3'))
+        self.addCleanup(remove_database, 'migration')
+        self.connection = connections['migration']
+
+    def migrate(self, targets):
+        """
+        Migrate the database to targets.
+
+        Returns:
+        - Apps: The historical models at targets.
+        """
+        executor = MigrationExecutor(self.connection)
+        executor.migrate(targets)
+
+        return executor.loader.project_state(targets).apps
+
+    def test_copies_are_collapsed_and_restored(self):
+        apps = self.migrate(self.before)
+        User_, Status_, Priority_, Task_, ArchivedTask_, DailyTaskCount_ = (
+            apps.get_model(*label.split('.')) for label in (
+                'auth.User', 'manager.Status', 'manager.Priority', 'manager.Task', 'manager.ArchivedTask', 'manager.DailyTaskCount',
+            )
+        )
+        db = 'migration'
+        users = [User_.objects.using(db).create(username=f'user{index}') for index in range(2)]
+        today = date.today()
+
+        for user in users:
+            statuses = {name: Status_.objects.using(db).create(user_id=user.pk, name=name) for name in ('To Do', 'In Progress', 'On Hold', 'Archived')}
+            priorities = {name: Priority_.objects.using(db).create(user_id=user.pk, name=name) for name in ('Low', 'Medium', 'High')}
+            custom = Status_.objects.using(db).create(user_id=user.pk, name='Blocked')
+
+            for status in (statuses['To Do'], statuses['On Hold'], custom):
+                Task_.objects.using(db).create(
+                    user_id=user.pk, assignee_id=user.pk, title=status.name, due_date=today, status_id=status.pk,
+                    priority_id=priorities['Low'].pk,
+                )
+
+            ArchivedTask_.objects.using(db).create(
+                original_id=1, user_id=user.pk, assignee_id=user.pk, title='Archived', created_at=today, due_date=today,
+                status_id=statuses['Archived'].pk, priority_id=priorities['High'].pk, completed_at=today, archived_at=today,
+            )
+
+            for status, created in ((statuses['To Do'], 2), (statuses['On Hold'], 3)):
+                DailyTaskCount_.objects.using(db).create(
+                    user_id=user.pk, day=today, status_id=status.pk, priority_id=priorities['Low'].pk, assignee_id=user.pk,
+                    created_count=created,
+                )
+
+        apps = self.migrate(self.after)
+        Status_, Priority_, Task_, ArchivedTask_, DailyTaskCount_ = (
+            apps.get_model('manager', name) for name in ('Status', 'Priority', 'Task', 'ArchivedTask', 'DailyTaskCount')
+        )
+
+        self.assertEqual(
+            sorted(Status_.objects.using(db).filter(user__isnull=True).values_list('name', flat=True)),
+            ['Archived', 'In Progress', 'On Hold', 'To Do'],
+        )
+        self.assertEqual(Status_.objects.using(db).filter(user__isnull=False).count(), 2)
+        self.assertEqual(Priority_.objects.using(db).filter(user__isnull=False).count(), 0)
+        self.assertEqual(Task_.objects.using(db).filter(status__user__isnull=True).count(), 4)
+        self.assertEqual(Task_.objects.using(db).filter(status__name='Blocked', status__user__isnull=False).count(), 2)
+        self.assertEqual(ArchivedTask_.objects.using(db).filter(status__user__isnull=True, priority__user__isnull=True).count(), 2)
+        self.assertEqual(
+            {(row.user_id, row.status.name, row.created_count) for row in DailyTaskCount_.objects.using(db).select_related('status')},
+            {(user.pk, name, created) for user in users for name, created in (('To Do', 2), ('On Hold', 3))},
+        )
+        self.assertTrue(all(row.status.user_id is None for row in DailyTaskCount_.objects.using(db).select_related('status')))
+
+        apps = self.migrate(self.before)
+        Status_, Priority_, Task_, ArchivedTask_, DailyTaskCount_ = (
+            apps.get_model('manager', name) for name in ('Status', 'Priority', 'Task', 'ArchivedTask', 'DailyTaskCount')
+        )
+
+        self.assertEqual(Status_.objects.using(db).count(), 10)
+        self.assertEqual(Priority_.objects.using(db).count(), 6)
+
+        for model in (Task_, ArchivedTask_, DailyTaskCount_):
+            rows = model.objects.using(db).select_related('status', 'priority')
+
+            self.assertTrue(all(row.status.user_id == row.user_id and row.priority.user_id == row.user_id for row in rows))
+
+        self.assertEqual(sum(DailyTaskCount_.objects.using(db).values_list('created_count', flat=True)), 10)
+
+    def test_deleted_defaults_stay_deleted(self):
+        apps = self.migrate(self.before)
+        User_, Status_, Priority_ = (apps.get_model(*label.split('.')) for label in ('auth.User', 'manager.Status', 'manager.Priority'))
+        db = 'migration'
+        user, other = (User_.objects.using(db).create(username=username) for username in ('user', 'other'))
+        statuses, priorities = ('To Do', 'In Progress', 'On Hold'), ('Low', 'Medium')
+
+        for name in statuses:
+            Status_.objects.using(db).create(user_id=user.pk, name=name)
+
+        for name in priorities:
+            Priority_.objects.using(db).create(user_id=user.pk, name=name)
+
+        apps = self.migrate(self.after)
+        rows = lambda model: {*apps.get_model('manager', model).objects.using(db).filter(user__isnull=False).values_list('user', 'name', 'hidden')}
+
+        self.assertEqual(rows('Status'), {(user.pk, 'Archived', True)})
+        self.assertEqual(rows('Priority'), {(user.pk, 'High', True)})
+
+        apps = self.migrate(self.before)
+        names = lambda model, user: {*apps.get_model('manager', model).objects.using(db).filter(user_id=user.pk).values_list('name', flat=True)}
+
+        self.assertEqual(names('Status', user), {*statuses})
+        self.assertEqual(names('Priority', user), {*priorities})
+        self.assertEqual(names('Status', other), set())
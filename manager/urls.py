@@ -9,6 +9,8 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('signup/', views.signup, name='signup'),
     path('home/', views.home, name='home'),
+    path('home/async/', views.home_async, name='home_async'),
+    path('analytics/', views.analytics, name='analytics'),
     path('list/', views.list, name='list'),
     path('login/', auth_views.LoginView.as_view(template_name='login.html', authentication_form=LoginForm), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
@@ -19,7 +21,13 @@ urlpatterns = [
 
     path('configuration/', views.configuration, name='configuration'),
     path('<int:pk>/mark_completed/', views.mark_completed_task, name='mark_completed'),
+    path('archived/<int:pk>/restore/', views.restore, name='restore'),
     path('<int:pk>/<int:cfg_obj>/configuration_delete/', views.configuration_delete, name='configuration_delete'),
 
     path('search/', views.search, name='search'),
+
+    path('events/', views.events, name='events'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('profiles/', views.profiles, name='profiles'),
+    path('profiles/<str:profile_id>.<str:kind>', views.profile_download, name='profile_download'),
 ]
\ No newline at end of file
@@ -0,0 +1,238 @@
+import functools
+import hashlib
+from datetime import datetime, time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import DataVersion, Task
+
+def bump_data_versions(user_ids):
+    """
+    Increment the data versions of users, creating their rows when missing.
+
+    Args:
+    - user_ids (iterable): The user ids, None values are ignored.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+
+    if not user_ids:
+        return
+
+    now = timezone.now()
+    versions = DataVersion.objects.using(DEFAULT_DB_ALIAS)
+
+    if versions.filter(user_id__in=user_ids).update(version=F('version') + 1, updated_at=now) == len(user_ids):
+        return
+
+    # Created at 0 then bumped, so a row created concurrently is bumped too. Users deleted along
+    # with their data get no row
+    missing = [*User.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=user_ids).exclude(
+        pk__in=versions.filter(user_id__in=user_ids).values('user_id'),
+    ).values_list('pk', flat=True)]
+    versions.bulk_create([DataVersion(user_id=user_id, updated_at=now) for user_id in missing], ignore_conflicts=True)
+    versions.filter(user_id__in=missing).update(version=F('version') + 1, updated_at=now)
+
+def bump_data_versions_on_commit(user_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Bump the data versions of users once the current transaction commits: a page rendered before
+    the commit must not get the new version.
+
+    Args:
+    - user_ids (iterable): The user ids.
+    - using (str): The database alias of the transaction.
+    """
+    transaction.on_commit(functools.partial(bump_data_versions, [*user_ids]), using=using)
+
+def bump_all_data_versions():
+    """
+    Increment the data version of every user, e.g. after a change of the shared default statuses.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    quote = connection.ops.quote_name
+    versions, users = quote(DataVersion._meta.db_table), quote(User._meta.db_table)
+    now = timezone.now()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {versions} (user_id, version, updated_at) SELECT id, 0, %s FROM {users} '
+            f'WHERE id NOT IN (SELECT user_id FROM {versions})',
+            [connection.ops.adapt_datetimefield_value(now)],
+        )
+
+    DataVersion.objects.using(DEFAULT_DB_ALIAS).update(version=F('version') + 1, updated_at=now)
+
+def touch_tasks(tasks, **changes):
+    """
+    Update tasks with one set-based UPDATE stamping their updated_at, and bump the data versions
+    of their owners and assignees once the transaction commits.
+
+    Args:
+    - tasks (QuerySet): The Task or ArchivedTask rows.
+    - **changes: Other field values to set.
+
+    Returns:
+    - int: The number of updated tasks.
+    """
+    users = {user_id for pair in tasks.order_by().values_list('user_id', 'assignee_id').distinct() for user_id in pair}
+    updated = tasks.update(updated_at=timezone.now(), **changes)
+    bump_data_versions_on_commit(users, tasks.db)
+
+    return updated
+
+def get_data_version(user_id):
+    """
+    Return the data version of a user, read from the primary like the bumps write it: a replica
+    lagging behind would answer unchanged pages with 304 until it catches up.
+
+    Args:
+    - user_id (int): The user id.
+
+    Returns:
+    - tuple: The version and the date and time of the last bump, (0, None) for users never bumped.
+    """
+    versions = DataVersion.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id)
+
+    return versions.values_list('version', 'updated_at').first() or (0, None)
+
+def user_page_version(request, *args, **kwargs):
+    """
+    Version of the pages showing the tasks of the user, see conditional_page.
+
+    Returns:
+    - tuple: The data version and the date and time of its last bump, None for anonymous requests.
+    """
+    if not request.user.is_authenticated:
+        return None
+
+    return get_data_version(request.user.pk)
+
+def dashboard_page_version(request, *args, **kwargs):
+    """
+    Version of the dashboard, which also changes every day: overdue and upcoming tasks and the
+    charts of the last days are relative to today.
+
+    Returns:
+    - tuple: The data version and the day, and the last bump or the start of the day if later.
+    """
+    version = user_page_version(request)
+
+    if version is None:
+        return None
+
+    today = timezone.localdate()
+    start_of_day = timezone.make_aware(datetime.combine(today, time()))
+
+    return (version[0], today), max(filter(None, (version[1], start_of_day)))
+
+def task_page_version(request, pk, *args, **kwargs):
+    """
+    Version of the page of a task, the last change of the task, its tags or its comments.
+
+    Returns:
+    - tuple: The task id and its updated_at, None when the task is not visible to the user.
+    """
+    if not request.user.is_authenticated:
+        return None
+
+    updated_at = Task.objects.filter(Q(user=request.user) | Q(assignee=request.user), pk=pk).values_list(
+        'updated_at', flat=True,
+    ).first()
+
+    return None if updated_at is None else ((pk, updated_at), updated_at)
+
+def conditional_page(get_version):
+    """
+    View decorator answering GET and HEAD requests with 304 Not Modified, before the view runs,
+    when the client already has the current version of the page.
+
+    The ETag is derived from the version, the URL and the session key: pages embed the CSRF
+    token, rotated at login along with the session key. Responses must be revalidated, and pages
+    with pending messages are always rendered, so the messages are shown. The version of GET and
+    HEAD requests is stored in request.page_version, so the view does not compute it again.
+
+    Args:
+    - get_version (callable): Called with the arguments of the view, returns a (key,
+      last modified datetime or None) tuple, the key being any value changing with the page, or
+      None when the page has no version.
+
+    Returns:
+    - callable: The decorator, for sync and async views.
+
+    Example:
+    >>> @login_required
+    >>> @conditional_page(user_page_version)
+    >>> def list(request): ...
+    """
+    def validators(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+
+        version = request.page_version = get_version(request, *args, **kwargs)
+
+        if version is None or len(get_messages(request)):
+            return None
+
+        key, last_modified = version
+        digest = hashlib.sha1(repr((request.get_full_path(), key, request.session.session_key)).encode()).hexdigest()
+
+        return quote_etag(digest), last_modified
+
+    def not_modified(request, etag, last_modified):
+        # Only the ETag is compared: Last-Modified has a one second resolution
+        response = get_conditional_response(request, etag=etag)
+
+        return None if response is None else finish(response, etag, last_modified)
+
+    def finish(response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+
+            if last_modified is not None:
+                response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+
+            patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                checked = await sync_to_async(validators)(request, *args, **kwargs)
+
+                if checked is None:
+                    return await view(request, *args, **kwargs)
+
+                response = not_modified(request, *checked)
+
+                if response is not None:
+                    return response
+
+                return finish(await view(request, *args, **kwargs), *checked)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            checked = validators(request, *args, **kwargs)
+
+            if checked is None:
+                return view(request, *args, **kwargs)
+
+            response = not_modified(request, *checked)
+
+            if response is not None:
+                return response
+
+            return finish(view(request, *args, **kwargs), *checked)
+
+        return wrapper
+
+    return decorator
@@ -1,20 +1,48 @@
+import asyncio
+import bisect
+import functools
+import hashlib
+import hmac
+import json
+import math
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
-from django.db.models import Q, F, ProtectedError, Count
+from django.db import connections
+from django.conf import settings
+from django.db.models import Q, F, Count, Case, When, Value, DurationField, ExpressionWrapper
 from django.utils import timezone
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from datetime import datetime, timedelta, date
 
-from manager.models import Comment, Task, Tag, Priority, Status
-from .forms import EditTaskForm, NewCommentForm, NewPriorityForm, NewStatusForm, NewTagForm, SearchForm, SignupForm, NewTaskForm
-from .analytics.plot_generator import PlotGenerator
+from manager.models import ArchivedTask, Comment, Task, Tag, Priority, Status
+from .forms import DashboardFilterForm, EditTaskForm, NewCommentForm, NewPriorityForm, NewStatusForm, NewTagForm, ReplacementForm, SearchForm, SignupForm, NewTaskForm
+from .analytics import task_cube
+from .cache import get_cache
+from .analytics.plot_generator import ChartSpec, PlotGenerator
+from .database import serialized_writes
+from .events import broker, format_sse
+from .metrics import registry
+from .profiling import list_profiles, profile_path
+from .archive import restore_task
+from .reassign import count_referencing_tasks, hide_default, override_default, reassign_and_delete
+from .sharding import fan_out_loaders, shard_aliases, user_shard, visible_tasks
+from .versions import conditional_page, dashboard_page_version, get_data_version, task_page_version, user_page_version
 
 UPCOMMING_DUE_DATE_VALUE = 3
 OVERDUE_DATE_VALUE = 0
 CONFIGURATION_STATUS_OBJECT = 1
 CONFIGURATION_PRIORITY_OBJECT = 2
 CONFIGURATION_TAG_OBJECT = 3
+EVENT_STREAM_HEARTBEAT_SECONDS = 20
+EVENT_STREAM_MAX_SECONDS = 300
+EVENT_STREAM_RETRY_MILLISECONDS = 3000
 
 def get_overdue_tasks(tasks):
     """
@@ -62,18 +90,15 @@ def get_upcomming_tasks(tasks):
     
     return upcoming_tasks
 
-def generate_task_per_day_plot(tasks):
+def get_task_per_day_data(tasks):
     """
-    Generate a line plot of completed tasks per day over the last 30 days.
-
-    This function queries completed tasks from the past 30 days, counts the tasks
-    completed on each day, and generates a line plot to visualize the data.
+    Count completed tasks per day over the last 30 days.
 
     Args:
     - tasks (QuerySet): A queryset of Task objects.
 
     Returns:
-    - str: HTML code representing the generated line plot.
+    - tuple: A list of dates and a list of the corresponding completed task counts.
     """
     today = datetime.now().date()
     start_date = today - timedelta(days=30)
@@ -89,21 +114,17 @@ def generate_task_per_day_plot(tasks):
     dates = [entry['completed_at'] for entry in task_counts]
     counts = [entry['count'] for entry in task_counts]
 
-    # Generate line plot using PlotGenerator class
-    return PlotGenerator().generate_task_per_day(dates, counts)
+    return dates, counts
 
-def generate_task_by_status_plot(tasks):
+def get_task_by_status_data(tasks):
     """
-    Generate a pie chart to visualize the distribution of tasks by status.
-
-    This function queries tasks and counts the number of tasks for each unique status.
-    It then generates a pie chart to represent the distribution of tasks across different statuses.
+    Count tasks for each unique status.
 
     Args:
     - tasks (QuerySet): A queryset of Task objects.
 
     Returns:
-    - str: HTML code representing the generated pie chart.
+    - tuple: A list of status names and a list of the corresponding task counts.
     """
     # Count tasks for each unique status
     task_status_counts = tasks.values('status__name').annotate(count=Count('id'))
@@ -112,43 +133,116 @@ def generate_task_by_status_plot(tasks):
     status = [entry['status__name'] for entry in task_status_counts]
     counts = [entry['count'] for entry in task_status_counts]
 
-    # Generate pie chart using PlotGenerator class
-    return PlotGenerator().generate_task_by_status(status, counts)
+    return status, counts
 
-def generate_task_duration_plot(tasks):
+def get_task_durations(tasks, top_slowest=None):
     """
-    Generate a horizontal bar chart to visualize the durations of completed tasks.
+    Count the completed tasks by duration (in days) and list the slowest ones.
 
-    This function queries completed tasks and calculates the duration (in days) of each task.
-    It then generates a horizontal bar chart to represent the task durations.
+    A task completed on the day it was created lasted one day. Counts are grouped by the
+    database, so the payload only grows with the number of distinct durations, and the
+    durations of several tables or databases merge exactly, see merge_task_durations.
 
     Args:
-    - tasks (QuerySet): A queryset of Task objects.
+    - tasks (QuerySet): A queryset of Task or ArchivedTask objects.
+    - top_slowest (int): Number of slowest tasks to list, 0 to skip. Defaults to the TASK_DURATION_TOP_SLOWEST setting.
 
     Returns:
-    - str: HTML code representing the generated horizontal bar chart.
+    - tuple: A dict of task counts keyed by duration in days, and a list of (title, days) pairs
+      of the slowest tasks, slowest first.
     """
-    # Query completed tasks and calculate durations
-    durations = tasks.filter(completed=True).annotate(duration=F('completed_at') - F('created_at')).values_list('duration', 'title')
+    top_slowest = settings.TASK_DURATION_TOP_SLOWEST if top_slowest is None else top_slowest
+
+    completed = tasks.filter(completed=True, completed_at__isnull=False).annotate(
+        duration=ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField()),
+    )
+    durations = {
+        duration.days + 1: count
+        for duration, count in completed.order_by().values_list('duration').annotate(count=Count('id'))
+    }
 
-    # Extract duration and title lists
-    duration_list, title_list = zip(*[(duration.days, title) for duration, title in durations])
+    slowest = [
+        (title, duration.days + 1)
+        for title, duration in completed.order_by('-duration').values_list('title', 'duration')[:top_slowest]
+    ] if top_slowest else []
 
-    # Generate horizontal bar chart using PlotGenerator class
-    return PlotGenerator().generate_task_duration([days + 1 for days in duration_list], title_list)
+    return durations, slowest
+
+def merge_task_durations(results, top_slowest=None):
+    """
+    Merge task durations, see get_task_durations.
+
+    Args:
+    - results (list): (durations, slowest) pairs.
+    - top_slowest (int): Number of slowest tasks to keep. Defaults to the TASK_DURATION_TOP_SLOWEST setting.
 
-def generate_assignee_productivity_plot(tasks):
+    Returns:
+    - tuple: The summed durations and the slowest tasks of all the pairs.
     """
-    Generate both a grouped bar chart and a pie chart to visualize assignee productivity.
+    top_slowest = settings.TASK_DURATION_TOP_SLOWEST if top_slowest is None else top_slowest
+    durations = {}
+
+    for counts, _ in results:
+        for days, count in counts.items():
+            durations[days] = durations.get(days, 0) + count
+
+    slowest = sorted((task for _, tasks in results for task in tasks), key=lambda task: task[1], reverse=True)
+
+    return durations, slowest[:top_slowest]
 
-    This function queries completed tasks and calculates the count of completed tasks for each assignee.
-    It then generates a grouped bar chart and a pie chart to represent assignee productivity.
+def summarize_task_durations(durations, slowest, bins=None, percentiles=None):
+    """
+    Summarize task durations for the duration chart.
+
+    Args:
+    - durations (dict): Task counts keyed by duration in days, see get_task_durations.
+    - slowest (list): (title, days) pairs of the slowest tasks.
+    - bins (tuple): Increasing lower bounds (in days) of the histogram bins, the last bin is open-ended.
+      Defaults to the TASK_DURATION_BINS setting.
+    - percentiles (tuple): Percentiles to compute, e.g. (50, 90, 99). Defaults to the TASK_DURATION_PERCENTILES setting.
+
+    Returns:
+    - tuple: The bin labels, the task count of each bin, a list of (percentile label, days) pairs
+      and the slowest tasks.
+    """
+    bins = settings.TASK_DURATION_BINS if bins is None else bins
+    percentiles = settings.TASK_DURATION_PERCENTILES if percentiles is None else percentiles
+
+    # Bin i holds the tasks lasting from bins[i] to bins[i + 1] - 1 days
+    labels = [
+        (f'{lower}' if upper - 1 == lower else f'{lower}-{upper - 1}') for lower, upper in zip(bins, bins[1:])
+    ] + [f'{bins[-1]}+']
+    counts = [0] * len(bins)
+
+    for days, count in durations.items():
+        counts[max(bisect.bisect_right(bins, days) - 1, 0)] += count
+
+    # Nearest-rank percentiles
+    total = sum(counts)
+    percentile_days = []
+
+    for percentile in percentiles if total else ():
+        rank = max(math.ceil(percentile / 100 * total), 1)
+        seen = 0
+
+        for days in sorted(durations):
+            seen += durations[days]
+
+            if seen >= rank:
+                percentile_days.append((f'p{percentile}', days))
+                break
+
+    return labels, counts, percentile_days, slowest
+
+def get_assignee_productivity_data(tasks):
+    """
+    Count completed tasks for each assignee.
 
     Args:
     - tasks (QuerySet): A queryset of Task objects.
 
     Returns:
-    - tuple: A tuple containing HTML codes representing the generated grouped bar chart and pie chart.
+    - tuple: A list of assignee usernames and a list of the corresponding completed task counts.
     """
     # Query completed tasks and calculate completed task counts for each assignee
     results = tasks.filter(completed=True).values('assignee__username').annotate(
@@ -159,8 +253,287 @@ def generate_assignee_productivity_plot(tasks):
     assignees = [entry['assignee__username'] for entry in results]
     completed_tasks = [entry['completed_tasks'] for entry in results]
 
-    # Generate grouped bar chart and pie chart using PlotGenerator class
-    return PlotGenerator().generate_assignee_productivity(assignees, completed_tasks)
+    return assignees, completed_tasks
+
+def get_dashboard_loaders(user, filters, version=None):
+    """
+    Return the independent data loaders of the home page.
+
+    Counts and charts slice the pre-aggregated daily task counts, which keep counting archived
+    tasks. Filtering by tag, which is not a dimension of the daily counts, falls back to
+    aggregating the tasks and the archived tasks themselves, as do the task durations. With
+    shards, each loader runs on every database holding task data and merges the results, see
+    DASHBOARD_MERGES.
+
+    Args:
+    - user: The user viewing the dashboard.
+    - filters (dict): Dashboard filters, see DashboardFilterForm.get_filters.
+    - version: The version of the dashboard data, see dashboard_page_version. When given, the
+      data is cached under it, see cache_dashboard_loaders.
+
+    Returns:
+    - dict: Callables taking no argument, keyed by data name. Each one runs its own queries and
+      can run concurrently with the others.
+    """
+    if shard_aliases():
+        loaders = fan_out_loaders(lambda: get_database_dashboard_loaders(user, filters), DASHBOARD_MERGES)
+    else:
+        loaders = get_database_dashboard_loaders(user, filters)
+
+    # Durations are summarized once merged
+    load_durations = loaders['task_duration']
+    loaders['task_duration'] = lambda: summarize_task_durations(*load_durations())
+
+    if version is not None:
+        loaders = cache_dashboard_loaders(loaders, user, filters, version)
+
+    return loaders
+
+def cache_dashboard_loaders(loaders, user, filters, version):
+    """
+    Wrap the data loaders of the home page to cache their data in the 'dashboard' namespace of
+    manager.cache, shared by the workers, under the version of the data and the filters.
+
+    Args:
+    - loaders (dict): The data loaders, see get_dashboard_loaders.
+    - user: The user viewing the dashboard.
+    - filters (dict): Dashboard filters, see DashboardFilterForm.get_filters.
+    - version: The version of the dashboard data, see dashboard_page_version.
+
+    Returns:
+    - dict: Callables returning the cached data, or loading and caching it.
+    """
+    cache = get_cache('dashboard')
+    digest = hashlib.sha1(json.dumps([version, filters], sort_keys=True, default=str).encode()).hexdigest()
+
+    return {name: functools.partial(cache.get_or_set, f'{user.pk}:{name}:{digest}', load) for name, load in loaders.items()}
+
+def get_database_dashboard_loaders(user, filters):
+    """
+    Return the data loaders of the home page for the database of the current shard, see
+    get_dashboard_loaders. The 'task_duration' loader returns durations, see get_task_durations.
+    """
+    status = filters.get('status')
+    priority = filters.get('priority')
+    assignee = filters.get('assignee')
+    tag = filters.get('tag')
+    start = filters.get('start')
+    end = filters.get('end')
+
+    def narrow(tasks):
+        tasks = tasks.filter(Q(user=user) | Q(assignee=user))
+
+        if status:
+            tasks = tasks.filter(status=status)
+        if priority:
+            tasks = tasks.filter(priority=priority)
+        if assignee:
+            tasks = tasks.filter(assignee=assignee)
+        if tag:
+            tasks = tasks.filter(tags=tag)
+
+        return tasks
+
+    tasks = narrow(Task.objects)
+    archived_tasks = narrow(ArchivedTask.objects)
+
+    # A day range selects the tasks created in it and the tasks completed in it
+    created_tasks, archived_created_tasks = tasks, archived_tasks
+    completed_tasks, archived_completed_tasks = tasks, archived_tasks
+
+    if start:
+        created_tasks, archived_created_tasks = (
+            created_tasks.filter(created_at__gte=start), archived_created_tasks.filter(created_at__gte=start),
+        )
+        completed_tasks, archived_completed_tasks = (
+            completed_tasks.filter(completed_at__gte=start), archived_completed_tasks.filter(completed_at__gte=start),
+        )
+    if end:
+        created_tasks, archived_created_tasks = (
+            created_tasks.filter(created_at__lte=end), archived_created_tasks.filter(created_at__lte=end),
+        )
+        completed_tasks, archived_completed_tasks = (
+            completed_tasks.filter(completed_at__lte=end), archived_completed_tasks.filter(completed_at__lte=end),
+        )
+
+    def with_archive(function, merge, live, archived):
+        # Runs a loader on the live and the archived tasks and merges the results
+        return lambda: merge([function(live), function(archived)])
+
+    loaders = {
+        # Archived tasks are completed, they are never upcoming nor overdue
+        'upcoming_tasks': lambda: tuple(get_upcomming_tasks(tasks)),
+        'overdue_tasks': lambda: tuple(get_overdue_tasks(tasks)),
+        'task_duration': with_archive(get_task_durations, merge_task_durations, completed_tasks, archived_completed_tasks),
+    }
+
+    if tag:
+        loaders.update({
+            'counts': lambda: (
+                created_tasks.count() + archived_created_tasks.count(),
+                completed_tasks.filter(completed=True).count() + archived_completed_tasks.count(),
+            ),
+            'task_by_status': with_archive(get_task_by_status_data, merge_labelled_counts, created_tasks, archived_created_tasks),
+            'task_per_day': with_archive(get_task_per_day_data, merge_task_per_day_data, completed_tasks, archived_completed_tasks),
+            'assignee_productivity': with_archive(
+                get_assignee_productivity_data, merge_labelled_counts, completed_tasks, archived_completed_tasks,
+            ),
+        })
+    else:
+        rows = task_cube.slice_cube(user, status=status, priority=priority, assignee=assignee, start=start, end=end)
+
+        loaders.update({
+            'counts': lambda: task_cube.get_task_counts(rows),
+            'task_by_status': lambda: task_cube.get_task_by_status_data(rows),
+            'task_per_day': lambda: task_cube.get_task_per_day_data(rows),
+            'assignee_productivity': lambda: task_cube.get_assignee_productivity_data(rows),
+        })
+
+    return loaders
+
+def merge_labelled_counts(results):
+    """
+    Merge (labels, counts) pairs, summing the counts of the labels found on several databases.
+
+    Args:
+    - results (list): (labels, counts) pairs.
+
+    Returns:
+    - tuple: The labels, in order of first appearance, and their counts.
+    """
+    totals = {}
+
+    for labels, counts in results:
+        for label, count in zip(labels, counts):
+            totals[label] = totals.get(label, 0) + count
+
+    return [*totals], [*totals.values()]
+
+def merge_task_per_day_data(results):
+    """
+    Merge the completed tasks per day of several databases, see get_task_per_day_data.
+    """
+    days, counts = merge_labelled_counts(results)
+    merged = sorted(zip(days, counts))
+
+    return [day for day, _ in merged], [count for _, count in merged]
+
+# How the dashboard data of the databases holding task data are merged, see get_dashboard_loaders
+DASHBOARD_MERGES = {
+    'counts': lambda results: tuple(map(sum, zip(*results))),
+    'upcoming_tasks': lambda results: tuple(sorted((task for tasks in results for task in tasks), key=lambda task: task['due_date'])),
+    'overdue_tasks': lambda results: tuple(sorted((task for tasks in results for task in tasks), key=lambda task: task['due_date'])),
+    'task_duration': merge_task_durations,
+    'task_by_status': merge_labelled_counts,
+    'task_per_day': merge_task_per_day_data,
+    'assignee_productivity': merge_labelled_counts,
+}
+
+def render_dashboard_charts(data):
+    """
+    Render the home page charts in a single PlotGenerator batch.
+
+    The charts that need at least one completed task are only rendered when there is one.
+
+    Args:
+    - data (dict): The dashboard data, see get_dashboard_loaders.
+
+    Returns:
+    - dict: Rendered chart HTML keyed by context name.
+    """
+    total_tasks, total_completed = data['counts']
+    specs = [ChartSpec('generate_task_by_status', data['task_by_status'])]
+
+    #Plots that need at least one task completed:
+    if total_completed > 0:
+        specs += [
+            ChartSpec('generate_task_per_day', data['task_per_day']),
+            ChartSpec('generate_task_duration', data['task_duration']),
+            ChartSpec('generate_assignee_productivity', data['assignee_productivity']),
+        ]
+
+    rendered = dict(zip((spec.method for spec in specs), PlotGenerator().render_batch(specs)))
+
+    charts = {
+        'tasks_by_status': rendered['generate_task_by_status'],
+        'tasks_per_day': rendered.get('generate_task_per_day'),
+        'tasks_duration': rendered.get('generate_task_duration'),
+    }
+
+    if 'generate_assignee_productivity' in rendered:
+        charts['assignee_productivity_bar'], charts['assignee_productivity_pie'] = rendered['generate_assignee_productivity']
+
+    return charts
+
+def build_dashboard_context(data, charts, filter_form, version=None):
+    """
+    Build the template context of the home page.
+
+    Args:
+    - data (dict): The dashboard data, see get_dashboard_loaders.
+    - charts (dict): Rendered chart HTML keyed by context name. Charts that need at least one
+      completed task may be missing.
+    - filter_form (DashboardFilterForm): The dashboard filter form.
+    - version: The version of the dashboard data, see dashboard_page_version. Cached fragments
+      of the page are keyed on it.
+
+    Returns:
+    - dict: The context for the 'home.html' template.
+    """
+    total_tasks, total_completed = data['counts']
+    completion_rate = round(total_completed / total_tasks * 100, 2) if total_tasks != 0 else 0
+
+    return {
+        'completion_rate': completion_rate,
+        'total_completed': total_completed,
+        'total_tasks': total_tasks,
+        'upcoming_tasks': data['upcoming_tasks'],
+        'overdue_tasks': data['overdue_tasks'],
+        'tasks_per_day': charts.get('tasks_per_day'),
+        'tasks_by_status': charts.get('tasks_by_status'),
+        'tasks_duration': charts.get('tasks_duration'),
+        'assignee_productivity_bar': charts.get('assignee_productivity_bar'),
+        'assignee_productivity_pie': charts.get('assignee_productivity_pie'),
+        'filter_form': filter_form,
+        'filtered': filter_form.is_bound,
+        'dashboard_version': version,
+    }
+
+def run_in_own_connection(function, *args):
+    """
+    Run a database bound function in a worker thread with its own connection.
+
+    Used by async views to run independent queries concurrently. The connection opened by the
+    worker thread is closed once the function returns.
+
+    Args:
+    - function (callable): The function to run.
+    - *args: Arguments passed to the function.
+
+    Returns:
+    - Awaitable: Resolves to the function's return value.
+    """
+    def run():
+        try:
+            return function(*args)
+        finally:
+            connections.close_all()
+
+    return sync_to_async(run, thread_sensitive=False)()
+
+async def get_authenticated_user(request):
+    """
+    Resolve the authenticated user of a request from an async view.
+
+    Parameters:
+    - request: HttpRequest - The HTTP request object.
+
+    Returns:
+    - User: The authenticated user, or None for anonymous requests.
+    """
+    return await sync_to_async(
+        lambda: request.user if request.user.is_authenticated else None
+    )()
 
 def index(request):
     """
@@ -191,6 +564,7 @@ def logout(request):
     logout(request)
     return render(request, '/')
 
+@serialized_writes
 def signup(request):
     """
     View for user registration.
@@ -219,9 +593,11 @@ def signup(request):
     })
 
 @login_required
+@conditional_page(dashboard_page_version)
 def home(request):
     """
-    View for rendering the home page.
+    View for rendering the home page, answered with 304 Not Modified while the user's data
+    version and the day are unchanged.
 
     Parameters:
     - request: HttpRequest - The HTTP request object.
@@ -229,48 +605,95 @@ def home(request):
     Returns:
     - HttpResponse - Renders the 'home.html' page with the user's task data and visualizations.
     """
-    tasks = Task.objects.filter(Q(user=request.user) | Q(assignee=request.user))
+    # Read before the data by conditional_page, the cached fragments of the page are keyed on it
+    version, _ = getattr(request, 'page_version', None) or dashboard_page_version(request)
 
-    total_tasks = tasks.count()
-    total_completed = tasks.filter(completed=True).count()
-    completion_rate = round(total_completed / total_tasks * 100, 2) if total_tasks != 0 else 0
+    filter_form = DashboardFilterForm(request.GET or None, user=request.user)
+    loaders = get_dashboard_loaders(request.user, filter_form.get_filters(), version)
 
-    upcoming_tasks = get_upcomming_tasks(tasks)
-    overdue_tasks = get_overdue_tasks(tasks)
-
-    tasks_by_status = generate_task_by_status_plot(tasks)
-
-    #Plots that need at least one task completed:
-    tasks_per_day = None
-    tasks_duration = None
-    assignee_productivity_bar = None
-    assignee_productivity_pie = None
+    data = {name: load() for name, load in loaders.items()}
+    charts = render_dashboard_charts(data)
 
-    if total_completed > 0:
-        tasks_per_day = generate_task_per_day_plot(tasks)
-        tasks_duration = generate_task_duration_plot(tasks)
-        assignee_productivity_bar, assignee_productivity_pie = generate_assignee_productivity_plot(tasks)
-                                                                    
-    context = {
-        'completion_rate': completion_rate,
-        'total_completed': total_completed,
-        'total_tasks': total_tasks,
-        'upcoming_tasks': upcoming_tasks,
-        'overdue_tasks': overdue_tasks,
-        'tasks_per_day': tasks_per_day,
-        'tasks_by_status': tasks_by_status,
-        'tasks_duration': tasks_duration,
-        'assignee_productivity_bar': assignee_productivity_bar,
-        'assignee_productivity_pie': assignee_productivity_pie,
-    }
+    context = build_dashboard_context(data, charts, filter_form, version)
 
     # Render the template and pass the context
     return render(request, 'home.html', context)
 
+@conditional_page(dashboard_page_version)
+async def home_async(request):
+    """
+    Asynchronous variant of the home page, served through the ASGI application.
+
+    The independent aggregates run concurrently, each on its own database connection, and the
+    charts are serialized off the event loop by the PlotGenerator render pool, so the response
+    time approaches the slowest single component instead of the sum of all of them.
+
+    Parameters:
+    - request: HttpRequest - The HTTP request object.
+
+    Returns:
+    - HttpResponse - Renders the 'home.html' page with the user's task data and visualizations.
+    - HttpResponse - Redirects to the login page if the user is not authenticated.
+    """
+    user = await get_authenticated_user(request)
+
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+
+    version, _ = getattr(request, 'page_version', None) or await sync_to_async(dashboard_page_version)(request)
+    filter_form = await sync_to_async(DashboardFilterForm)(request.GET or None, user=user)
+    filters = await sync_to_async(filter_form.get_filters)()
+    loaders = get_dashboard_loaders(user, filters, version)
+
+    results = await asyncio.gather(*(run_in_own_connection(load) for load in loaders.values()))
+    data = dict(zip(loaders, results))
+
+    # The batch fans out to the render process pool, keep the event loop free meanwhile
+    charts = await sync_to_async(render_dashboard_charts, thread_sensitive=False)(data)
+
+    context = build_dashboard_context(data, charts, filter_form, version)
+
+    # Rendering reads the session user through the auth context processor
+    return await sync_to_async(render)(request, 'home.html', context)
+
 @login_required
+def analytics(request):
+    """
+    View returning the cycle time, on-time completion, throughput and work in progress metrics
+    of the user's tasks as JSON.
+
+    Parameters:
+    - request: HttpRequest - The HTTP request object. An optional 'weeks' GET parameter sets
+      the length of the weekly trends.
+
+    Returns:
+    - JsonResponse - The metrics summary, see TaskMetrics.summary.
+    """
+    # numpy is only imported by the processes serving this endpoint
+    from .analytics.task_metrics import TaskMetrics
+
+    weeks = request.GET.get('weeks', '')
+    weeks = min(int(weeks), 520) if weeks.isdigit() and int(weeks) > 0 else settings.TASK_METRICS_WEEKS
+
+    today = date.today()
+    version, _ = get_data_version(request.user.pk)
+
+    def summarize():
+        metrics = TaskMetrics.from_queryset(visible_tasks(request.user), visible_tasks(request.user, ArchivedTask))
+
+        return metrics.summary(weeks, settings.TASK_DURATION_BINS, today)
+
+    # Cached under the data version of the user, shared by the workers
+    summary = get_cache('dashboard').get_or_set(f'{request.user.pk}:analytics:{weeks}:{today}:{version}', summarize)
+
+    return JsonResponse(summary)
+
+@login_required
+@conditional_page(user_page_version)
 def list(request):
     """
-    View for rendering a paginated list of tasks.
+    View for rendering a paginated list of tasks, answered with 304 Not Modified while the
+    user's data version is unchanged.
 
     Parameters:
     - request: HttpRequest - The HTTP request object.
@@ -280,7 +703,7 @@ def list(request):
     """
     ROWS_PER_PAGE = 15
 
-    tasks = Task.objects.filter(Q(user=request.user) | Q(assignee=request.user)).order_by('created_at')
+    tasks = visible_tasks(request.user).order_by('created_at')
     paginator = Paginator(tasks, ROWS_PER_PAGE) 
 
     page_number = request.GET.get('page')
@@ -288,9 +711,11 @@ def list(request):
 
     return render(request, 'list.html', {
         'tasks': page_obj,
+        'live_updates': settings.LIVE_UPDATES,
     })
 
 @login_required
+@serialized_writes
 def new(request):
     """
     View for creating a new task.
@@ -320,6 +745,7 @@ def new(request):
     })
 
 @login_required
+@serialized_writes
 def edit(request, pk):
     """
     View for editing an existing task.
@@ -358,6 +784,7 @@ def edit(request, pk):
         return redirect('manager:list')
 
 @login_required
+@serialized_writes(methods=None)
 def delete(request, pk):
     """
     View for deleting an existing task.
@@ -379,9 +806,35 @@ def delete(request, pk):
     return redirect('manager:list')
 
 @login_required
+@serialized_writes(methods=None)
+def restore(request, pk):
+    """
+    View for restoring an archived task, see manager.archive, and reopening it.
+
+    Parameters:
+    - request: HttpRequest - The HTTP request object.
+    - pk: int - The primary key of the archived task.
+
+    Returns:
+    - HttpResponse - Redirects to the detail page of the restored task.
+    """
+    archived = get_object_or_404(ArchivedTask, Q(user=request.user) | Q(assignee=request.user), pk=pk)
+    task = restore_task(archived)
+
+    # Saving updates the daily counts and the open pages like any other reopening
+    task.completed = False
+    task.completed_at = None
+    task.save()
+
+    return redirect('manager:detail', pk=task.pk)
+
+@login_required
+@conditional_page(task_page_version)
+@serialized_writes
 def detail(request, pk):
     """
-    View for displaying task details and handling new comments.
+    View for displaying task details and handling new comments. The page is answered with 304
+    Not Modified while the task, its tags and its comments are unchanged.
 
     Parameters:
     - request: HttpRequest - The HTTP request object.
@@ -415,6 +868,7 @@ def detail(request, pk):
 
             return render(request, 'detail.html', {
                 'task': task,
+                'live_updates': settings.LIVE_UPDATES,
                 'comments': comments,
                 'form': form,
             })
@@ -423,6 +877,7 @@ def detail(request, pk):
             return redirect('manager:list')
         
 @login_required
+@serialized_writes(methods=None)
 def mark_completed_task(request, pk):
     """
     View for marking a task as completed or incomplete.
@@ -449,10 +904,15 @@ def mark_completed_task(request, pk):
     return redirect('manager:detail', pk=pk) 
 
 @login_required
+@serialized_writes
 def configuration(request):
     """
     View for managing configurations (Status, Priority, Tag).
 
+    Shared default statuses and priorities are listed with the user's own. Adding one with the
+    name of a default overrides it: the user's tasks move to the new one. Adding one with the name
+    of a default the user deleted offers it back.
+
     Parameters:
     - request: HttpRequest - The HTTP request object.
 
@@ -469,6 +929,7 @@ def configuration(request):
                 status.user_id = request.user.id
 
                 status_form.save()
+                override_default(status)
 
                 return redirect('manager:configuration')
             
@@ -480,6 +941,7 @@ def configuration(request):
                 priority.user_id = request.user.id
 
                 priority.save()
+                override_default(priority)
                 
                 return redirect('manager:configuration')
             
@@ -495,9 +957,9 @@ def configuration(request):
                 return redirect('manager:configuration')
     
     else:
-        statuses = Status.objects.filter(user_id=request.user.id)
-        priorities = Priority.objects.filter(user_id=request.user.id)
-        tags = Tag.objects.filter(user_id=request.user.id)
+        statuses = Status.objects.visible_to(request.user.id)
+        priorities = Priority.objects.visible_to(request.user.id)
+        tags = Tag.objects.visible_to(request.user.id)
 
         status_form = NewStatusForm()
         priority_form = NewPriorityForm()
@@ -517,17 +979,24 @@ def configuration(request):
     })
 
 @login_required
+@serialized_writes(methods=None)
 def configuration_delete(request, pk, cfg_obj):
     """
     View for deleting configuration objects (Status, Priority, Tag).
 
+    Objects used by tasks are replaced: the view asks for the replacement, then moves the tasks
+    to it and deletes the object in one transaction, see manager.reassign.reassign_and_delete.
+    Shared default statuses and priorities are hidden from the user instead, once its own tasks
+    are replaced, see manager.reassign.hide_default.
+
     Parameters:
     - request: HttpRequest - The HTTP request object.
     - pk: int - The primary key of the object to be deleted.
     - cfg_obj: str - The type of configuration object to be deleted.
 
     Returns:
-    - HttpResponse - Redirects the user back to the configuration list page.
+    - HttpResponse - Renders the replacement form for objects in use, otherwise redirects the user
+      back to the configuration list page.
     """
     if cfg_obj == CONFIGURATION_STATUS_OBJECT:
         obj = Status
@@ -540,13 +1009,51 @@ def configuration_delete(request, pk, cfg_obj):
     
     if obj is not None:
         object = get_object_or_404(obj, id=pk)
-        
-        if object.user == request.user:
+        default = object.user_id is None
+
+        if default:
+            # Each database has its own defaults, the user's are found by name
+            object = obj.objects.using(user_shard(request.user.id)).visible_to(request.user.id).filter(
+                user__isnull=True, name=object.name,
+            ).first()
+
+        if object is not None and (default or object.user == request.user):
             # User is authorized to perform the action
-            try:
-                object.delete()
-            except ProtectedError:
-                messages.error(request, f"Cannot delete {object.name} because it is used at a task.")
+            tasks = count_referencing_tasks(object, request.user.id if default else None)
+
+            if not tasks:
+                if default:
+                    hide_default(object, request.user.id)
+                else:
+                    object.delete()
+
+                return redirect('manager:configuration')
+
+            # Used by tasks, ask what replaces it
+            if request.method == 'POST':
+                form = ReplacementForm(request.POST, instance=object, user=request.user.id)
+
+                if form.is_valid():
+                    replacement = form.cleaned_data['replacement']
+
+                    if default:
+                        hide_default(object, request.user.id, replacement)
+                    else:
+                        reassign_and_delete(object, replacement)
+
+                    if replacement is not None:
+                        messages.success(request, f"Deleted {object.name}, its {tasks} tasks now use {replacement.name}.")
+
+                    return redirect('manager:configuration')
+            else:
+                form = ReplacementForm(instance=object, user=request.user.id)
+
+            return render(request, 'configuration_delete.html', {
+                'title': f'Delete {object.name}',
+                'object': object,
+                'tasks': tasks,
+                'form': form,
+            })
 
     # User is not authorized or deleted the object, sending him back to list
     return redirect('manager:configuration')
@@ -564,10 +1071,12 @@ def search(request):
     - status: ChoiceField - Task status for search.
     - priority: ChoiceField - Task priority for search.
     - tag: MultipleChoiceField - Task tags for search.
+    - archived: BooleanField - Also search the archived tasks.
     """
     form = SearchForm(request.GET, user=request.user)
     query = None
     results = []
+    archived_results = []
 
     if form.is_valid():
         #Retrieving the field values from the form
@@ -605,14 +1114,152 @@ def search(request):
 
         #Executing the query and retrieving the search results
         if query:
-            query &= Q(user_id=request.user.id) | Q(assignee_id=request.user.id)
-            results = Task.objects.filter(query)
+            results = visible_tasks(request.user).filter(query)
+
+            # The archive is only searched on demand
+            if form.cleaned_data['archived']:
+                archived_results = visible_tasks(request.user, ArchivedTask).filter(query).order_by('-completed_at')
 
     context = {
         'form': form,
         'results': results,
+        'archived_results': archived_results,
     }
 
     return render(request, 'search.html', context)
 
 
+
+
+async def event_stream(user_id, task_id=None):
+    """
+    Yield Server-Sent Events frames for a user subscription.
+
+    The stream sends a comment line as heartbeat while idle and closes itself after
+    EVENT_STREAM_MAX_SECONDS, letting the browser reconnect, so subscriptions of clients that
+    went away are always released.
+
+    Args:
+    - user_id (int): The user whose events are streamed.
+    - task_id (int): Optional task id used to drop events of other tasks.
+
+    Yields:
+    - str: Encoded SSE frames.
+    """
+    subscription = broker.subscribe(user_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + EVENT_STREAM_MAX_SECONDS
+
+    try:
+        yield f"retry: {EVENT_STREAM_RETRY_MILLISECONDS}\n\n"
+
+        while loop.time() < deadline:
+            timeout = min(EVENT_STREAM_HEARTBEAT_SECONDS, deadline - loop.time())
+
+            try:
+                message = await asyncio.wait_for(subscription.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            data = message['data']
+            if task_id is not None and data.get('task', data.get('id')) != task_id:
+                continue
+
+            yield format_sse(message)
+    finally:
+        broker.unsubscribe(subscription)
+
+async def events(request):
+    """
+    View streaming task and comment change events to the current user as Server-Sent Events.
+
+    Served asynchronously through the ASGI application, so idle connections do not hold a
+    worker thread. Without live updates (LIVE_UPDATES) or through WSGI, where the stream would
+    hold a thread, it answers 204 No Content, which stops EventSource from reconnecting.
+
+    Parameters:
+    - request: HttpRequest - The HTTP request object. An optional 'task' GET parameter
+      restricts the stream to the events of a single task.
+
+    Returns:
+    - StreamingHttpResponse - A 'text/event-stream' response.
+    - HttpResponse - 204 No Content when live updates are disabled or not served through ASGI.
+    - HttpResponse - Redirects to the login page if the user is not authenticated.
+    """
+    if not settings.LIVE_UPDATES or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await get_authenticated_user(request)
+
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+
+    task_id = request.GET.get('task')
+    task_id = int(task_id) if task_id and task_id.isdigit() else None
+
+    response = StreamingHttpResponse(event_stream(user.id, task_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
+
+def metrics(request):
+    """
+    View exposing the request, database, template and chart metrics of this worker process
+    in the Prometheus text format.
+
+    Parameters:
+    - request: HttpRequest - The HTTP request object.
+
+    Returns:
+    - HttpResponse - The metrics, for staff users, the addresses in METRICS_ALLOWED_IPS and the
+      requests bearing METRICS_TOKEN.
+    - HttpResponseForbidden - For anyone else.
+    """
+    token = settings.METRICS_TOKEN
+    bearer = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    allowed = (
+        request.user.is_staff
+        or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        or bool(token) and hmac.compare_digest(bearer.encode(), token.encode())
+    )
+
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@staff_member_required
+def profiles(request):
+    """
+    View listing the stored request profiles.
+
+    Parameters:
+    - request: HttpRequest - The HTTP request object.
+
+    Returns:
+    - JsonResponse - The profile summaries, most recent first.
+    """
+    return JsonResponse({'profiles': list_profiles()})
+
+@staff_member_required
+def profile_download(request, profile_id, kind):
+    """
+    View downloading a stored request profile.
+
+    Parameters:
+    - request: HttpRequest - The HTTP request object.
+    - profile_id: str - The profile id.
+    - kind: str - 'prof' for the cProfile stats (open with pstats or snakeviz), 'json' for the
+      summary with the top functions and memory allocations.
+
+    Returns:
+    - FileResponse - The profile file as an attachment.
+    """
+    path = profile_path(profile_id, kind)
+
+    if path is None or not path.exists():
+        raise Http404('No such profile.')
+
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
@@ -0,0 +1,369 @@
+import datetime
+import http.cookiejar
+import json
+import queue
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.urls import NoReverseMatch, reverse
+
+from .metrics import view_name
+from .models import Priority, Status, Tag, Task
+
+# Query parameters holding the id of a status, priority, user or tag
+ID_PARAMETERS = ('status', 'priority', 'assignee', 'tag')
+DATE_VALUE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Routes never replayed: these change data on GET, or end the session, and the event
+# stream never ends on its own so it cannot be timed like a page
+SKIPPED_ROUTES = (
+    'manager:delete', 'manager:mark_completed', 'manager:configuration_delete', 'manager:logout',
+    'manager:events',
+)
+
+_log_lock = threading.Lock()
+
+def describe_value(name, value, today):
+    """
+    Describe a query parameter value without the user data it may hold.
+
+    Args:
+    - name (str): The parameter name.
+    - value (str): The parameter value.
+    - today (date): The day of the request, dates are recorded relative to it.
+
+    Returns:
+    - dict: The kind of value ('empty', 'id', 'int', 'date' or 'text') with what replaying it needs.
+    """
+    if value == '':
+        return {'kind': 'empty'}
+    if name in ID_PARAMETERS and value.lstrip('-').isdigit():
+        # The search form uses -1 for the 'Completed' status
+        return {'kind': 'id'} if value != '-1' else {'kind': 'int', 'value': -1}
+    if value.isdigit():
+        return {'kind': 'int', 'value': int(value)}
+    if DATE_VALUE.match(value):
+        try:
+            return {'kind': 'date', 'offset_days': (datetime.date.fromisoformat(value) - today).days}
+        except ValueError:
+            pass
+
+    return {'kind': 'text', 'length': len(value)}
+
+def describe_request(request, response, duration):
+    """
+    Record the shape of a request: its route, URL parameter names and anonymized query parameters.
+
+    Args:
+    - request: HttpRequest - The handled request.
+    - response: HttpResponse - Its response.
+    - duration (float): Time to produce the response in seconds.
+
+    Returns:
+    - dict: The JSON serializable request shape.
+    """
+    match = getattr(request, 'resolver_match', None)
+    today = datetime.date.today()
+
+    return {
+        'time': round(time.time(), 3),
+        'method': request.method,
+        'route': view_name(request),
+        'kwargs': sorted(match.kwargs) if match is not None else [],
+        'query': [[name, describe_value(name, value, today)] for name, values in request.GET.lists() for value in values],
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+    }
+
+def record_request(shape):
+    """
+    Append a request shape to the REQUEST_RECORDING_LOG JSON lines file.
+
+    Args:
+    - shape (dict): The request shape, see describe_request.
+    """
+    line = json.dumps(shape)
+
+    with _log_lock:
+        with open(settings.REQUEST_RECORDING_LOG, 'a', encoding='utf-8') as log:
+            log.write(line + '\n')
+
+def read_workload(path):
+    """
+    Read the recorded request shapes, skipping truncated lines.
+
+    Args:
+    - path (str): The JSON lines file.
+
+    Returns:
+    - list: The request shapes, in recording order.
+    """
+    shapes = []
+
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            try:
+                shapes.append(json.loads(line))
+            except ValueError:
+                continue
+
+    return shapes
+
+class WorkloadResolver:
+    """
+    Turns recorded request shapes into concrete URLs on the data of the replaying user.
+
+    Ids are drawn from the user's own statuses, priorities, tags and visible tasks, texts are
+    cut from the user's task titles to the recorded length.
+
+    Attributes:
+    - rng: Random - The seeded random generator.
+    - pools: dict - Candidate values by parameter kind.
+    """
+    def __init__(self, user, seed=0):
+        self.rng = random.Random(seed)
+        tasks = Task.objects.filter(Q(user=user) | Q(assignee=user))
+        task_ids = [*tasks.order_by('-pk').values_list('pk', flat=True)[:1000]]
+        titles = [*tasks.order_by('-pk').values_list('title', flat=True)[:200]] or ['task']
+
+        self.pools = {
+            'pk': task_ids,
+            'status': [*Status.objects.visible_to(user).values_list('pk', flat=True)],
+            'priority': [*Priority.objects.visible_to(user).values_list('pk', flat=True)],
+            'tag': [*Tag.objects.visible_to(user).values_list('pk', flat=True)],
+            'assignee': sorted({user.pk, *tasks.values_list('assignee_id', flat=True)[:1000]}),
+            'words': [word for title in titles for word in title.split()],
+        }
+
+    def value(self, name, description):
+        """
+        Return a query parameter value matching a recorded description.
+
+        Args:
+        - name (str): The parameter name.
+        - description (dict): The recorded value description, see describe_value.
+
+        Returns:
+        - str: The value.
+        """
+        kind = description['kind']
+
+        if kind == 'id':
+            return str(self.rng.choice(self.pools.get(name) or [0]))
+        if kind == 'int':
+            return str(description['value'])
+        if kind == 'date':
+            return (datetime.date.today() + datetime.timedelta(days=description['offset_days'])).isoformat()
+        if kind == 'text':
+            return self.rng.choice(self.pools['words'])[:description['length']]
+
+        return ''
+
+    def url(self, shape):
+        """
+        Return the URL replaying a request shape.
+
+        Args:
+        - shape (dict): The recorded request shape.
+
+        Returns:
+        - str: The path and query string, None when the route cannot be replayed.
+        """
+        if shape['method'] not in ('GET', 'HEAD') or shape['route'] in SKIPPED_ROUTES or shape['route'] == 'unresolved':
+            return None
+
+        kwargs = {name: self.rng.choice(self.pools['pk'] or [0]) for name in shape['kwargs']}
+
+        try:
+            path = reverse(shape['route'], kwargs=kwargs)
+        except NoReverseMatch:
+            return None
+
+        query = urllib.parse.urlencode([(name, self.value(name, description)) for name, description in shape['query']])
+
+        return f'{path}?{query}' if query else path
+
+class ClientTarget:
+    """
+    Sends requests through the in-process test client, logged in as the replaying user.
+    """
+    def __init__(self, user):
+        self.user = user
+
+    def session(self):
+        """
+        Return a request function for one worker thread.
+
+        Returns:
+        - callable: Takes a URL and returns the status code.
+        """
+        from django.test import Client
+
+        client = Client()
+        client.force_login(self.user)
+
+        return lambda url: client.get(url).status_code
+
+class HttpTarget:
+    """
+    Sends requests to a running server over HTTP, each worker logging in with its own session.
+
+    Attributes:
+    - base_url: str - The server URL, e.g. http://localhost:8000.
+    - username, password: str - The credentials of the replaying user.
+    """
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+
+    def session(self):
+        """
+        Log in and return a request function for one worker thread.
+
+        Returns:
+        - callable: Takes a URL and returns the status code.
+
+        Raises:
+        - PermissionError: If the credentials are refused.
+        """
+        cookies = http.cookiejar.CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+        login_url = self.base_url + reverse('manager:login')
+
+        opener.open(login_url).read()
+        csrf_token = next((cookie.value for cookie in cookies if cookie.name == settings.CSRF_COOKIE_NAME), '')
+        data = urllib.parse.urlencode({
+            'username': self.username,
+            'password': self.password,
+            'csrfmiddlewaretoken': csrf_token,
+        }).encode()
+
+        with opener.open(urllib.request.Request(login_url, data=data, headers={'Referer': login_url})) as response:
+            # A failed login renders the login page again instead of redirecting
+            if response.geturl() == login_url:
+                raise PermissionError(f'Could not log in to {self.base_url} as {self.username}.')
+
+        def send(url):
+            try:
+                with opener.open(self.base_url + url) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as error:
+                return error.code
+
+        return send
+
+def percentile(values, rank):
+    """
+    Return the nearest-rank percentile of a list of values.
+
+    Args:
+    - values (list): The measurements.
+    - rank (int): The percentile, between 0 and 100.
+
+    Returns:
+    - float: The smallest value greater than or equal to rank percent of the values.
+    """
+    ordered = sorted(values)
+    index = max(0, -(-rank * len(ordered) // 100) - 1)
+
+    return ordered[index]
+
+def replay(target, requests, concurrency=1):
+    """
+    Send requests with a number of concurrent workers, as fast as they are answered.
+
+    Args:
+    - target: A ClientTarget or HttpTarget.
+    - requests (list): (route, url) pairs, sent in order.
+    - concurrency (int): Number of worker threads.
+
+    Returns:
+    - dict: The wall time in seconds and, by route, the latencies in milliseconds and the number of errors.
+    """
+    from django.test.utils import override_settings
+
+    pending = queue.Queue()
+    results = {}
+    results_lock = threading.Lock()
+
+    for request in requests:
+        pending.put(request)
+
+    def work(send):
+        while True:
+            try:
+                route, url = pending.get_nowait()
+            except queue.Empty:
+                # Each worker thread opened its own database connections
+                connections.close_all()
+                return
+
+            start = time.perf_counter()
+
+            try:
+                status = send(url)
+            except Exception:
+                status = None
+
+            latency = (time.perf_counter() - start) * 1000
+
+            with results_lock:
+                result = results.setdefault(route, {'latencies': [], 'errors': 0})
+                result['latencies'].append(latency)
+                result['errors'] += status is None or status >= 400
+
+    sessions = [target.session() for _ in range(max(concurrency, 1))]
+    threads = [threading.Thread(target=work, args=(send,)) for send in sessions]
+    started = time.perf_counter()
+
+    # The test client sends requests to the 'testserver' host
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return {'seconds': time.perf_counter() - started, 'routes': results}
+
+def summarize_replay(replayed):
+    """
+    Compute throughput and latency percentiles per route.
+
+    Args:
+    - replayed (dict): The result of replay.
+
+    Returns:
+    - dict: Overall and per route request counts, throughput, errors and p50/p90/p99 latencies.
+    """
+    seconds = replayed['seconds'] or 1e-9
+    routes = {}
+
+    for route, result in sorted(replayed['routes'].items()):
+        latencies = result['latencies']
+        routes[route] = {
+            'requests': len(latencies),
+            'errors': result['errors'],
+            'throughput_rps': round(len(latencies) / seconds, 2),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p90_ms': round(percentile(latencies, 90), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+        }
+
+    total = sum(route['requests'] for route in routes.values())
+
+    return {
+        'seconds': round(seconds, 3),
+        'requests': total,
+        'throughput_rps': round(total / seconds, 2),
+        'routes': routes,
+    }
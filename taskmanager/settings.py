@@ -10,8 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,20 +46,26 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'manager.middleware.RequestMetricsMiddleware',
+    'manager.middleware.RequestRecordingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'manager.middleware.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'manager.middleware.ShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'manager.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'taskmanager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django templates, timed for the request metrics
+        'BACKEND': 'manager.metrics.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,13 +85,82 @@ WSGI_APPLICATION = 'taskmanager.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# The production SQLite profile (SQLITE_PRODUCTION, off by default, set it in the environment of
+# the deployed server) journals to a write-ahead log so readers never block the writer, syncs to
+# disk at checkpoints rather than on every commit (a power loss can only lose the last
+# transactions, never corrupt the database), caches 64 MB of pages per connection, memory maps
+# the first 256 MB of the file and waits up to SQLITE_BUSY_TIMEOUT seconds for locks.
+# Transactions begin IMMEDIATE so read-then-write transactions queue for the write lock instead
+# of failing with 'database is locked'. Connections are kept for CONN_MAX_AGE seconds and
+# checked before being reused.
+
+SQLITE_PRODUCTION = config('SQLITE_PRODUCTION', default=False, cast=bool)
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=20, cast=float)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'manager.backends.sqlite3',
+        'NAME': config('DATABASE_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=600 if SQLITE_PRODUCTION else 0, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': '; '.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        } if SQLITE_PRODUCTION else {},
     }
 }
 
+# Read replicas: comma separated SQLite files kept in sync with the primary by
+# `python manage.py sync_replicas`, added as the 'replica1', 'replica2'... databases. Reads go to
+# a random replica, writes to the primary. A session that wrote reads from the primary for
+# REPLICA_STICKY_SECONDS, which must exceed the replication delay. Tests use the primary.
+
+DATABASE_REPLICAS = config('DATABASE_REPLICAS', default='', cast=Csv())
+DATABASE_REPLICA_ALIASES = []
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=float)
+
+for index, replica in enumerate(DATABASE_REPLICAS, 1):
+    replica_options = dict(DATABASES['default']['OPTIONS'])
+    replica_options['init_command'] = '; '.join(filter(None, [replica_options.get('init_command'), 'PRAGMA query_only=ON']))
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'NAME': replica,
+        'OPTIONS': replica_options,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICA_ALIASES.append(f'replica{index}')
+
+# Shards: comma separated SQLite files, added as the 'shard1', 'shard2'... databases. The tasks,
+# comments, statuses, priorities, tags and daily counts of a user live on one shard, picked by a
+# stable hash of the user id at signup and recorded in the UserShard directory of the default
+# database, which keeps users and sessions. Users are copied to every shard. Ids embed the shard
+# position, so only append to the list, migrate each new shard with `python manage.py migrate
+# --database shardN` and move users to their shard with `python manage.py rebalance_shards`.
+
+DATABASE_SHARDS = config('DATABASE_SHARDS', default='', cast=Csv())
+DATABASE_SHARD_ALIASES = []
+
+for index, shard in enumerate(DATABASE_SHARDS, 1):
+    DATABASES[f'shard{index}'] = {**DATABASES['default'], 'NAME': shard}
+    DATABASE_SHARD_ALIASES.append(f'shard{index}')
+
+DATABASE_ROUTERS = ['manager.routers.ShardRouter', 'manager.routers.PrimaryReplicaRouter']
+
+# Writes of the views go through manager.database.run_write: serialized per process on SQLite
+# and retried up to DATABASE_WRITE_ATTEMPTS times on lock conflicts, waiting a random
+# exponential time starting at DATABASE_WRITE_RETRY_WAIT seconds.
+
+DATABASE_WRITE_ATTEMPTS = config('DATABASE_WRITE_ATTEMPTS', default=5, cast=int)
+DATABASE_WRITE_RETRY_WAIT = config('DATABASE_WRITE_RETRY_WAIT', default=0.05, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -130,3 +206,157 @@ LOGOUT_REDIRECT_URL = "/"
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Chart rendering
+# Number of processes rendering the Plotly charts of the home page in parallel, lower than 2
+# renders serially. Only batches of at least two Plotly charts use them, e.g. with PLOT_BACKEND
+# set to 'plotly'. The pool starts with the app, every manage.py command included, so
+# set it in the environment of the server only.
+
+PLOT_RENDER_WORKERS = config('PLOT_RENDER_WORKERS', default=0, cast=int)
+
+# Plotly is imported on first chart use. Set PLOT_PRELOAD to import it when the app starts instead,
+# e.g. with a preforking server loading the application before forking workers (gunicorn --preload).
+
+PLOT_PRELOAD = config('PLOT_PRELOAD', default=False, cast=bool)
+
+# Chart backend: 'plotly' renders interactive charts, 'svg' renders small static charts.
+# PLOT_BACKEND_OVERRIDES picks the backend of single charts by PlotGenerator method name, as
+# comma separated method=backend pairs. Unless PLOT_BACKEND or PLOT_BACKEND_OVERRIDES is set,
+# the status, per day and productivity charts render as SVG.
+
+PLOT_BACKEND_OVERRIDES = dict(
+    override.split('=', 1)
+    for override in config(
+        'PLOT_BACKEND_OVERRIDES',
+        default='' if config('PLOT_BACKEND', default='') else (
+            'generate_task_by_status=svg,generate_task_per_day=svg,generate_assignee_productivity=svg'
+        ),
+        cast=Csv(),
+    )
+)
+PLOT_BACKEND = config('PLOT_BACKEND', default='plotly')
+
+# Task duration chart, computed by the database whatever the number of completed tasks.
+# Lower bounds in days of the histogram bins, percentiles and number of slowest tasks listed.
+
+TASK_DURATION_BINS = (1, 2, 3, 5, 8, 15, 31, 61)
+TASK_DURATION_PERCENTILES = (50, 90, 99)
+TASK_DURATION_TOP_SLOWEST = 10
+
+# Default number of weeks of the throughput and work in progress trends of the analytics endpoint
+
+TASK_METRICS_WEEKS = 12
+
+# Tasks completed more than ARCHIVE_AFTER_DAYS days ago are moved to the archive tables by
+# `python manage.py archive_tasks`, ARCHIVE_BATCH_SIZE tasks per transaction. Archived tasks stay
+# counted in the dashboard and analytics and can be searched and restored.
+
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=180, cast=int)
+ARCHIVE_BATCH_SIZE = config('ARCHIVE_BATCH_SIZE', default=500, cast=int)
+
+# Purging a user (`python manage.py purge_user` or the users admin action) deletes its data with
+# set-based DELETE statements, PURGE_BATCH_SIZE rows per transaction.
+
+PURGE_BATCH_SIZE = config('PURGE_BATCH_SIZE', default=1000, cast=int)
+
+# Caches. manager.cache keeps the values of its namespaces in a bounded in-process tier of
+# LOCAL_CACHE_MAX_ENTRIES values in front of the 'shared' cache of the workers, for
+# SHARED_CACHE_TIMEOUT seconds. The keys include an epoch stored in the database and renewed by
+# every migrate and flush (run migrate after restoring a backup), so a recreated database never
+# reads the values cached for the previous one. The shared cache is file based by default
+# (development and tests), in the system temporary directory, use a Redis compatible server in
+# production (install the redis package), e.g.
+# SHARED_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# SHARED_CACHE_LOCATION=redis://127.0.0.1:6379/0
+# Workers notice invalidated namespaces within CACHE_GENERATION_CHECK_SECONDS. A value missing
+# from the cache is computed by one worker at a time, the others check for it every
+# CACHE_LOCK_POLL_SECONDS for up to CACHE_LOCK_TIMEOUT seconds.
+
+SHARED_CACHE_BACKEND = config('SHARED_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': SHARED_CACHE_BACKEND,
+        'LOCATION': config('SHARED_CACHE_LOCATION', default=str(Path(tempfile.gettempdir()) / 'taskmanager-cache')),
+        'TIMEOUT': config('SHARED_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int),
+        # Databases sharing a cache server keep apart
+        'KEY_PREFIX': config('SHARED_CACHE_KEY_PREFIX', default=DATABASES['default']['NAME']),
+    },
+}
+
+if SHARED_CACHE_BACKEND == 'django.core.cache.backends.filebased.FileBasedCache':
+    CACHES['shared']['OPTIONS'] = {'MAX_ENTRIES': config('SHARED_CACHE_MAX_ENTRIES', default=20000, cast=int)}
+
+LOCAL_CACHE_MAX_ENTRIES = config('LOCAL_CACHE_MAX_ENTRIES', default=1000, cast=int)
+CACHE_GENERATION_CHECK_SECONDS = config('CACHE_GENERATION_CHECK_SECONDS', default=1, cast=float)
+CACHE_LOCK_TIMEOUT = config('CACHE_LOCK_TIMEOUT', default=10, cast=float)
+CACHE_LOCK_POLL_SECONDS = config('CACHE_LOCK_POLL_SECONDS', default=0.05, cast=float)
+
+# Rendered charts are cached by a hash of their input in the 'charts' namespace of manager.cache,
+# keeping up to CHART_CACHE_MAX_ENTRIES of them and CHART_CACHE_MAX_BYTES characters in process.
+# Charts larger than CHART_CACHE_MAX_SHARED_BYTES (Plotly charts embed their data, a few MB each)
+# are not written to the shared cache. Set BACKEND to None to disable the cache, or to
+# 'manager.analytics.chart_cache.LocalChartCacheBackend' (with 'max_entries' and 'max_bytes'
+# options) to keep them in process only.
+
+CHART_CACHE = {
+    'BACKEND': 'manager.analytics.chart_cache.SharedChartCacheBackend',
+    'OPTIONS': {
+        'max_entries': config('CHART_CACHE_MAX_ENTRIES', default=128, cast=int),
+        'max_bytes': config('CHART_CACHE_MAX_BYTES', default=64 * 1024 * 1024, cast=int),
+        'max_shared_bytes': config('CHART_CACHE_MAX_SHARED_BYTES', default=512 * 1024, cast=int),
+    },
+}
+
+# Rendered template fragments (task rows, dashboard notifications) are cached under their data
+# version, set BACKEND to None to disable the cache. Use
+# 'manager.fragment_cache.DjangoFragmentCacheBackend' with an 'alias' option to share it between
+# workers through the Django cache framework. Hits and misses are exposed at /metrics/.
+
+FRAGMENT_CACHE = {
+    'BACKEND': 'manager.fragment_cache.LocalFragmentCacheBackend',
+    'OPTIONS': {
+        'max_entries': config('FRAGMENT_CACHE_MAX_ENTRIES', default=10000, cast=int),
+        'max_bytes': config('FRAGMENT_CACHE_MAX_BYTES', default=16 * 1024 * 1024, cast=int),
+    },
+}
+
+# Live updates: the task list and detail pages patch themselves from the /events/ Server-Sent
+# Events stream. Needs the ASGI application (e.g. uvicorn taskmanager.asgi:application), under
+# WSGI each open stream would hold a worker thread; /events/ answers 204 to WSGI requests.
+
+LIVE_UPDATES = config('LIVE_UPDATES', default=False, cast=bool)
+
+# Request metrics, exposed at /metrics/ in the Prometheus text format to staff users only,
+# unless deployments let the scraper in by client address (e.g. METRICS_ALLOWED_IPS=10.0.0.5) or
+# by bearer token (METRICS_TOKEN, sent as "Authorization: Bearer <token>"). Behind a reverse
+# proxy every request comes from the proxy address, prefer the token.
+
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='', cast=Csv())
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# When SLOW_QUERY_LOG is set (e.g. /var/log/taskmanager/slow_queries.jsonl), statements slower than
+# SLOW_QUERY_THRESHOLD_MS are logged with their view, fingerprint, parameter shape and query plan
+# to this JSON lines file, a threshold of 0 disables the log. Summarize it with
+# `python manage.py slow_queries`.
+
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float)
+SLOW_QUERY_LOG = config('SLOW_QUERY_LOG', default='')
+
+# Request profiling: one request in PROFILE_SAMPLE_RATE (0 disables sampling) and the requests of
+# staff users sending the PROFILE_HEADER header are profiled with cProfile and, if PROFILE_MEMORY,
+# tracemalloc. The newest PROFILE_MAX_FILES profiles are kept in PROFILE_DIR and listed at /profiles/.
+
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0, cast=int)
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MEMORY = config('PROFILE_MEMORY', default=True, cast=bool)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILE_MAX_FILES = config('PROFILE_MAX_FILES', default=100, cast=int)
+
+# Request recording: when REQUEST_RECORDING_LOG is set, the anonymized shape of every request is
+# appended to this JSON lines file. Replay it with `python manage.py replay_workload`.
+
+REQUEST_RECORDING_LOG = config('REQUEST_RECORDING_LOG', default='')